@@ -0,0 +1,80 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+"""Compare the chart data cache serializers on the example datasets
+
+Loads every example table (run ``superset load_examples`` first), then reports
+the serialized payload size along with the average dump and load times for each
+serializer. Usage:
+
+    python scripts/benchmark_cache_serializers.py --limit 100000 --repeat 5
+"""
+import argparse
+import time
+from datetime import datetime
+
+from superset.app import create_app
+
+
+def timed(func, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return result, (time.perf_counter() - start) / repeat * 1000
+
+
+def main(limit, repeat):
+    from superset.utils.cache_serializers import (
+        ArrowCacheSerializer,
+        PickleCacheSerializer,
+    )
+    from superset.utils.core import get_example_database
+
+    serializers = {
+        "pickle": PickleCacheSerializer(),
+        "arrow": ArrowCacheSerializer(),
+        "arrow+lz4": ArrowCacheSerializer(compression="lz4"),
+        "arrow+zstd": ArrowCacheSerializer(compression="zstd"),
+        "parquet": ArrowCacheSerializer(fmt="parquet"),
+        "parquet+zstd": ArrowCacheSerializer(fmt="parquet", compression="zstd"),
+    }
+    database = get_example_database()
+    print(
+        "{:<28} {:>8} {:<14} {:>12} {:>10} {:>10}".format(
+            "table", "rows", "serializer", "bytes", "dump ms", "load ms"
+        )
+    )
+    for table_name in sorted(database.get_all_table_names_in_schema(schema=None)):
+        sql = database.select_star(table_name, limit=limit, indent=False)
+        df = database.get_df(sql)
+        value = dict(dttm=datetime.utcnow().isoformat(), df=df, query=sql)
+        for name, serializer in serializers.items():
+            blob, dump_ms = timed(lambda: serializer.dumps(value), repeat)
+            _, load_ms = timed(lambda: serializer.loads(blob), repeat)
+            print(
+                "{:<28} {:>8} {:<14} {:>12} {:>10.2f} {:>10.2f}".format(
+                    table_name[:28], len(df.index), name, len(blob), dump_ms, load_ms
+                )
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--limit", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    with create_app().app_context():
+        main(args.limit, args.repeat)
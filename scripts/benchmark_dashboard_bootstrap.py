@@ -0,0 +1,141 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+"""Compare the legacy and the eager loaded dashboard bootstrap payloads
+
+Builds the dashboard and datasources payloads of the dashboard page, as the
+``/superset/dashboard/<id>/`` view does, and reports the number of queries run
+against the metadata database along with the average time, the cached payload
+being measured once warm. Needs a cache configured in CACHE_CONFIG. Usage:
+
+    python scripts/benchmark_dashboard_bootstrap.py --dashboards 1 2 --repeat 3
+"""
+import argparse
+import time
+from collections import defaultdict
+
+from sqlalchemy import event
+from sqlalchemy.orm import subqueryload
+
+from superset.app import create_app
+
+
+def legacy_bootstrap_data(dashboard_id):
+    """The slice by slice implementation, kept here as the baseline"""
+    from superset import db, is_feature_enabled
+    from superset.models.dashboard import Dashboard
+
+    dash = db.session.query(Dashboard).filter_by(id=dashboard_id).one()
+    datasources = defaultdict(list)
+    for slc in dash.slices:
+        datasource = (
+            db.session.query(slc.cls_model).filter_by(id=slc.datasource_id).first()
+        )
+        if datasource:
+            datasources[datasource].append(slc)
+    return {
+        "dashboard_data": dash.data,
+        "datasources": {
+            datasource.uid: datasource.data_for_slices(slices)
+            if is_feature_enabled("REDUCE_DASHBOARD_BOOTSTRAP_PAYLOAD")
+            else datasource.data
+            for datasource, slices in datasources.items()
+        },
+    }
+
+
+def bootstrap_data(dashboard_id):
+    from superset import db
+    from superset.models.dashboard import Dashboard
+
+    dash = (
+        db.session.query(Dashboard)
+        .options(subqueryload(Dashboard.slices))
+        .filter_by(id=dashboard_id)
+        .one()
+    )
+    return dash.get_bootstrap_data(dash.get_datasources())
+
+
+def timed(func, repeat):
+    """Runs each repetition in a new session, as each request does"""
+    from superset import db
+
+    statements = []
+
+    def count_statements(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", count_statements)
+    elapsed = 0.0
+    try:
+        for _ in range(repeat):
+            db.session.remove()
+            start = time.perf_counter()
+            result = func()
+            elapsed += time.perf_counter() - start
+    finally:
+        event.remove(db.engine, "before_cursor_execute", count_statements)
+    return result, len(statements) // repeat, elapsed / repeat * 1000
+
+
+def main(dashboard_ids, repeat):
+    from flask import current_app
+
+    print(
+        "{:>10} {:>8} {:>10} {:>12} {:>14} {:>12}".format(
+            "dashboard", "mode", "queries", "ms", "legacy ms", "speedup"
+        )
+    )
+    for dashboard_id in dashboard_ids:
+        _, legacy_queries, legacy_ms = timed(
+            lambda: legacy_bootstrap_data(dashboard_id), repeat
+        )
+        timeout = current_app.config["DASHBOARD_BOOTSTRAP_CACHE_TIMEOUT"]
+        current_app.config["DASHBOARD_BOOTSTRAP_CACHE_TIMEOUT"] = None
+        try:
+            _, eager_queries, eager_ms = timed(
+                lambda: bootstrap_data(dashboard_id), repeat
+            )
+        finally:
+            current_app.config["DASHBOARD_BOOTSTRAP_CACHE_TIMEOUT"] = timeout
+        bootstrap_data(dashboard_id)  # warms the cache up
+        _, cached_queries, cached_ms = timed(
+            lambda: bootstrap_data(dashboard_id), repeat
+        )
+        print(
+            "{:>10} {:>8} {:>10} {:>12.1f}".format(
+                dashboard_id, "legacy", legacy_queries, legacy_ms
+            )
+        )
+        for mode, queries, ms in (
+            ("eager", eager_queries, eager_ms),
+            ("cached", cached_queries, cached_ms),
+        ):
+            print(
+                "{:>10} {:>8} {:>10} {:>12.1f} {:>14.1f} {:>11.1f}x".format(
+                    dashboard_id, mode, queries, ms, legacy_ms, legacy_ms / ms
+                )
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--dashboards", type=int, nargs="+", required=True)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    with create_app().app_context():
+        main(args.dashboards, args.repeat)
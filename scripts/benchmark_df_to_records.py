@@ -0,0 +1,91 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+"""Compare the legacy and the column wise df_to_records
+
+Builds tall frames (many rows, a few columns) and wide frames (fewer rows, many
+columns) mixing int, big int, float, string and datetime columns, and reports
+the average time to turn them into records. Usage:
+
+    python scripts/benchmark_df_to_records.py --repeat 3
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from superset.app import create_app
+
+SHAPES = [("tall", 100000, 5), ("tall", 1000000, 5), ("wide", 10000, 200)]
+
+
+def legacy_df_to_records(dframe):
+    """The cell by cell implementation, kept here as the baseline"""
+    from superset.utils.core import JS_MAX_INTEGER
+
+    data = dframe.to_dict(orient="records")
+    for d in data:
+        for k, v in list(d.items()):
+            if isinstance(v, int) and abs(v) > JS_MAX_INTEGER:
+                d[k] = str(v)
+    return data
+
+
+def make_df(rows, columns):
+    makers = [
+        lambda: np.random.randint(0, 10 ** 6, rows),
+        lambda: np.random.randint(0, 2 ** 62, rows, dtype=np.int64),
+        lambda: np.random.random(rows),
+        lambda: np.random.choice(["foo", "bar", "baz"], rows).astype(object),
+        lambda: pd.date_range("2020-01-01", periods=rows, freq="s"),
+    ]
+    return pd.DataFrame({f"col_{i}": makers[i % len(makers)]() for i in range(columns)})
+
+
+def timed(func, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return result, (time.perf_counter() - start) / repeat * 1000
+
+
+def main(repeat):
+    from superset.dataframe import df_to_records
+
+    print(
+        "{:<6} {:>8} {:>8} {:>12} {:>12} {:>8}".format(
+            "shape", "rows", "columns", "legacy ms", "columns ms", "speedup"
+        )
+    )
+    for shape, rows, columns in SHAPES:
+        df = make_df(rows, columns)
+        expected, legacy_ms = timed(lambda: legacy_df_to_records(df), repeat)
+        records, columns_ms = timed(lambda: df_to_records(df), repeat)
+        assert records == expected
+        print(
+            "{:<6} {:>8} {:>8} {:>12.1f} {:>12.1f} {:>7.1f}x".format(
+                shape, rows, columns, legacy_ms, columns_ms, legacy_ms / columns_ms
+            )
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    with create_app().app_context():
+        main(args.repeat)
@@ -0,0 +1,138 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+"""Compare the per-query latency of PyDruid and the pooled broker client
+
+Starts a stub Druid broker on localhost answering every query with a canned topN
+result. ``--connect-delay`` is added to the first request of each connection
+to account for the TCP and TLS handshakes with a remote broker. Usage:
+
+    python scripts/benchmark_druid_broker_client.py --queries 200 --threads 8
+"""
+import argparse
+import json
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from pydruid.client import PyDruid
+
+from superset.connectors.druid.broker_client import (
+    close_broker_sessions,
+    get_broker_session,
+    get_timeout,
+    PooledPyDruid,
+)
+
+RESULT = json.dumps(
+    [
+        {
+            "timestamp": "2012-01-01T00:00:00.000Z",
+            "result": [{"dim": f"value_{i}", "count": i} for i in range(100)],
+        }
+    ]
+).encode("utf-8")
+
+
+def make_handler(connect_delay):
+    class StubBrokerHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def setup(self):
+            super().setup()
+            time.sleep(connect_delay)
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers["Content-Length"]))
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(RESULT)))
+            self.end_headers()
+            self.wfile.write(RESULT)
+
+        def log_message(self, *args):
+            pass
+
+    return StubBrokerHandler
+
+
+def run_query(client):
+    start = time.perf_counter()
+    client.topn(
+        datasource="ds",
+        granularity="all",
+        intervals="2012-01-01/2012-01-02",
+        aggregations={"count": {"type": "count", "name": "count"}},
+        dimension="dim",
+        metric="count",
+        threshold=100,
+    )
+    return (time.perf_counter() - start) * 1000
+
+
+def benchmark(name, make_client, queries, threads):
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        latencies = list(
+            executor.map(lambda _: run_query(make_client()), range(queries))
+        )
+    latencies.sort()
+    print(
+        "{:<10} mean {:>8.2f} ms  p50 {:>8.2f} ms  p95 {:>8.2f} ms".format(
+            name,
+            statistics.mean(latencies),
+            latencies[len(latencies) // 2],
+            latencies[int(len(latencies) * 0.95)],
+        )
+    )
+
+
+def main(queries, threads, connect_delay):
+    server = ThreadingHTTPServer(("localhost", 0), make_handler(connect_delay))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = "http://localhost:{}".format(server.server_port)
+    config = {"pool_size": threads}
+
+    benchmark("pydruid", lambda: PyDruid(base_url, "druid/v2"), queries, threads)
+    benchmark(
+        "pooled",
+        lambda: PooledPyDruid(
+            base_url,
+            "druid/v2",
+            session=get_broker_session(base_url, config),
+            timeout=get_timeout(config),
+        ),
+        queries,
+        threads,
+    )
+    close_broker_sessions()
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument(
+        "--connect-delay",
+        type=float,
+        default=0.03,
+        help="seconds added to the setup of every new connection",
+    )
+    args = parser.parse_args()
+    main(args.queries, args.threads, args.connect_delay)
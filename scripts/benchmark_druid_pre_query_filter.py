@@ -0,0 +1,108 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+"""Compare the legacy and the grouped phase two filter built from phase one rows
+
+Builds random phase one results of growing size over one or two dimensions and
+reports the time to build the phase two filter and the size of the resulting
+native query filter. Usage:
+
+    python scripts/benchmark_druid_pre_query_filter.py --repeat 5
+"""
+import argparse
+import json
+import random
+import time
+
+import pandas as pd
+from pydruid.utils.filters import Dimension, Filter
+
+from superset.app import create_app
+
+
+def legacy_filter_from_pre_query_data(df, dimensions, dim_filter):
+    """The row by row implementation, kept here as the baseline"""
+    ret = dim_filter
+    if not df.empty:
+        new_filters = []
+        for unused, row in df.iterrows():
+            fields = []
+            for dim in dimensions:
+                fields.append(Dimension(dim) == row[dim])
+            if len(fields) > 1:
+                new_filters.append(Filter(type="and", fields=fields))
+            elif fields:
+                new_filters.append(fields[0])
+        if new_filters:
+            ff = Filter(type="or", fields=new_filters)
+            ret = ff if not dim_filter else Filter(type="and", fields=[ff, dim_filter])
+    return ret
+
+
+def make_pre_query_df(rows, dimensions):
+    data = {
+        dim: [f"{dim}_{random.randrange(rows)}" for _ in range(rows)]
+        for dim in dimensions
+    }
+    data["count"] = [random.randrange(1000) for _ in range(rows)]
+    return pd.DataFrame(data)
+
+
+def timed(func, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return result, (time.perf_counter() - start) / repeat * 1000
+
+
+def main(repeat):
+    from superset.connectors.druid.models import DruidDatasource
+
+    datasource = DruidDatasource(datasource_name="benchmark")
+    print(
+        "{:>7} {:>5} {:>12} {:>12} {:>12} {:>12}".format(
+            "rows", "dims", "legacy ms", "grouped ms", "legacy KB", "grouped KB"
+        )
+    )
+    for rows in (100, 1000, 10000):
+        for dimensions in (["dim1"], ["dim1", "dim2"]):
+            df = make_pre_query_df(rows, dimensions)
+            results = []
+            for func in (
+                legacy_filter_from_pre_query_data,
+                datasource._add_filter_from_pre_query_data,
+            ):
+                ret, elapsed = timed(lambda: func(df, dimensions, None), repeat)
+                size = len(json.dumps(Filter.build_filter(ret), default=str))
+                results.append((elapsed, size / 1024))
+            print(
+                "{:>7} {:>5} {:>12.2f} {:>12.2f} {:>12.1f} {:>12.1f}".format(
+                    rows,
+                    len(dimensions),
+                    results[0][0],
+                    results[1][0],
+                    results[0][1],
+                    results[1][1],
+                )
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    with create_app().app_context():
+        main(args.repeat)
@@ -0,0 +1,117 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+"""Compare the legacy and the column oriented SupersetResultSet construction
+
+Builds DB-API like rows of growing size, one kind of column at a time, and
+reports the average time to turn them into an Arrow table. Usage:
+
+    python scripts/benchmark_result_set.py --rows 10000 100000 1000000 --repeat 3
+"""
+import argparse
+import datetime
+import random
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from superset.app import create_app
+
+TZ = datetime.timezone(datetime.timedelta(hours=2))
+EPOCH = datetime.datetime(2020, 1, 1)
+
+COLUMNS = {
+    "int": lambda i: random.randrange(10 ** 9),
+    "float": lambda i: random.random(),
+    "str": lambda i: f"value_{random.randrange(1000)}",
+    "datetime": lambda i: EPOCH + datetime.timedelta(seconds=i),
+    "tz-aware": lambda i: (EPOCH + datetime.timedelta(seconds=i)).replace(tzinfo=TZ),
+    "nested": lambda i: [i, {"key": str(i)}],
+    "mixed": lambda i: i if i % 2 else str(i),
+}
+
+
+def legacy_build_table(data, column_names):
+    """The structured array implementation, kept here as the baseline"""
+    from superset.result_set import stringify
+
+    pa_data = []
+    array = np.array(data, dtype=[(name, "object") for name in column_names])
+    for column in column_names:
+        try:
+            pa_data.append(pa.array(array[column].tolist()))
+        except (pa.lib.ArrowInvalid, pa.lib.ArrowTypeError, TypeError):
+            values = np.vectorize(stringify)(array[column])
+            pa_data.append(pa.array(values.tolist()))
+    for i, column in enumerate(column_names):
+        if pa.types.is_nested(pa_data[i].type):
+            values = np.vectorize(stringify)(array[column])
+            pa_data[i] = pa.array(values.tolist())
+        elif pa.types.is_temporal(pa_data[i].type):
+            sample = next((value for value in array[column] if value), None)
+            if sample and sample.tzinfo:
+                series = pd.Series(array[column], dtype="datetime64[ns]")
+                series = pd.to_datetime(series).dt.tz_localize(sample.tzinfo)
+                pa_data[i] = pa.Array.from_pandas(
+                    series, type=pa.timestamp("ns", tz=sample.tzinfo)
+                )
+    return pa.Table.from_arrays(pa_data, names=column_names)
+
+
+def timed(func, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return result, (time.perf_counter() - start) / repeat * 1000
+
+
+def main(rows_list, repeat):
+    from superset.db_engine_specs import BaseEngineSpec
+    from superset.result_set import SupersetResultSet
+
+    print(
+        "{:<10} {:>8} {:>12} {:>12} {:>8}".format(
+            "column", "rows", "legacy ms", "columns ms", "speedup"
+        )
+    )
+    for name, make_value in COLUMNS.items():
+        for rows in rows_list:
+            # three columns of the same kind per row
+            data = [tuple(make_value(i) for _ in range(3)) for i in range(rows)]
+            description = [(f"{name}_{i}", None) for i in range(3)]
+            _, legacy_ms = timed(
+                lambda: legacy_build_table(data, [col[0] for col in description]),
+                repeat,
+            )
+            _, columns_ms = timed(
+                lambda: SupersetResultSet(data, description, BaseEngineSpec), repeat
+            )
+            print(
+                "{:<10} {:>8} {:>12.1f} {:>12.1f} {:>7.1f}x".format(
+                    name, rows, legacy_ms, columns_ms, legacy_ms / columns_ms
+                )
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    with create_app().app_context():
+        main(args.rows, args.repeat)
@@ -0,0 +1,142 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+"""Estimate the chart cache hit rate brought by the predictive warmup strategy
+
+Replays the charts loaded over the last ``--days`` days, as logged in the Log
+table, against a simulated cache keeping each chart request (a chart and its
+extra filters) for ``--cache-timeout`` seconds. Without warmup, a load is a hit
+when the same request was loaded less than the timeout ago. With warmup, the
+``predictive`` strategy also runs ``--lead-time`` minutes before each hour, its
+demand profile built from the ``--train-weeks`` weeks of logs preceding the run.
+The first weeks of the period only train the profile. Usage:
+
+    python scripts/simulate_predictive_warmup.py --days 56 --top-n 50
+"""
+import argparse
+from collections import deque
+from datetime import datetime, timedelta
+
+from superset.app import create_app
+
+
+class SimulatedCache:
+    def __init__(self, timeout):
+        self.timeout = timedelta(seconds=timeout)
+        self.expiries = {}
+        self.hits = 0
+        self.loads = 0
+
+    def is_cached_until(self, request, dttm):
+        expiry = self.expiries.get(request)
+        return expiry is not None and expiry >= dttm
+
+    def load(self, request, dttm):
+        self.loads += 1
+        if self.is_cached_until(request, dttm):
+            self.hits += 1
+        else:
+            self.expiries[request] = dttm + self.timeout
+
+    @property
+    def hit_rate(self):
+        return self.hits / self.loads * 100 if self.loads else 0.0
+
+
+def simulate(requests, start, args):
+    from superset.tasks.cache import DemandProfile
+
+    profile = DemandProfile(args.train_weeks)
+    window = deque()
+    baseline = SimulatedCache(args.cache_timeout)
+    predictive = SimulatedCache(args.cache_timeout)
+    warmups = 0
+    next_run = start.replace(minute=0, second=0, microsecond=0) + timedelta(
+        hours=1, minutes=-args.lead_time
+    )
+
+    def run_strategy(run_dttm):
+        nonlocal warmups
+        while window and window[0][0] < run_dttm - timedelta(weeks=args.train_weeks):
+            dttm, request = window.popleft()
+            profile.add(dttm, request, count=-1)
+        peak = (run_dttm + timedelta(minutes=args.lead_time)).replace(
+            minute=0, second=0, microsecond=0
+        )
+        fresh_until = peak + timedelta(hours=1)
+        for request, _ in profile.predict(peak, args.top_n, args.min_hits):
+            if not predictive.is_cached_until(request, fresh_until):
+                predictive.expiries[request] = run_dttm + predictive.timeout
+                warmups += 1
+
+    for dttm, request in requests:
+        if dttm >= start:
+            while next_run <= dttm:
+                run_strategy(next_run)
+                next_run += timedelta(hours=1)
+            baseline.load(request, dttm)
+            predictive.load(request, dttm)
+        profile.add(dttm, request)
+        window.append((dttm, request))
+    return baseline, predictive, warmups
+
+
+def main(args):
+    from superset import db
+    from superset.tasks.cache import get_chart_requests
+
+    now = datetime.utcnow()
+    since = now - timedelta(days=args.days)
+    start = since + timedelta(weeks=args.train_weeks)
+    if start >= now:
+        raise SystemExit("--days must cover more than --train-weeks weeks")
+    baseline, predictive, warmups = simulate(
+        get_chart_requests(db.session, since), start, args
+    )
+    print(
+        "Replayed {} chart loads from {:%Y-%m-%d %H:%M} UTC".format(
+            baseline.loads, start
+        )
+    )
+    print("{:>12} {:>10} {:>10} {:>10}".format("mode", "hits", "hit rate", "warmups"))
+    print(
+        "{:>12} {:>10} {:>9.1f}% {:>10}".format(
+            "no warmup", baseline.hits, baseline.hit_rate, 0
+        )
+    )
+    print(
+        "{:>12} {:>10} {:>9.1f}% {:>10}".format(
+            "predictive", predictive.hits, predictive.hit_rate, warmups
+        )
+    )
+    print(
+        "Expected hit rate gain: {:+.1f} points".format(
+            predictive.hit_rate - baseline.hit_rate
+        )
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--days", type=int, default=56)
+    parser.add_argument("--train-weeks", type=int, default=4)
+    parser.add_argument("--top-n", type=int, default=50)
+    parser.add_argument("--lead-time", type=int, default=15)
+    parser.add_argument("--min-hits", type=float, default=1.0)
+    parser.add_argument("--cache-timeout", type=int, default=60 * 60 * 24)
+    args = parser.parse_args()
+    with create_app().app_context():
+        main(args)
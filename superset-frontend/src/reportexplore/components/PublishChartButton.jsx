@@ -42,6 +42,9 @@ import { getExploreUrlAndPayload } from '../exploreUtils';
 
 import ToastPresenter from '../../messageToasts/components/ToastPresenter';
 
+// publications run in the background, their status is polled this often (ms)
+const PUBLISH_STATUS_POLL_INTERVAL = 2000;
+
 const propTypes = {
   slice: PropTypes.object,
   role: PropTypes.string,
@@ -380,6 +383,11 @@ export default class PublishChartButton extends React.Component {
     console.log('Using API endpoint:', url);
 
     SupersetClient.post({ url, postPayload: { form_data: reportParams } }).then(({ json }) => {
+      if (json.publish_id) {
+        // the report is published by a background task
+        this.pollPublishStatus(json.publish_id)
+        return
+      }
       this.setState({
         reportStatus: json.report_status,
         submitting: false,
@@ -387,16 +395,43 @@ export default class PublishChartButton extends React.Component {
       })
       console.log("Successfully submitted for review")
     })
-    .catch(() => {
-      let toasts = [{
-        id: "sample",
-        toastType: "DANGER_TOAST",
-        text: "<h5>Report publish to portal is failed</h5>",
-        duration: 3000
-      }]
-      this.setState({ submitting: false, toasts })
-      console.log("Save failed::Submission")
-    });
+    .catch(() => this.publishFailed());
+  }
+
+  pollPublishStatus = (publishId) => {
+    SupersetClient.get({ url: `/reportapi/publish_status/${publishId}` }).then(({ json }) => {
+      if (json.status === 'success') {
+        this.setState({
+          reportStatus: json.report_status,
+          submitting: false,
+          publishedReportId: json.report_id
+        })
+        console.log("Successfully published")
+      } else if (json.status === 'failed') {
+        this.publishFailed()
+      } else {
+        this.publishStatusTimer = setTimeout(
+          () => this.pollPublishStatus(publishId),
+          PUBLISH_STATUS_POLL_INTERVAL,
+        )
+      }
+    })
+    .catch(() => this.publishFailed());
+  }
+
+  publishFailed = () => {
+    let toasts = [{
+      id: "sample",
+      toastType: "DANGER_TOAST",
+      text: "<h5>Report publish to portal is failed</h5>",
+      duration: 3000
+    }]
+    this.setState({ submitting: false, toasts })
+    console.log("Save failed::Submission")
+  }
+
+  componentWillUnmount() {
+    clearTimeout(this.publishStatusTimer)
   }
 
   rejectChart = () => {
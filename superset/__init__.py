@@ -50,4 +50,5 @@ results_backend = LocalProxy(lambda: results_backend_manager.results_backend)
 results_backend_use_msgpack = LocalProxy(
     lambda: results_backend_manager.should_use_msgpack
 )
+security_cache = LocalProxy(lambda: cache_manager.security_cache)
 tables_cache = LocalProxy(lambda: cache_manager.tables_cache)
@@ -15,7 +15,6 @@
 # specific language governing permissions and limitations
 # under the License.
 import logging
-import pickle as pkl
 from datetime import datetime, timedelta
 from typing import Any, ClassVar, Dict, List, Optional
 
@@ -27,13 +26,22 @@ from superset.connectors.base.models import BaseDatasource
 from superset.connectors.connector_registry import ConnectorRegistry
 from superset.stats_logger import BaseStatsLogger
 from superset.utils import core as utils
+from superset.utils.cache_serializers import BaseCacheSerializer
 from superset.utils.core import DTTM_ALIAS
+from superset.utils.single_flight import SingleFlight
 
 from .query_object import QueryObject
 
 config = app.config
 stats_logger: BaseStatsLogger = config["STATS_LOGGER"]
+cache_serializer: BaseCacheSerializer = config["DATA_CACHE_SERIALIZER"]
 logger = logging.getLogger(__name__)
+single_flight = SingleFlight(
+    cache,
+    wait_timeout=config["CHART_SINGLE_FLIGHT_WAIT_TIMEOUT"],
+    lock_timeout=config["CHART_SINGLE_FLIGHT_LOCK_TIMEOUT"],
+    stats_logger=stats_logger,
+)
 
 
 class QueryContext:
@@ -186,12 +194,16 @@ class QueryContext:
         status = None
         query = ""
         error_message = None
+        lease = None
         if cache_key and cache and not self.force:
             cache_value = cache.get(cache_key)
+            if not cache_value:
+                # other requests may be running the same query already
+                cache_value, lease = single_flight.get(cache_key, cache.get)
             if cache_value:
                 stats_logger.incr("loading_from_cache")
                 try:
-                    cache_value = pkl.loads(cache_value)
+                    cache_value = cache_serializer.loads(cache_value)
                     df = cache_value["df"]
                     query = cache_value["query"]
                     status = utils.QueryStatus.SUCCESS
@@ -226,7 +238,7 @@ class QueryContext:
             if is_loaded and cache_key and cache and status != utils.QueryStatus.FAILED:
                 try:
                     cache_value = dict(dttm=cached_dttm, df=df, query=query)
-                    cache_binary = pkl.dumps(cache_value, protocol=pkl.HIGHEST_PROTOCOL)
+                    cache_binary = cache_serializer.dumps(cache_value)
 
                     logger.info(
                         "Caching %d chars at key %s", len(cache_binary), cache_key
@@ -240,6 +252,8 @@ class QueryContext:
                     logger.warning("Could not cache key %s", cache_key)
                     logger.exception(e)
                     cache.delete(cache_key)
+        if lease:
+            lease.release()
         return {
             "cache_key": cache_key,
             "cached_dttm": cache_value["dttm"] if cache_value is not None else None,
@@ -36,6 +36,7 @@ from flask_appbuilder.security.manager import AUTH_DB
 
 from superset.stats_logger import DummyStatsLogger
 from superset.typing import CacheConfig
+from superset.utils.cache_serializers import BaseCacheSerializer, PickleCacheSerializer
 from superset.utils.log import DBEventLogger
 from superset.utils.logging_configurator import DefaultLoggingConfigurator
 
@@ -146,6 +147,21 @@ SQLALCHEMY_DATABASE_URI = 'postgresql://{}:{}@{}/superset'.format(os.environ["PG
 # SQLALCHEMY_CUSTOM_PASSWORD_STORE = lookup_password
 SQLALCHEMY_CUSTOM_PASSWORD_STORE = None
 
+# The queries of charts reuse pooled connections: one engine, with its pool of
+# connections, is kept per database and impersonated user. Set to False to open a
+# new connection for every query instead (NullPool).
+SQLALCHEMY_ENGINE_POOLING = True
+# Pool options of those engines, the `engine_params` of a database take precedence
+SQLALCHEMY_ENGINE_POOL_OPTIONS: Dict[str, Any] = {
+    "pool_size": 5,
+    "max_overflow": 10,
+    "pool_timeout": 30,
+    "pool_recycle": 3600,
+    "pool_pre_ping": True,
+}
+# The least recently used engines are disposed of past that number per process
+SQLALCHEMY_ENGINE_POOL_MAX_ENGINES = 100
+
 # The limit of queries fetched for query search
 QUERY_SEARCH_LIMIT = 1000
 
@@ -208,6 +224,28 @@ DRUID_IS_ACTIVE = True
 # connector.
 DRUID_METADATA_LINKS_ENABLED = True
 
+# Number of seconds the version reported by a Druid broker is cached for. Expired
+# entries are refreshed in the background while still being served.
+DRUID_VERSION_CACHE_TTL = 60 * 60
+
+# Queries sent to a Druid broker share a pool of keep-alive connections. Timeouts
+# are in seconds, failed connections and 502/503/504 responses are retried with
+# an exponential backoff. `query_workers` caps the number of chart queries a
+# process runs against the brokers at the same time.
+DRUID_BROKER_CLIENT_CONFIG: Dict[str, Any] = {
+    "pool_size": 10,
+    "connect_timeout": 10,
+    "read_timeout": 300,
+    "max_retries": 2,
+    "backoff_factor": 0.5,
+    "query_workers": 8,
+}
+
+# Number of seconds the results of the first phase of two phase Druid queries
+# (series limit) are shared between charts sending the same phase one query.
+# Set to 0 to always run phase one against the broker.
+DRUID_PRE_QUERY_CACHE_TIMEOUT = 60 * 5
+
 # ----------------------------------------------------
 # AUTHENTICATION CONFIG
 # ----------------------------------------------------
@@ -326,6 +364,59 @@ IMG_UPLOAD_URL = "/static/uploads/"
 CACHE_DEFAULT_TIMEOUT = 60 * 60 * 24
 CACHE_CONFIG: CacheConfig = {"CACHE_TYPE": "null"}
 TABLE_NAMES_CACHE_CONFIG: CacheConfig = {"CACHE_TYPE": "null"}
+# Keeps the permissions of the roles and the row level security filters across
+# requests, along with the versions invalidating them when they change. The
+# changes made through one process must reach all the others, so the backend has
+# to be shared (Redis, Memcached): with the "null" and "simple" backends, they are
+# only kept for the duration of a request. Each process also keeps the latest
+# permissions for SECURITY_CACHE_LOCAL_TIMEOUT seconds at most.
+SECURITY_CACHE_CONFIG: CacheConfig = {"CACHE_TYPE": "null"}
+SECURITY_CACHE_LOCAL_TIMEOUT = 60
+
+# Timeout of the dashboards and datasources payloads of the dashboard pages, kept
+# in the cache until the dashboard, its charts or their datasources change. The
+# "modified" labels of the charts can be this much out of date, and edits to a
+# datasource columns or metrics alone may be missed for as long. None disables
+# the cache.
+DASHBOARD_BOOTSTRAP_CACHE_TIMEOUT: Optional[int] = 60 * 5
+
+# Serializer used for the dataframes stored in the chart data cache. Pickling
+# is the default, the Arrow serializer stores frames in a columnar format that
+# is much faster to load back for large results. Blobs written by the pickle
+# serializer stay readable after switching, so this can be changed at any time.
+# from superset.utils.cache_serializers import ArrowCacheSerializer
+# DATA_CACHE_SERIALIZER = ArrowCacheSerializer(fmt="ipc", compression="lz4")
+DATA_CACHE_SERIALIZER: BaseCacheSerializer = PickleCacheSerializer()
+
+# Maximum number of extra chart queries (e.g. the time shifts of a line chart)
+# running at the same time in each web server process. Setting it to 1 runs
+# them one after the other.
+EXTRA_QUERIES_WORKERS = 4
+
+# The cache-warmup Celery task warms the charts up in parallel, with at most
+# this many charts being warmed up at the same time against each database.
+CACHE_WARMUP_MAX_CONCURRENCY_PER_DATABASE = 2
+
+# On a cache miss, a single request per chart cache key runs the query while the
+# other requests for the same key wait up to CHART_SINGLE_FLIGHT_WAIT_TIMEOUT
+# seconds for the result to be cached, instead of running the same query. The
+# lock is kept in the data cache (CACHE_CONFIG), so it is shared by the web
+# servers using a shared backend such as Redis, and expires after
+# CHART_SINGLE_FLIGHT_LOCK_TIMEOUT seconds should its holder die. It should
+# outlast the longest chart queries. A wait timeout of 0 disables the locks.
+CHART_SINGLE_FLIGHT_WAIT_TIMEOUT = 30
+CHART_SINGLE_FLIGHT_LOCK_TIMEOUT = 2 * SUPERSET_WEBSERVER_TIMEOUT
+
+# Time series charts (line charts, big numbers with trendline) grouped by a time
+# grain of a day or less can be cached by day of their time range, so that a
+# relative time range ("Last week") only queries its partial first and last
+# days, the days missing from the cache being queried in a single query. The
+# days are cached for TIME_BUCKET_CACHE_TIMEOUT seconds, once they ended at
+# least TIME_BUCKET_CACHE_SETTLE_DELAY seconds ago, late data having landed by
+# then. Only the time ranges excluding their end ([start, end) time range
+# endpoints) are cached by day. None disables the day cache.
+TIME_BUCKET_CACHE_TIMEOUT: Optional[int] = None
+TIME_BUCKET_CACHE_SETTLE_DELAY = 60 * 60 * 24
 
 # CORS Options
 ENABLE_CORS = False
@@ -347,6 +438,12 @@ ALLOWED_EXTENSIONS = {"csv", "tsv"}
 # note: index option should not be overridden
 CSV_EXPORT = {"encoding": "utf-8"}
 
+# CSV exports are streamed to the browser by chunks of this many rows, read from
+# a server side cursor when the database supports it. When CSV_EXPORT_GZIP is set
+# the stream is gzip compressed for the browsers accepting it.
+CSV_EXPORT_CHUNK_SIZE = 10000
+CSV_EXPORT_GZIP = False
+
 # ---------------------------------------------------
 # Time grain configurations
 # ---------------------------------------------------
@@ -498,6 +595,31 @@ CELERY_CONFIG = CeleryConfig  # pylint: disable=invalid-name
 # Set celery config to None to disable all the above configuration
 # CELERY_CONFIG = None
 
+# The reports are published to the analytics API and then to the portal by a
+# Celery task. A failed step is retried REPORT_PUBLISH_MAX_RETRIES times, after
+# REPORT_PUBLISH_RETRY_BACKOFF seconds and then twice as long on each attempt.
+# The progress of the latest publication of each report chart is kept on its row
+# in the metadata database. A publication which made no progress for
+# REPORT_PUBLISH_STATUS_TIMEOUT seconds is considered lost (e.g. along with its
+# worker), and no longer prevents publishing the report again.
+REPORT_PUBLISH_MAX_RETRIES = 5
+REPORT_PUBLISH_RETRY_BACKOFF = 2
+REPORT_PUBLISH_STATUS_TIMEOUT = 60 * 60
+
+# The analytics and portal APIs are called through a pool of keep-alive
+# connections. Timeouts are in seconds, failed GETs are retried with a jittered
+# exponential backoff. After `failure_threshold` consecutive failures the calls
+# to an API fail fast for `reset_timeout` seconds.
+REPORT_API_CLIENT_CONFIG: Dict[str, Any] = {
+    "pool_size": 10,
+    "connect_timeout": 5,
+    "read_timeout": 60,
+    "max_retries": 2,
+    "backoff_factor": 0.5,
+    "failure_threshold": 5,
+    "reset_timeout": 30,
+}
+
 # Additional static HTTP headers to be served by your Superset server. Note
 # Flask-Talisman applies the relevant security HTTP headers.
 #
@@ -533,6 +655,10 @@ SQLLAB_QUERY_COST_ESTIMATE_TIMEOUT = 10  # seconds
 # Flag that controls if limit should be enforced on the CTA (create table as queries).
 SQLLAB_CTAS_NO_LIMIT = False
 
+# Whether SQL Lab queries use the pooled engines as well. Statements changing the
+# state of a session (SET, temporary tables...) would then outlive the query.
+SQLLAB_ENGINE_POOLING = False
+
 # This allows you to define custom logic around the "CREATE TABLE AS" or CTAS feature
 # in SQL Lab that defines where the target schema should be for a given user.
 # Database `CTAS Schema` has a precedence over this setting.
@@ -567,6 +693,15 @@ RESULTS_BACKEND = None
 # in order to disable should breaking issues be discovered.
 RESULTS_BACKEND_USE_MSGPACK = True
 
+# When using PyArrow, the results of SQL Lab queries are stored as Arrow record
+# batches of that many rows, so that pages of results and CSV exports only read
+# the batches they need. Set to 0 to store the results as a single blob.
+RESULTS_BACKEND_BATCH_SIZE = 10000
+
+# Compression of the record batches stored in the results backend, one of
+# "zlib", "lz4" or "zstd". lz4 and zstd require a PyArrow build supporting them.
+RESULTS_BACKEND_COMPRESSION = "zlib"
+
 # The S3 bucket where you want to store your external hive tables created
 # from CSV files. For example, 'companyname-superset'
 CSV_TO_HIVE_UPLOAD_S3_BUCKET = None
@@ -646,6 +781,20 @@ TRACKING_URL_TRANSFORMER = lambda x: x
 # Interval between consecutive polls when using Hive Engine
 HIVE_POLL_INTERVAL = 5
 
+# Running Hive and Presto queries are polled every `min_interval` seconds, up to
+# `max_interval` seconds (`backoff` times longer on each poll) while their progress
+# doesn't move. Progress is written once it moved by `progress_threshold` percent.
+# Stop requests are shared through the cache (see CACHE_CONFIG), the status of
+# the query is only read from the database every `stop_check_interval` seconds.
+# Hive polls every HIVE_POLL_INTERVAL seconds at first.
+SQLLAB_POLLING_CONFIG: Dict[str, Any] = {
+    "min_interval": 1,
+    "max_interval": 10,
+    "backoff": 1.5,
+    "progress_threshold": 5,
+    "stop_check_interval": 10,
+}
+
 # Allow for javascript controls components
 # this enables programmers to customize certain charts (like the
 # geospatial ones) by inputing javascript in controls. This exposes
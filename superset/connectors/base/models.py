@@ -15,17 +15,19 @@
 # specific language governing permissions and limitations
 # under the License.
 import json
-from typing import Any, Dict, Hashable, List, Optional, Type
+from typing import Any, Dict, Hashable, Iterator, List, Optional, Type
 
+import pandas as pd
 from flask_appbuilder.security.sqla.models import User
 from sqlalchemy import and_, Boolean, Column, Integer, String, Text
 from sqlalchemy.ext.declarative import declared_attr
 from sqlalchemy.orm import foreign, Query, relationship
 
 from superset.constants import NULL_STRING
+from superset.exceptions import SupersetException
 from superset.models.helpers import AuditMixinNullable, ImportMixin, QueryResult
 from superset.models.slice import Slice
-from superset.utils import core as utils
+from superset.utils import core as utils, csv
 
 METRIC_FORM_DATA_PARAMS = [
     "metric",
@@ -71,6 +73,9 @@ class BaseDatasource(
     # Used to do code highlighting when displaying the query in the UI
     query_language: Optional[str] = None
 
+    # Whether ``query_batch`` can run several queries in one round trip
+    supports_query_batch = False
+
     name = None  # can be a Column or a property pointing to one
 
     # ---------------------------------------------------------------
@@ -349,6 +354,27 @@ class BaseDatasource(
         """
         raise NotImplementedError()
 
+    def query_chunks(
+        self, query_obj: Dict[str, Any], chunk_size: int
+    ) -> Iterator[pd.DataFrame]:
+        """Executes the query and yields its results by dataframes of at most
+        ``chunk_size`` rows, used to export large results
+
+        Raises an exception when the query fails.
+        """
+        result = self.query(query_obj)
+        if result.status == utils.QueryStatus.FAILED:
+            raise SupersetException(result.error_message)
+        yield from csv.split_df(result.df, chunk_size)
+
+    def query_batch(self, query_objs: List[Dict[str, Any]]) -> List[QueryResult]:
+        """Executes several queries in a single round trip
+
+        Returns one ``superset.models.helpers.QueryResult`` per query object, in
+        the same order. Only used when ``supports_query_batch`` is set.
+        """
+        raise NotImplementedError()
+
     def values_for_column(self, column_name: str, limit: int = 10000) -> List:
         """Given a column, returns an iterable of distinct values
 
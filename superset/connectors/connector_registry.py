@@ -15,7 +15,7 @@
 # specific language governing permissions and limitations
 # under the License.
 from collections import OrderedDict
-from typing import Dict, List, Optional, Set, Type, TYPE_CHECKING
+from typing import Dict, Iterable, List, Optional, Set, Type, TYPE_CHECKING
 
 from sqlalchemy import or_
 from sqlalchemy.orm import Session, subqueryload
@@ -112,6 +112,28 @@ class ConnectorRegistry:
             .one()
         )
 
+    @classmethod
+    def get_datasources(
+        cls,
+        session: Session,
+        datasource_type: str,
+        datasource_ids: Iterable[int],
+        eager: bool = False,
+    ) -> List["BaseDatasource"]:
+        """Returns the datasources of a type, with columns, metrics and owners
+        when eager, in a fixed number of queries."""
+        datasource_class = ConnectorRegistry.sources[datasource_type]
+        qry = session.query(datasource_class).filter(
+            datasource_class.id.in_(list(datasource_ids))
+        )
+        if eager:
+            qry = qry.options(
+                subqueryload(datasource_class.columns),
+                subqueryload(datasource_class.metrics),
+                subqueryload(datasource_class.owners),
+            )
+        return qry.all()
+
     @classmethod
     def query_datasources_by_name(
         cls,
@@ -0,0 +1,157 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+"""Connection pooled HTTP access to the Druid brokers
+
+PyDruid opens a new ``urllib`` connection for every query. Here the queries go
+through one ``requests.Session`` per broker instead, so that the TCP and TLS
+connections are kept alive and reused across queries and threads. PyDruid
+clients are not thread-safe (they hold the last query and its results), so a new
+lightweight client is still created per query, only the session is shared.
+
+The final query of each chart runs in a bounded pool of threads, which caps the
+number of heavy queries a single web server process sends to the brokers.
+"""
+import json
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+try:
+    from pydruid.client import PyDruid
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+except ImportError:
+    pass
+
+DEFAULT_BROKER_CLIENT_CONFIG: Dict[str, Any] = {
+    "pool_size": 10,
+    "connect_timeout": 10,
+    "read_timeout": 300,
+    "max_retries": 2,
+    "backoff_factor": 0.5,
+    "query_workers": 8,
+}
+
+_sessions: Dict[str, "requests.Session"] = {}
+_sessions_lock = threading.Lock()
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def get_broker_session(
+    base_url: str, config: Optional[Dict[str, Any]] = None
+) -> "requests.Session":
+    """Returns the session shared by all the queries sent to ``base_url``"""
+    with _sessions_lock:
+        session = _sessions.get(base_url)
+        if session is None:
+            config = {**DEFAULT_BROKER_CLIENT_CONFIG, **(config or {})}
+            # Druid native queries are read only, so they can safely be retried
+            retries = Retry(
+                total=config["max_retries"],
+                backoff_factor=config["backoff_factor"],
+                status_forcelist=(502, 503, 504),
+                method_whitelist=frozenset(["GET", "POST"]),
+                raise_on_status=False,
+            )
+            adapter = HTTPAdapter(
+                pool_connections=config["pool_size"],
+                pool_maxsize=config["pool_size"],
+                max_retries=retries,
+            )
+            session = requests.Session()
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _sessions[base_url] = session
+        return session
+
+
+def close_broker_sessions() -> None:
+    """Closes all the pooled connections, the sessions are recreated on demand"""
+    with _sessions_lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
+
+
+def run_in_query_pool(
+    func: Callable, config: Optional[Dict[str, Any]] = None, **kwargs: Any
+) -> Any:
+    """Runs ``func(**kwargs)`` in the bounded query pool and waits for its result"""
+    global _executor  # pylint: disable=global-statement
+    with _sessions_lock:
+        if _executor is None:
+            config = {**DEFAULT_BROKER_CLIENT_CONFIG, **(config or {})}
+            _executor = ThreadPoolExecutor(
+                max_workers=config["query_workers"], thread_name_prefix="druid-query"
+            )
+    return _executor.submit(func, **kwargs).result()
+
+
+def get_timeout(config: Optional[Dict[str, Any]] = None) -> Tuple[float, float]:
+    config = {**DEFAULT_BROKER_CLIENT_CONFIG, **(config or {})}
+    return config["connect_timeout"], config["read_timeout"]
+
+
+try:
+    # PyDruid might not have been imported.
+    class PooledPyDruid(PyDruid):
+        """PyDruid client posting its queries through a shared session"""
+
+        def __init__(
+            self,
+            url: str,
+            endpoint: str,
+            session: "requests.Session",
+            timeout: Tuple[float, float],
+        ) -> None:
+            super().__init__(url, endpoint)
+            self.session = session
+            self.timeout = timeout
+
+        def _post(self, query):
+            headers, querystr, url = self._prepare_url_headers_and_body(query)
+            response = self.session.post(
+                url,
+                data=querystr,
+                headers=headers,
+                proxies=self.proxies,
+                timeout=self.timeout,
+            )
+            if not response.ok:
+                try:
+                    err = response.json()
+                except ValueError:
+                    err = response.text
+                # same error PyDruid raises so that callers don't need to know
+                # which client ran the query
+                raise IOError(
+                    "{0} \n Druid Error: {1} \n Query is: {2}".format(
+                        response.status_code,
+                        err,
+                        json.dumps(query.query_dict, indent=4, sort_keys=True),
+                    )
+                )
+            query.parse(response.text)
+            return query
+
+
+except NameError:
+    pass
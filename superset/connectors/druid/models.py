@@ -22,9 +22,8 @@ import re
 from collections import OrderedDict
 from copy import deepcopy
 from datetime import datetime, timedelta
-from distutils.version import LooseVersion
 from multiprocessing.pool import ThreadPool
-from typing import Dict, Iterable, List, Optional, Set, Tuple, Union
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple, Union
 
 import pandas as pd
 import sqlalchemy as sa
@@ -48,8 +47,22 @@ from sqlalchemy import (
 from sqlalchemy.orm import backref, relationship, Session
 from sqlalchemy_utils import EncryptedType
 
-from superset import conf, db, security_manager
+from superset import cache, conf, db, security_manager
 from superset.connectors.base.models import BaseColumn, BaseDatasource, BaseMetric
+from superset.connectors.druid.broker_client import (
+    get_broker_session,
+    get_timeout,
+    run_in_query_pool,
+)
+from superset.connectors.druid.pre_query_cache import (
+    get_pre_query_cache_key,
+    pre_query_cache,
+)
+from superset.connectors.druid.query_plan import DruidQueryPlanClient
+from superset.connectors.druid.version_cache import (
+    druid_version_cache,
+    DruidVersionInfo,
+)
 from superset.constants import NULL_STRING
 from superset.exceptions import SupersetException
 from superset.models.core import Database
@@ -58,6 +71,7 @@ from superset.utils import core as utils, import_datasource
 
 try:
     from pydruid.client import PyDruid
+    from pydruid.query import QueryBuilder
     from pydruid.utils.aggregators import count
     from pydruid.utils.dimensions import (
         MapLookupExtraction,
@@ -76,6 +90,8 @@ try:
         Quantiles,
     )
     import requests
+
+    from superset.connectors.druid.broker_client import PooledPyDruid
 except ImportError:
     pass
 
@@ -170,28 +186,80 @@ class DruidCluster(Model, AuditMixinNullable, ImportMixin):
         base_url = self.get_base_url(self.broker_host, self.broker_port)
         return f"{base_url}/{self.broker_endpoint}"
 
+    def get_broker_session(self) -> "requests.Session":
+        return get_broker_session(
+            self.get_base_url(self.broker_host, self.broker_port),
+            conf["DRUID_BROKER_CLIENT_CONFIG"],
+        )
+
     def get_pydruid_client(self) -> "PyDruid":
-        cli = PyDruid(
-            self.get_base_url(self.broker_host, self.broker_port), self.broker_endpoint
+        cli = PooledPyDruid(
+            self.get_base_url(self.broker_host, self.broker_port),
+            self.broker_endpoint,
+            session=self.get_broker_session(),
+            timeout=get_timeout(conf["DRUID_BROKER_CLIENT_CONFIG"]),
         )
         if self.broker_user and self.broker_pass:
             cli.set_basic_auth_credentials(self.broker_user, self.broker_pass)
         return cli
 
-    def get_datasources(self) -> List[str]:
-        endpoint = self.get_base_broker_url() + "/datasources"
+    def broker_get(self, endpoint: str) -> Dict:
         auth = requests.auth.HTTPBasicAuth(self.broker_user, self.broker_pass)
-        return json.loads(requests.get(endpoint, auth=auth).text)
+        response = self.get_broker_session().get(
+            endpoint, auth=auth, timeout=get_timeout(conf["DRUID_BROKER_CLIENT_CONFIG"])
+        )
+        return json.loads(response.text)
+
+    def get_datasources(self) -> List[str]:
+        return self.broker_get(self.get_base_broker_url() + "/datasources")
 
     def get_druid_version(self) -> str:
-        endpoint = self.get_base_url(self.broker_host, self.broker_port) + "/status"
+        return self.get_druid_version_fetcher()()
+
+    def get_druid_version_fetcher(self) -> Callable[[], str]:
+        """Returns a callable asking the broker for its version
+
+        The values of the cluster are read here, on the calling thread: the
+        version cache may call it from a background thread, which must not
+        touch this instance bound to the session of the request.
+        """
+        base_url = self.get_base_url(self.broker_host, self.broker_port)
         auth = requests.auth.HTTPBasicAuth(self.broker_user, self.broker_pass)
-        return json.loads(requests.get(endpoint, auth=auth).text)["version"]
+        config = conf["DRUID_BROKER_CLIENT_CONFIG"]
+
+        def fetch() -> str:
+            response = get_broker_session(base_url, config).get(
+                base_url + "/status", auth=auth, timeout=get_timeout(config)
+            )
+            return json.loads(response.text)["version"]
+
+        return fetch
+
+    @property
+    def version_cache_key(self) -> Tuple:
+        # changed_on is part of the key so that edits made from another process
+        # are picked up without waiting for the entry to expire
+        return (
+            self.id,
+            self.get_base_url(self.broker_host, self.broker_port),
+            self.changed_on,
+        )
+
+    def get_druid_version_info(self) -> DruidVersionInfo:
+        return druid_version_cache.get(
+            self.version_cache_key,
+            self.get_druid_version_fetcher(),
+            ttl=conf["DRUID_VERSION_CACHE_TTL"],
+            stats_logger=conf["STATS_LOGGER"],
+        )
 
-    @property  # type: ignore
-    @utils.memoized
+    @property
     def druid_version(self) -> str:
-        return self.get_druid_version()
+        return self.get_druid_version_info().version
+
+    @property
+    def druid_capabilities(self) -> Dict[str, bool]:
+        return self.get_druid_version_info().capabilities
 
     def refresh_datasources(
         self,
@@ -295,8 +363,14 @@ class DruidCluster(Model, AuditMixinNullable, ImportMixin):
         return self.verbose_name or self.cluster_name
 
 
+def invalidate_druid_version(mapper, connection, target: DruidCluster) -> None:
+    druid_version_cache.invalidate(target.id)
+
+
 sa.event.listen(DruidCluster, "after_insert", security_manager.set_perm)
 sa.event.listen(DruidCluster, "after_update", security_manager.set_perm)
+sa.event.listen(DruidCluster, "after_update", invalidate_druid_version)
+sa.event.listen(DruidCluster, "after_delete", invalidate_druid_version)
 
 
 class DruidColumn(Model, BaseColumn):
@@ -645,7 +719,7 @@ class DruidDatasource(Model, BaseDatasource):
         # realtime segments, which triggered a bug (fixed in druid 0.8.2).
         # https://groups.google.com/forum/#!topic/druid-user/gVCqqspHqOQ
         lbound = (max_time - timedelta(days=7)).isoformat()
-        if LooseVersion(self.cluster.druid_version) < LooseVersion("0.8.2"):
+        if not self.cluster.druid_capabilities["realtime_segment_metadata"]:
             rbound = (max_time - timedelta(1)).isoformat()
         else:
             rbound = max_time.isoformat()
@@ -663,7 +737,7 @@ class DruidDatasource(Model, BaseDatasource):
         if not segment_metadata:
             # if no segments in the past 7 days, look at all segments
             lbound = datetime(1901, 1, 1).isoformat()[:10]
-            if LooseVersion(self.cluster.druid_version) < LooseVersion("0.8.2"):
+            if not self.cluster.druid_capabilities["realtime_segment_metadata"]:
                 rbound = datetime.now().isoformat()
             else:
                 rbound = datetime(2050, 1, 1).isoformat()[:10]
@@ -989,47 +1063,82 @@ class DruidDatasource(Model, BaseDatasource):
         return df[column_name].to_list()
 
     def get_query_str(self, query_obj, phase=1, client=None):
-        return self.run_query(client=client, phase=phase, **query_obj)
+        """Renders the queries, only running them against the broker when a
+        client is given"""
+        return self.run_query(
+            client=client or DruidQueryPlanClient(), phase=phase, **query_obj
+        )
+
+    def get_query_plan(self, query_obj: Dict, phase: int = 2) -> List[Dict]:
+        """Returns the native queries of each phase, without any network call"""
+        client = DruidQueryPlanClient()
+        self.run_query(client=client, phase=phase, **query_obj)
+        return client.queries
+
+    @staticmethod
+    def _pre_query_dimension_filter(dim: Union[str, Dict], values: List) -> "Filter":
+        """Returns a filter matching any of ``values`` on the dimension ``dim``"""
+        extraction_fn = None
+        if isinstance(dim, dict) and "extractionFn" in dim:
+            (col, extraction_fn) = DruidDatasource._create_extraction_fn(dim)
+        elif isinstance(dim, dict):
+            col = dim["outputName"]
+        else:
+            col = dim
+        if len(values) == 1:
+            return Filter(
+                dimension=col, value=values[0], extraction_function=extraction_fn
+            )
+        return Filter(
+            type="in", dimension=col, values=values, extraction_function=extraction_fn
+        )
 
     def _add_filter_from_pre_query_data(self, df: pd.DataFrame, dimensions, dim_filter):
+        """Restricts the phase two query to the series returned by phase one
+
+        A single dimension becomes one ``in`` filter. With several dimensions the
+        distinct combinations are grouped by all but the last dimension, so each
+        group is an ``and`` of selectors plus one ``in`` filter on the last one.
+        """
         ret = dim_filter
-        if not df.empty:
+        if df.empty:
+            return ret
+
+        dims: Dict[str, Union[str, Dict]] = OrderedDict()
+        for dim in dimensions:
+            col = dim.get("outputName") if isinstance(dim, dict) else dim
+            if col and col not in dims:
+                dims[col] = dim
+        if not dims:
+            return ret
+
+        columns = list(dims.keys())
+        df = df[columns].drop_duplicates()
+        df = df.astype(object).where(pd.notnull(df), None)
+        if len(columns) == 1:
+            col = columns[0]
+            ff = self._pre_query_dimension_filter(dims[col], df[col].tolist())
+        else:
+            *prefix_cols, last_col = columns
+            groups: Dict[Tuple, List] = OrderedDict()
+            for row in df.itertuples(index=False, name=None):
+                groups.setdefault(row[:-1], []).append(row[-1])
             new_filters = []
-            for unused, row in df.iterrows():
-                fields = []
-                for dim in dimensions:
-                    f = None
-                    # Check if this dimension uses an extraction function
-                    # If so, create the appropriate pydruid extraction object
-                    if isinstance(dim, dict) and "extractionFn" in dim:
-                        (col, extraction_fn) = DruidDatasource._create_extraction_fn(
-                            dim
-                        )
-                        dim_val = dim["outputName"]
-                        f = Filter(
-                            dimension=col,
-                            value=row[dim_val],
-                            extraction_function=extraction_fn,
-                        )
-                    elif isinstance(dim, dict):
-                        dim_val = dim["outputName"]
-                        if dim_val:
-                            f = Dimension(dim_val) == row[dim_val]
-                    else:
-                        f = Dimension(dim) == row[dim]
-                    if f:
-                        fields.append(f)
-                if len(fields) > 1:
-                    term = Filter(type="and", fields=fields)
-                    new_filters.append(term)
-                elif fields:
-                    new_filters.append(fields[0])
-            if new_filters:
+            for prefix, values in groups.items():
+                fields = [
+                    self._pre_query_dimension_filter(dims[col], [value])
+                    for col, value in zip(prefix_cols, prefix)
+                ]
+                fields.append(self._pre_query_dimension_filter(dims[last_col], values))
+                new_filters.append(Filter(type="and", fields=fields))
+            if len(new_filters) > 1:
                 ff = Filter(type="or", fields=new_filters)
-                if not dim_filter:
-                    ret = ff
-                else:
-                    ret = Filter(type="and", fields=[ff, dim_filter])
+            else:
+                ff = new_filters[0]
+        if not dim_filter:
+            ret = ff
+        else:
+            ret = Filter(type="and", fields=[ff, dim_filter])
         return ret
 
     @staticmethod
@@ -1134,6 +1243,50 @@ class DruidDatasource(Model, BaseDatasource):
         ):
             metric["column"]["type"] = "DOUBLE"
 
+    def supports_float_aggregators(self, fetch_version: bool = True) -> bool:
+        """Whether FLOAT adhoc metrics can be sent as is
+
+        Without ``fetch_version`` the broker is not asked for its version, one
+        that is not known yet is assumed to be recent.
+        """
+        if not self.cluster:
+            return True
+        if fetch_version:
+            return self.cluster.druid_capabilities["float_aggregators"]
+        info = druid_version_cache.peek(self.cluster.version_cache_key)
+        return info.capabilities["float_aggregators"] if info else True
+
+    def run_pre_query(self, client, query_type: str, pre_qry: Dict) -> pd.DataFrame:
+        """Runs the phase one query of a two phase query
+
+        Results are shared with the charts running the same phase one query for
+        ``DRUID_PRE_QUERY_CACHE_TIMEOUT`` seconds. Whether they came from the
+        broker or not, ``client.query_builder.last_query`` is the phase one query
+        once this returns.
+        """
+
+        def run() -> pd.DataFrame:
+            getattr(client, query_type)(**pre_qry)
+            df = client.export_pandas()
+            return df if df is not None else pd.DataFrame()
+
+        timeout = conf["DRUID_PRE_QUERY_CACHE_TIMEOUT"]
+        if not self.cluster or not timeout or isinstance(client, DruidQueryPlanClient):
+            return run()
+
+        query_dict = getattr(QueryBuilder(), query_type)(pre_qry).query_dict
+        key = get_pre_query_cache_key(self.cluster.get_base_broker_url(), query_dict)
+        df = pre_query_cache.get_or_run(
+            key,
+            run,
+            cache=cache,
+            serializer=conf["DATA_CACHE_SERIALIZER"],
+            timeout=timeout,
+            stats_logger=conf["STATS_LOGGER"],
+        )
+        getattr(client.query_builder, query_type)(pre_qry)
+        return df
+
     def run_query(  # druid
         self,
         groupby,
@@ -1159,6 +1312,7 @@ class DruidDatasource(Model, BaseDatasource):
         """
         # TODO refactor into using a TBD Query object
         client = client or self.cluster.get_pydruid_client()
+        dry_run = isinstance(client, DruidQueryPlanClient)
         row_limit = row_limit or conf.get("ROW_LIMIT")
 
         if not is_timeseries:
@@ -1172,12 +1326,18 @@ class DruidDatasource(Model, BaseDatasource):
         timezone = from_dttm.replace(tzinfo=DRUID_TZ).tzname() if from_dttm else None
 
         query_str = ""
+        query_pool_config = conf["DRUID_BROKER_CLIENT_CONFIG"]
+
+        def execute(func, **kwargs):
+            if dry_run:
+                # building the query doesn't need a slot in the query pool
+                return func(**kwargs)
+            return run_in_query_pool(func, query_pool_config, **kwargs)
+
         metrics_dict = {m.metric_name: m for m in self.metrics}
         columns_dict = {c.column_name: c for c in self.columns}
 
-        if self.cluster and LooseVersion(
-            self.cluster.get_druid_version()
-        ) < LooseVersion("0.11.0"):
+        if not self.supports_float_aggregators(fetch_version=not dry_run):
             for metric in metrics:
                 self.sanitize_metric_object(metric)
             self.sanitize_metric_object(timeseries_limit_metric)
@@ -1222,11 +1382,11 @@ class DruidDatasource(Model, BaseDatasource):
             qry["metrics"] = []
             qry["granularity"] = "all"
             qry["limit"] = row_limit
-            client.scan(**qry)
+            execute(client.scan, **qry)
         elif len(groupby) == 0 and not having_filters:
             logger.info("Running timeseries query for no groupby values")
             del qry["dimensions"]
-            client.timeseries(**qry)
+            execute(client.timeseries, **qry)
         elif not having_filters and len(groupby) == 1 and order_desc:
             dim = list(qry["dimensions"])[0]
             logger.info("Running two-phase topn query for dimension [{}]".format(dim))
@@ -1253,7 +1413,7 @@ class DruidDatasource(Model, BaseDatasource):
             pre_qry["dimension"] = self._dimensions_to_values(qry.get("dimensions"))[0]
             del pre_qry["dimensions"]
 
-            client.topn(**pre_qry)
+            df = self.run_pre_query(client, "topn", pre_qry)
             logger.info("Phase 1 Complete")
             if phase == 2:
                 query_str += "// Two phase query\n// Phase 1\n"
@@ -1264,9 +1424,6 @@ class DruidDatasource(Model, BaseDatasource):
             if phase == 1:
                 return query_str
             query_str += "// Phase 2 (built based on phase one's results)\n"
-            df = client.export_pandas()
-            if df is None:
-                df = pd.DataFrame()
             qry["filter"] = self._add_filter_from_pre_query_data(
                 df, [pre_qry["dimension"]], filters
             )
@@ -1276,7 +1433,7 @@ class DruidDatasource(Model, BaseDatasource):
             qry["dimension"] = dim
             del qry["dimensions"]
             qry["metric"] = list(qry["aggregations"].keys())[0]
-            client.topn(**qry)
+            execute(client.topn, **qry)
             logger.info("Phase 2 Complete")
         elif len(groupby) > 0 or having_filters:
             # If grouping on multiple fields or using a having filter
@@ -1324,7 +1481,7 @@ class DruidDatasource(Model, BaseDatasource):
                     ),
                     "columns": [{"dimension": order_by, "direction": order_direction}],
                 }
-                client.groupby(**pre_qry)
+                df = self.run_pre_query(client, "groupby", pre_qry)
                 logger.info("Phase 1 Complete")
                 query_str += "// Two phase query\n// Phase 1\n"
                 query_str += json.dumps(
@@ -1334,9 +1491,6 @@ class DruidDatasource(Model, BaseDatasource):
                 if phase == 1:
                     return query_str
                 query_str += "// Phase 2 (built based on phase one's results)\n"
-                df = client.export_pandas()
-                if df is None:
-                    df = pd.DataFrame()
                 qry["filter"] = self._add_filter_from_pre_query_data(
                     df, pre_qry["dimensions"], filters
                 )
@@ -1357,7 +1511,7 @@ class DruidDatasource(Model, BaseDatasource):
                         }
                     ],
                 }
-            client.groupby(**qry)
+            execute(client.groupby, **qry)
             logger.info("Query Complete")
         query_str += json.dumps(client.query_builder.last_query.query_dict, indent=2)
         return query_str
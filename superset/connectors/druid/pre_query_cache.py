@@ -0,0 +1,113 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+"""Shared results of the phase one Druid queries
+
+Charts of a dashboard often share their filters, intervals and series limit, in
+which case their two phase queries start with the exact same topN/groupBy. The
+phase one results are kept in the cache backend for a short while, keyed by the
+native query, and identical phase one queries running at the same time in this
+process wait for the first one instead of hitting the broker again.
+"""
+import hashlib
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Optional
+
+import pandas as pd
+import simplejson as json
+
+logger = logging.getLogger(__name__)
+
+
+def get_pre_query_cache_key(broker_url: str, query_dict: Dict[str, Any]) -> str:
+    json_data = json.dumps(query_dict, sort_keys=True, default=str)
+    digest = hashlib.md5(f"{broker_url}:{json_data}".encode("utf-8")).hexdigest()
+    return f"druid_pre_query_{digest}"
+
+
+class PreQueryCache:
+    """Cache and in-flight registry of phase one query results"""
+
+    def __init__(self) -> None:
+        self._in_flight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def get_or_run(  # pylint: disable=too-many-arguments
+        self,
+        key: str,
+        run: Callable[[], pd.DataFrame],
+        cache: Optional[Any],
+        serializer: Any,
+        timeout: int,
+        stats_logger: Optional[Any] = None,
+    ) -> pd.DataFrame:
+        """Returns the phase one dataframe, running ``run`` only when needed
+
+        :param key: see ``get_pre_query_cache_key``
+        :param run: executes the query against the broker
+        :param cache: the cache backend, results aren't shared across processes
+            when it is ``None``
+        :param serializer: the chart data cache serializer
+        :param timeout: number of seconds the results are cached for
+        :param stats_logger: receives the hit/miss/coalesced counters
+        """
+        if cache:
+            blob = cache.get(key)
+            if blob:
+                try:
+                    df = serializer.loads(blob)["df"]
+                    if stats_logger:
+                        stats_logger.incr("druid_pre_query_cache_hit")
+                    return df
+                except Exception as e:  # pylint: disable=broad-except
+                    logger.exception(e)
+
+        with self._lock:
+            future = self._in_flight.get(key)
+            is_owner = future is None
+            if is_owner:
+                future = Future()
+                self._in_flight[key] = future
+
+        if not is_owner:
+            if stats_logger:
+                stats_logger.incr("druid_pre_query_coalesced")
+            return future.result()
+
+        if stats_logger:
+            stats_logger.incr("druid_pre_query_cache_miss")
+        try:
+            df = run()
+            future.set_result(df)
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+
+        if cache:
+            try:
+                cache.set(key, serializer.dumps({"df": df}), timeout=timeout)
+            except Exception as e:  # pylint: disable=broad-except
+                logger.warning("Could not cache key %s", key)
+                logger.exception(e)
+        return df
+
+
+pre_query_cache = PreQueryCache()
@@ -0,0 +1,56 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+"""Renders the native Druid queries of a chart without running them
+
+``DruidDatasource.run_query`` builds the queries through a PyDruid client. Given
+a ``DruidQueryPlanClient`` instead, the queries are only built and recorded,
+nothing is sent to the broker. Phase one queries return no rows, so the phase
+two query of a two phase query keeps the chart filters only, the series phase
+one would have selected cannot be known without running it.
+"""
+from typing import Any, Dict, List
+
+import pandas as pd
+
+try:
+    from pydruid.client import BaseDruidClient
+except ImportError:
+    pass
+
+try:
+    # PyDruid might not have been imported.
+    class DruidQueryPlanClient(BaseDruidClient):
+        """PyDruid client recording the queries it is asked to run"""
+
+        def __init__(self) -> None:
+            super().__init__(url="", endpoint="")
+            self.queries: List[Dict[str, Any]] = []
+
+        def scan(self, **kwargs: Any) -> Any:
+            query = self.query_builder.scan(kwargs)
+            return self._post(query)
+
+        def _post(self, query):
+            self.queries.append(query.query_dict)
+            return query
+
+        def export_pandas(self) -> pd.DataFrame:
+            return pd.DataFrame()
+
+
+except NameError:
+    pass
@@ -0,0 +1,139 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+"""Process wide cache of the Druid broker versions
+
+Asking the broker for its version is a blocking HTTP call to ``/status``, so the
+version (and the capabilities derived from it) is kept per cluster for
+``DRUID_VERSION_CACHE_TTL`` seconds. Once an entry is expired it keeps being
+served while a background thread fetches the new version, so only the very first
+query against a cluster has to wait for the broker.
+"""
+import logging
+import threading
+import time
+from distutils.version import LooseVersion
+from typing import Any, Callable, Dict, NamedTuple, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class DruidVersionInfo(NamedTuple):
+    version: str
+    capabilities: Dict[str, bool]
+    fetched_at: float
+
+
+def get_capabilities(version: str) -> Dict[str, bool]:
+    """Features of the broker that change how Superset builds its queries"""
+    parsed = LooseVersion(version)
+    return {
+        # realtime segments broke segmentMetadata queries before 0.8.2
+        "realtime_segment_metadata": parsed >= LooseVersion("0.8.2"),
+        # FLOAT adhoc metrics have to be sent as DOUBLE before 0.11.0
+        "float_aggregators": parsed >= LooseVersion("0.11.0"),
+    }
+
+
+class DruidVersionCache:
+    """Thread-safe store of broker versions, keyed by cluster"""
+
+    def __init__(self) -> None:
+        self._entries: Dict[Tuple, DruidVersionInfo] = {}
+        self._refreshing: Set[Tuple] = set()
+        self._lock = threading.Lock()
+
+    def get(
+        self,
+        key: Tuple,
+        fetch: Callable[[], str],
+        ttl: int,
+        stats_logger: Optional[Any] = None,
+    ) -> DruidVersionInfo:
+        """Returns the cached version info for ``key``
+
+        :param key: identifies the cluster, see ``DruidCluster.version_cache_key``
+        :param fetch: callable asking the broker for its version
+        :param ttl: number of seconds after which the entry gets refreshed
+        :param stats_logger: receives the hit/miss/refresh counters
+        """
+        with self._lock:
+            info = self._entries.get(key)
+            refresh = (
+                info is not None
+                and time.time() - info.fetched_at >= ttl
+                and key not in self._refreshing
+            )
+            if refresh:
+                self._refreshing.add(key)
+
+        if info is None:
+            if stats_logger:
+                stats_logger.incr("druid_version_cache_miss")
+            return self._fetch(key, fetch)
+
+        if stats_logger:
+            stats_logger.incr("druid_version_cache_hit")
+        if refresh:
+            if stats_logger:
+                stats_logger.incr("druid_version_cache_refresh")
+            thread = threading.Thread(
+                target=self._refresh, args=(key, fetch), daemon=True
+            )
+            thread.start()
+        return info
+
+    def peek(self, key: Tuple) -> Optional[DruidVersionInfo]:
+        """Returns the cached version info for ``key`` without asking the broker"""
+        with self._lock:
+            return self._entries.get(key)
+
+    def _fetch(self, key: Tuple, fetch: Callable[[], str]) -> DruidVersionInfo:
+        version = fetch()
+        info = DruidVersionInfo(
+            version=version,
+            capabilities=get_capabilities(version),
+            fetched_at=time.time(),
+        )
+        with self._lock:
+            self._entries[key] = info
+        return info
+
+    def _refresh(self, key: Tuple, fetch: Callable[[], str]) -> None:
+        try:
+            self._fetch(key, fetch)
+        except Exception as e:  # pylint: disable=broad-except
+            # keep serving the previous version until the broker is back
+            logger.warning("Failed to refresh the Druid version for %s", key)
+            logger.exception(e)
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def invalidate(self, cluster_id: Optional[int] = None) -> None:
+        """Drops the entries of one cluster, or of all clusters"""
+        with self._lock:
+            if cluster_id is None:
+                self._entries.clear()
+            else:
+                self._entries = {
+                    key: info
+                    for key, info in self._entries.items()
+                    if key[0] != cluster_id
+                }
+
+
+druid_version_cache = DruidVersionCache()
@@ -19,7 +19,18 @@ import logging
 import re
 from collections import OrderedDict
 from datetime import datetime
-from typing import Any, Dict, Hashable, List, NamedTuple, Optional, Tuple, Union
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Hashable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Union,
+)
 
 import pandas as pd
 import sqlalchemy as sa
@@ -48,6 +59,8 @@ from sqlalchemy.orm.exc import NoResultFound
 from sqlalchemy.schema import UniqueConstraint
 from sqlalchemy.sql import column, ColumnElement, literal_column, table, text
 from sqlalchemy.sql.expression import Label, Select, TextAsFrom
+from sqlalchemy.sql.sqltypes import NullType
+from sqlalchemy.sql.type_api import TypeEngine
 
 from superset import app, db, security_manager
 from superset.connectors.base.models import BaseColumn, BaseDatasource, BaseMetric
@@ -367,6 +380,7 @@ class SqlaTable(Model, BaseDatasource):
 
     type = "table"
     query_language = "sql"
+    supports_query_batch = True
     metric_class = SqlMetric
     column_class = TableColumn
     owner_class = security_manager.user_model
@@ -1026,12 +1040,11 @@ class SqlaTable(Model, BaseDatasource):
 
         return or_(*groups)
 
-    def query(self, query_obj: Dict[str, Any]) -> QueryResult:
-        qry_start_dttm = datetime.now()
-        query_str_ext = self.get_query_str_extended(query_obj)
+    @staticmethod
+    def get_labels_mutator(
+        query_str_ext: QueryStringExtended,
+    ) -> Callable[[pd.DataFrame], None]:
         sql = query_str_ext.sql
-        status = utils.QueryStatus.SUCCESS
-        error_message = None
 
         def mutator(df: pd.DataFrame) -> None:
             """
@@ -1053,6 +1066,16 @@ class SqlaTable(Model, BaseDatasource):
                 else:
                     df.columns = labels_expected
 
+        return mutator
+
+    def query(self, query_obj: Dict[str, Any]) -> QueryResult:
+        qry_start_dttm = datetime.now()
+        query_str_ext = self.get_query_str_extended(query_obj)
+        sql = query_str_ext.sql
+        status = utils.QueryStatus.SUCCESS
+        error_message = None
+        mutator = self.get_labels_mutator(query_str_ext)
+
         try:
             df = self.database.get_df(sql, self.schema, mutator)
         except Exception as e:
@@ -1070,6 +1093,128 @@ class SqlaTable(Model, BaseDatasource):
             error_message=error_message,
         )
 
+    def query_chunks(
+        self, query_obj: Dict[str, Any], chunk_size: int
+    ) -> Iterator[pd.DataFrame]:
+        query_str_ext = self.get_query_str_extended(query_obj)
+        yield from self.database.iter_df(
+            query_str_ext.sql,
+            self.schema,
+            chunk_size,
+            self.get_labels_mutator(query_str_ext),
+        )
+
+    def query_batch(self, query_objs: List[Dict[str, Any]]) -> List[QueryResult]:
+        """Runs the queries as the branches of a single UNION ALL statement
+
+        Each branch gets its own slice of the result columns, the others being
+        NULLs of the same types, plus a leading column telling which branch a row
+        comes from. Falls back to one query per query object when any of them
+        needs prequeries or when the batched statement fails.
+        """
+        qry_start_dttm = datetime.now()
+        sqlaqs = [self.get_sqla_query(**query_obj) for query_obj in query_objs]
+        if len(sqlaqs) < 2 or any(sqlaq.prequeries for sqlaq in sqlaqs):
+            return [self.query(query_obj) for query_obj in query_objs]
+
+        subqueries = [
+            sqlaq.sqla_query.alias(f"batch_{i}") for i, sqlaq in enumerate(sqlaqs)
+        ]
+        nulls = [[self.get_typed_null(col) for col in subq.c] for subq in subqueries]
+        # some databases (e.g. Postgres) resolve the types of a UNION two branches
+        # at a time, so the NULLs of two branches resolve to text before meeting
+        # the columns of a third one. Only the columns of the first two branches
+        # can do without a known type, the queries of the others run on their own
+        untyped = [i for i, branch in enumerate(nulls) if None in branch]
+        batched = untyped[:2] + [i for i in range(len(sqlaqs)) if i not in untyped]
+        results = {i: self.query(query_objs[i]) for i in untyped[2:]}
+        if len(batched) < 2:
+            results.update({i: self.query(query_objs[i]) for i in batched})
+            return [results[i] for i in range(len(sqlaqs))]
+
+        slots = {}
+        width = 1
+        for j in batched:
+            slots[j] = range(width, width + len(subqueries[j].c))
+            width += len(subqueries[j].c)
+        branches = []
+        for i in batched:
+            select_exprs = [sa.literal(i).label("batch_idx")]
+            for j in batched:
+                for k, col in enumerate(subqueries[j].c):
+                    label = f"batch_{j}_{k}"
+                    if j == i:
+                        select_exprs.append(col.label(label))
+                    else:
+                        null = nulls[j][k]
+                        select_exprs.append(
+                            (sa.null() if null is None else null).label(label)
+                        )
+            branches.append(select(select_exprs).select_from(subqueries[i]))
+        sql = self.database.compile_sqla_query(sa.union_all(*branches))
+        sql = sqlparse.format(sql, reindent=True)
+        sql = self.mutate_query_from_config(sql)
+        logger.info(sql)
+
+        try:
+            columns, data = self.database.get_records(sql, self.schema)
+        except Exception:  # pylint: disable=broad-except
+            logger.exception(f"Batched query {sql} on schema {self.schema} failed")
+            results.update({i: self.query(query_objs[i]) for i in batched})
+            return [results[i] for i in range(len(sqlaqs))]
+
+        rows: Dict[int, List[Tuple]] = {i: [] for i in batched}
+        for row in data:
+            rows[int(row[0])].append(row)
+        duration = datetime.now() - qry_start_dttm
+        for i in batched:
+            results[i] = QueryResult(
+                status=utils.QueryStatus.SUCCESS,
+                df=self.database.records_to_df(
+                    [tuple(row[k] for k in slots[i]) for row in rows[i]],
+                    sqlaqs[i].labels_expected,
+                ),
+                duration=duration,
+                query=sql,
+            )
+        return [results[i] for i in range(len(sqlaqs))]
+
+    def get_typed_null(self, col: ColumnElement) -> Optional[ColumnElement]:
+        """
+        Returns a NULL of the type of the column, from its expression or else from
+        the metadata of the table column of the same name.
+
+        :param col: A column of a query
+        :returns: The NULL, or None when the type of the column isn't known
+        """
+        type_ = col.type
+        if isinstance(type_, NullType):
+            table_column = self.get_column(col.name)
+            if table_column is None or not table_column.type:
+                return None
+            type_ = self.get_sqla_type(table_column.type)
+            if type_ is None:
+                return None
+        return sa.cast(sa.null(), type_)
+
+    def get_sqla_type(self, type_name: str) -> Optional[TypeEngine]:
+        """The SQLAlchemy type of a column type of the metadata, if known"""
+        name = type_name.split("(")[0].strip()
+        ischema_names = getattr(self.database.get_dialect(), "ischema_names", {})
+        for key in (name, name.lower(), name.upper()):
+            if key in ischema_names:
+                type_class = ischema_names[key]
+                break
+        else:
+            type_class = getattr(sa.types, name.upper().replace(" ", "_"), None)
+        if not isinstance(type_class, type) or not issubclass(type_class, TypeEngine):
+            return None
+        try:
+            return type_class()
+        except TypeError:
+            # e.g. ARRAY, which needs the type of its items
+            return None
+
     def get_sqla_table_object(self) -> Table:
         return self.database.get_table(self.table_name, schema=self.schema)
 
@@ -1264,3 +1409,9 @@ class RowLevelSecurityFilter(Model, AuditMixinNullable):
     table_id = Column(Integer, ForeignKey("tables.id"), nullable=False)
     table = relationship(SqlaTable, backref="row_level_security_filters")
     clause = Column(Text, nullable=False)
+
+
+for event in ("after_insert", "after_update", "after_delete"):
+    sa.event.listen(
+        RowLevelSecurityFilter, event, security_manager.bump_rls_filters_version
+    )
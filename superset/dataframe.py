@@ -18,18 +18,37 @@
 """
 from typing import Any, Dict, List
 
+import numpy as np
 import pandas as pd
+from pandas.api.types import infer_dtype
 
 from superset.utils.core import JS_MAX_INTEGER
 
+# the object columns that may hold ints, others are skipped without a loop
+INT_INFERRED_TYPES = ("integer", "mixed-integer", "mixed-integer-float", "mixed")
+
+
+def _column_to_list(series: pd.Series) -> List[Any]:
+    """Returns the values of the column, with the ints too big for JavaScript to
+    handle converted to strings"""
+    values = series.tolist()
+    kind = series.dtype.kind if isinstance(series.dtype, np.dtype) else "O"
+    if kind in ("i", "u"):
+        array = series.values
+        overflow = array > JS_MAX_INTEGER
+        if kind == "i":
+            overflow |= array < -JS_MAX_INTEGER
+        for i in np.flatnonzero(overflow):
+            values[i] = str(values[i])
+    elif kind == "O" and infer_dtype(series, skipna=True) in INT_INFERRED_TYPES:
+        # ints with missing values come as objects
+        for i, value in enumerate(values):
+            if isinstance(value, int) and abs(value) > JS_MAX_INTEGER:
+                values[i] = str(value)
+    return values
+
 
 def df_to_records(dframe: pd.DataFrame) -> List[Dict[str, Any]]:
-    data: List[Dict[str, Any]] = dframe.to_dict(orient="records")
-    # TODO: refactor this
-    for d in data:
-        for k, v in list(d.items()):
-            # if an int is too big for JavaScript to handle
-            # convert it to a string
-            if isinstance(v, int) and abs(v) > JS_MAX_INTEGER:
-                d[k] = str(v)
-    return data
+    columns = list(dframe.columns)
+    values = [_column_to_list(dframe.iloc[:, i]) for i in range(len(columns))]
+    return [dict(zip(columns, row)) for row in zip(*values)]
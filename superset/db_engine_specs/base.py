@@ -205,7 +205,7 @@ class BaseEngineSpec:  # pylint: disable=too-many-public-methods
     ) -> Engine:
         user_name = utils.get_username()
         return database.get_sqla_engine(
-            schema=schema, nullpool=True, user_name=user_name, source=source
+            schema=schema, user_name=user_name, source=source
         )
 
     @classmethod
@@ -826,6 +826,17 @@ class BaseEngineSpec:  # pylint: disable=too-many-public-methods
         """
         return {}
 
+    @classmethod
+    def get_streaming_cursor(cls, conn: Any) -> Any:
+        """
+        Cursor used to read large result sets by chunks. Drivers without server
+        side cursors fetch the whole result set into the regular cursor anyway.
+
+        :param conn: Raw DB-API connection
+        :return: Cursor instance
+        """
+        return conn.cursor()
+
     @classmethod
     def execute(cls, cursor: Any, query: str, **kwargs: Any) -> None:
         """
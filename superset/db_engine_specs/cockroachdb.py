@@ -14,8 +14,15 @@
 # KIND, either express or implied.  See the License for the
 # specific language governing permissions and limitations
 # under the License.
+from typing import Any
+
 from superset.db_engine_specs.postgres import PostgresEngineSpec
 
 
 class CockroachDbEngineSpec(PostgresEngineSpec):
     engine = "cockroachdb"
+
+    @classmethod
+    def get_streaming_cursor(cls, conn: Any) -> Any:
+        # CockroachDB doesn't support server side cursors
+        return conn.cursor()
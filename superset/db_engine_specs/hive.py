@@ -17,7 +17,6 @@
 import logging
 import os
 import re
-import time
 from datetime import datetime
 from typing import Any, Dict, List, Optional, Tuple, TYPE_CHECKING
 from urllib import parse
@@ -36,6 +35,7 @@ from superset.db_engine_specs.base import BaseEngineSpec
 from superset.db_engine_specs.presto import PrestoEngineSpec
 from superset.models.sql_lab import Query
 from superset.utils import core as utils
+from superset.utils.query_polling import QueryPoller
 
 if TYPE_CHECKING:
     # prevent circular imports
@@ -265,46 +265,48 @@ class HiveEngineSpec(PrestoEngineSpec):
         tracking_url = None
         job_id = None
         query_id = query.id
-        while polled.operationState in unfinished_states:
-            query = session.query(type(query)).filter_by(id=query_id).one()
-            if query.status == QueryStatus.STOPPED:
-                cursor.cancel()
-                break
-
-            log = cursor.fetch_logs() or ""
-            if log:
-                log_lines = log.splitlines()
-                progress = cls.progress(log_lines)
-                logger.info(f"Query {query_id}: Progress total: {progress}")
-                needs_commit = False
-                if progress > query.progress:
-                    query.progress = progress
-                    needs_commit = True
-                if not tracking_url:
-                    tracking_url = cls.get_tracking_url(log_lines)
-                    if tracking_url:
-                        job_id = tracking_url.split("/")[-2]
-                        logger.info(
-                            f"Query {query_id}: Found the tracking url: {tracking_url}"
-                        )
-                        tracking_url = tracking_url_trans(tracking_url)
-                        logger.info(
-                            f"Query {query_id}: Transformation applied: {tracking_url}"
-                        )
-                        query.tracking_url = tracking_url
-                        logger.info(f"Query {query_id}: Job id: {job_id}")
-                        needs_commit = True
-                if job_id and len(log_lines) > last_log_line:
-                    # Wait for job id before logging things out
-                    # this allows for prefixing all log lines and becoming
-                    # searchable in something like Kibana
-                    for l in log_lines[last_log_line:]:
-                        logger.info(f"Query {query_id}: [{job_id}] {l}")
-                    last_log_line = len(log_lines)
-                if needs_commit:
-                    session.commit()
-            time.sleep(hive_poll_interval)
-            polled = cursor.poll()
+        poller = QueryPoller(
+            query,
+            session,
+            cache=cache,
+            **{**config["SQLLAB_POLLING_CONFIG"], "min_interval": hive_poll_interval},
+        )
+        with poller:
+            while polled.operationState in unfinished_states:
+                if poller.is_stopped():
+                    cursor.cancel()
+                    break
+
+                log = cursor.fetch_logs() or ""
+                if log:
+                    log_lines = log.splitlines()
+                    progress = cls.progress(log_lines)
+                    logger.info(f"Query {query_id}: Progress total: {progress}")
+                    poller.update_progress(progress)
+                    if not tracking_url:
+                        tracking_url = cls.get_tracking_url(log_lines)
+                        if tracking_url:
+                            job_id = tracking_url.split("/")[-2]
+                            logger.info(
+                                f"Query {query_id}: "
+                                f"Found the tracking url: {tracking_url}"
+                            )
+                            tracking_url = tracking_url_trans(tracking_url)
+                            logger.info(
+                                f"Query {query_id}: "
+                                f"Transformation applied: {tracking_url}"
+                            )
+                            poller.set_tracking_url(tracking_url)
+                            logger.info(f"Query {query_id}: Job id: {job_id}")
+                    if job_id and len(log_lines) > last_log_line:
+                        # Wait for job id before logging things out
+                        # this allows for prefixing all log lines and becoming
+                        # searchable in something like Kibana
+                        for l in log_lines[last_log_line:]:
+                            logger.info(f"Query {query_id}: [{job_id}] {l}")
+                        last_log_line = len(log_lines)
+                poller.wait()
+                polled = cursor.poll()
 
     @classmethod
     def get_columns(
@@ -14,6 +14,7 @@
 # KIND, either express or implied.  See the License for the
 # specific language governing permissions and limitations
 # under the License.
+import uuid
 from datetime import datetime
 from typing import Any, List, Optional, Tuple, TYPE_CHECKING
 
@@ -78,6 +79,13 @@ class PostgresEngineSpec(PostgresBaseEngineSpec):
         tables.extend(inspector.get_foreign_table_names(schema))
         return sorted(tables)
 
+    @classmethod
+    def get_streaming_cursor(cls, conn: Any) -> Any:
+        # named cursors are server side cursors in psycopg2
+        cursor = conn.cursor(name=f"superset_{uuid.uuid4().hex}")
+        cursor.tzinfo_factory = FixedOffsetTimezone
+        return cursor
+
     @classmethod
     def convert_dttm(cls, target_type: str, dttm: datetime) -> Optional[str]:
         tt = target_type.upper()
@@ -42,6 +42,7 @@ from superset.models.sql_lab import Query
 from superset.models.sql_types.presto_sql_types import type_map as presto_type_map
 from superset.sql_parse import ParsedQuery
 from superset.utils import core as utils
+from superset.utils.query_polling import QueryPoller
 
 if TYPE_CHECKING:
     # prevent circular imports
@@ -730,36 +731,41 @@ class PrestoEngineSpec(BaseEngineSpec):
         # if the query is done
         # https://github.com/dropbox/PyHive/blob/
         # b34bdbf51378b3979eaf5eca9e956f06ddc36ca0/pyhive/presto.py#L178
-        while polled:
-            # Update the object and wait for the kill signal.
-            stats = polled.get("stats", {})
-
-            query = session.query(type(query)).filter_by(id=query_id).one()
-            if query.status in [QueryStatus.STOPPED, QueryStatus.TIMED_OUT]:
-                cursor.cancel()
-                break
-
-            if stats:
-                state = stats.get("state")
+        poller = QueryPoller(
+            query,
+            session,
+            cache=cache,
+            stop_statuses=(QueryStatus.STOPPED, QueryStatus.TIMED_OUT),
+            **config["SQLLAB_POLLING_CONFIG"],
+        )
+        with poller:
+            while polled:
+                # Update the object and wait for the kill signal.
+                stats = polled.get("stats", {})
 
-                # if already finished, then stop polling
-                if state == "FINISHED":
+                if poller.is_stopped():
+                    cursor.cancel()
                     break
 
-                completed_splits = float(stats.get("completedSplits"))
-                total_splits = float(stats.get("totalSplits"))
-                if total_splits and completed_splits:
-                    progress = 100 * (completed_splits / total_splits)
-                    logger.info(
-                        "Query {} progress: {} / {} "  # pylint: disable=logging-format-interpolation
-                        "splits".format(query_id, completed_splits, total_splits)
-                    )
-                    if progress > query.progress:
-                        query.progress = progress
-                    session.commit()
-            time.sleep(1)
-            logger.info(f"Query {query_id}: Polling the cursor for progress")
-            polled = cursor.poll()
+                if stats:
+                    state = stats.get("state")
+
+                    # if already finished, then stop polling
+                    if state == "FINISHED":
+                        break
+
+                    completed_splits = float(stats.get("completedSplits"))
+                    total_splits = float(stats.get("totalSplits"))
+                    if total_splits and completed_splits:
+                        progress = 100 * (completed_splits / total_splits)
+                        logger.info(
+                            "Query {} progress: {} / {} "  # pylint: disable=logging-format-interpolation
+                            "splits".format(query_id, completed_splits, total_splits)
+                        )
+                        poller.update_progress(progress)
+                poller.wait()
+                logger.info(f"Query {query_id}: Polling the cursor for progress")
+                polled = cursor.poll()
 
     @classmethod
     def _extract_error_message(cls, e: Exception) -> Optional[str]:
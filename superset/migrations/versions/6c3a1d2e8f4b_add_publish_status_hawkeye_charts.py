@@ -0,0 +1,54 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+"""add_publish_status_hawkeye_charts
+
+Revision ID: 6c3a1d2e8f4b
+Revises: b21497dbd5ab
+Create Date: 2026-10-18 22:00:00.000000
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = "6c3a1d2e8f4b"
+down_revision = "b21497dbd5ab"
+
+import sqlalchemy as sa
+from alembic import op
+
+
+def upgrade():
+    op.add_column(
+        "hawkeye_charts", sa.Column("publish_id", sa.String(length=36), nullable=True)
+    )
+    op.add_column(
+        "hawkeye_charts",
+        sa.Column("publish_status", sa.String(length=16), nullable=True),
+    )
+    op.add_column(
+        "hawkeye_charts", sa.Column("publish_details", sa.JSON(), nullable=True)
+    )
+    op.add_column(
+        "hawkeye_charts", sa.Column("publish_changed_on", sa.DateTime(), nullable=True)
+    )
+
+
+def downgrade():
+    with op.batch_alter_table("hawkeye_charts") as batch_op:
+        batch_op.drop_column("publish_changed_on")
+        batch_op.drop_column("publish_details")
+        batch_op.drop_column("publish_status")
+        batch_op.drop_column("publish_id")
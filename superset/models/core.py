@@ -22,7 +22,7 @@ import textwrap
 from contextlib import closing
 from copy import deepcopy
 from datetime import datetime
-from typing import Any, Callable, Dict, List, Optional, Set, Tuple, Type
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple, Type
 
 import numpy
 import pandas as pd
@@ -56,7 +56,7 @@ from superset.db_engine_specs.base import TimeGrain
 from superset.models.dashboard import Dashboard
 from superset.models.helpers import AuditMixinNullable, ImportMixin
 from superset.models.tags import DashboardUpdater, FavStarUpdater
-from superset.utils import cache as cache_util, core as utils
+from superset.utils import cache as cache_util, core as utils, engine_registry
 
 config = app.config
 custom_password_store = config["SQLALCHEMY_CUSTOM_PASSWORD_STORE"]
@@ -277,10 +277,19 @@ class Database(
     def get_sqla_engine(
         self,
         schema: Optional[str] = None,
-        nullpool: bool = True,
+        nullpool: Optional[bool] = None,
         user_name: Optional[str] = None,
         source: Optional[utils.QuerySource] = None,
     ) -> Engine:
+        """Returns an engine connecting to the database
+
+        Unless ``nullpool`` is set, or pooling disabled with
+        ``SQLALCHEMY_ENGINE_POOLING``, the engine and its pool of connections are
+        shared by the queries sent with the same URL and parameters.
+        """
+        if nullpool is None:
+            # databases not saved yet, while testing a connection for instance
+            nullpool = not config["SQLALCHEMY_ENGINE_POOLING"] or self.id is None
         extra = self.get_extra()
         sqlalchemy_url = make_url(self.sqlalchemy_uri_decrypted)
         self.db_engine_spec.adjust_database_uri(sqlalchemy_url, schema)
@@ -298,6 +307,13 @@ class Database(
         params = extra.get("engine_params", {})
         if nullpool:
             params["poolclass"] = NullPool
+        else:
+            engine_registry.set_pool_params(
+                sqlalchemy_url,
+                params,
+                config["SQLALCHEMY_ENGINE_POOL_OPTIONS"],
+                stats_logger,
+            )
 
         connect_args = params.get("connect_args", {})
         configuration = connect_args.get("configuration", {})
@@ -328,7 +344,14 @@ class Database(
                 sqlalchemy_url, params, effective_username, security_manager, source
             )
 
-        return create_engine(sqlalchemy_url, **params)
+        if nullpool:
+            return create_engine(sqlalchemy_url, **params)
+        return engine_registry.get_engine(
+            self.id,
+            sqlalchemy_url,
+            params,
+            config["SQLALCHEMY_ENGINE_POOL_MAX_ENGINES"],
+        )
 
     def get_reserved_words(self) -> Set[str]:
         return self.get_dialect().preparer.reserved_words
@@ -336,17 +359,21 @@ class Database(
     def get_quoter(self):
         return self.get_dialect().identifier_preparer.quote
 
-    def get_df(  # pylint: disable=too-many-locals
+    def get_df(
         self, sql: str, schema: Optional[str] = None, mutator: Optional[Callable] = None
     ) -> pd.DataFrame:
+        columns, data = self.get_records(sql, schema)
+        return self.records_to_df(data, columns, mutator)
+
+    def get_records(
+        self, sql: str, schema: Optional[str] = None
+    ) -> Tuple[List[str], List[Tuple]]:
+        """Runs the statements in ``sql``, returns the columns and rows of the last"""
         sqls = [str(s).strip(" ;") for s in sqlparse.parse(sql)]
 
         engine = self.get_sqla_engine(schema=schema)
         username = utils.get_username()
 
-        def needs_conversion(df_series: pd.Series) -> bool:
-            return not df_series.empty and isinstance(df_series[0], (list, dict))
-
         def _log_query(sql: str) -> None:
             if log_query:
                 log_query(engine.url, sql, schema, username, __name__, security_manager)
@@ -365,18 +392,66 @@ class Database(
                     columns = [col_desc[0] for col_desc in cursor.description]
                 else:
                     columns = []
+                return columns, list(cursor.fetchall())
 
-                df = pd.DataFrame.from_records(
-                    data=list(cursor.fetchall()), columns=columns, coerce_float=True
-                )
+    def iter_df(
+        self,
+        sql: str,
+        schema: Optional[str] = None,
+        chunk_size: int = 10000,
+        mutator: Optional[Callable] = None,
+    ) -> Iterator[pd.DataFrame]:
+        """Like ``get_df`` but yields dataframes of at most ``chunk_size`` rows
+
+        The rows of the last statement are read through the streaming cursor of
+        the engine spec, so that memory use doesn't grow with the row count. At
+        least one dataframe is yielded, even when there are no rows.
+        """
+        sqls = [str(s).strip(" ;") for s in sqlparse.parse(sql)]
 
-                if mutator:
-                    mutator(df)
+        engine = self.get_sqla_engine(schema=schema)
+        username = utils.get_username()
 
-                for k, v in df.dtypes.items():
-                    if v.type == numpy.object_ and needs_conversion(df[k]):
-                        df[k] = df[k].apply(utils.json_dumps_w_dates)
-                return df
+        def _log_query(sql: str) -> None:
+            if log_query:
+                log_query(engine.url, sql, schema, username, __name__, security_manager)
+
+        with closing(engine.raw_connection()) as conn:
+            with closing(conn.cursor()) as cursor:
+                for sql_ in sqls[:-1]:
+                    _log_query(sql_)
+                    self.db_engine_spec.execute(cursor, sql_)
+                    cursor.fetchall()
+
+            _log_query(sqls[-1])
+            cursor = self.db_engine_spec.get_streaming_cursor(conn)
+            with closing(cursor):
+                self.db_engine_spec.execute(cursor, sqls[-1])
+                data = cursor.fetchmany(chunk_size)
+                # server side cursors only describe the results after a fetch
+                columns = [col_desc[0] for col_desc in cursor.description or []]
+                yield self.records_to_df(data, columns, mutator)
+                while len(data) == chunk_size:
+                    data = cursor.fetchmany(chunk_size)
+                    if data:
+                        yield self.records_to_df(data, columns, mutator)
+
+    @staticmethod
+    def records_to_df(
+        data: List[Tuple], columns: List[str], mutator: Optional[Callable] = None
+    ) -> pd.DataFrame:
+        def needs_conversion(df_series: pd.Series) -> bool:
+            return not df_series.empty and isinstance(df_series[0], (list, dict))
+
+        df = pd.DataFrame.from_records(data=data, columns=columns, coerce_float=True)
+
+        if mutator:
+            mutator(df)
+
+        for k, v in df.dtypes.items():
+            if v.type == numpy.object_ and needs_conversion(df[k]):
+                df[k] = df[k].apply(utils.json_dumps_w_dates)
+        return df
 
     def compile_sqla_query(self, qry: Select, schema: Optional[str] = None) -> str:
         engine = self.get_sqla_engine(schema=schema)
@@ -638,6 +713,16 @@ class Database(
 sqla.event.listen(Database, "after_insert", security_manager.set_perm)
 sqla.event.listen(Database, "after_update", security_manager.set_perm)
 
+# the permissions snapshots follow the changes to the roles and their permissions
+for model in (
+    security_manager.role_model,
+    security_manager.permission_model,
+    security_manager.viewmenu_model,
+    security_manager.permissionview_model,
+):
+    for event in ("after_insert", "after_update", "after_delete"):
+        sqla.event.listen(model, event, security_manager.bump_permissions_version)
+
 
 class Log(Model):  # pylint: disable=too-few-public-methods
 
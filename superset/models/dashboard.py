@@ -14,10 +14,12 @@
 # KIND, either express or implied.  See the License for the
 # specific language governing permissions and limitations
 # under the License.
+import hashlib
 import json
 import logging
+from collections import defaultdict
 from copy import copy
-from typing import Any, Dict, List, Optional, Set, TYPE_CHECKING
+from typing import Any, Dict, List, Optional, Set, Tuple, TYPE_CHECKING
 from urllib import parse
 
 import sqlalchemy as sqla
@@ -38,7 +40,14 @@ from sqlalchemy import (
 )
 from sqlalchemy.orm import relationship, sessionmaker, subqueryload
 
-from superset import app, ConnectorRegistry, db, is_feature_enabled, security_manager
+from superset import (
+    app,
+    cache,
+    ConnectorRegistry,
+    db,
+    is_feature_enabled,
+    security_manager,
+)
 from superset.models.helpers import AuditMixinNullable, ImportMixin
 from superset.models.slice import Slice as Slice
 from superset.models.tags import DashboardUpdater
@@ -212,6 +221,89 @@ class Dashboard(  # pylint: disable=too-many-instance-attributes
             "position_json": positions,
         }
 
+    def get_datasources(
+        self, eager: bool = False
+    ) -> Dict["BaseDatasource", List[Slice]]:
+        """
+        Returns the slices of the dashboard per datasource, the datasources being
+        loaded with a query per datasource type rather than one per slice.
+
+        :param eager: Whether to load the columns, metrics and owners as well
+        :returns: The slices per datasource
+        """
+        # pylint: disable=no-member
+        slices: Dict[Tuple[str, int], List[Slice]] = defaultdict(list)
+        for slc in self.slices:
+            slices[(slc.datasource_type, slc.datasource_id)].append(slc)
+        datasource_ids: Dict[str, Set[int]] = defaultdict(set)
+        for datasource_type, datasource_id in slices:
+            datasource_ids[datasource_type].add(datasource_id)
+
+        datasources = {}
+        for datasource_type, ids in datasource_ids.items():
+            for datasource in ConnectorRegistry.get_datasources(
+                db.session, datasource_type, ids, eager=eager
+            ):
+                datasources[datasource] = slices[(datasource_type, datasource.id)]
+        return datasources
+
+    def get_bootstrap_data(
+        self, datasources: Dict["BaseDatasource", List[Slice]]
+    ) -> Dict[str, Any]:
+        """
+        Returns the dashboard and datasources payloads of the dashboard page.
+
+        They don't depend on the user, so they are cached until the dashboard, one
+        of its slices or one of their datasources changes.
+
+        :param datasources: The slices per datasource, see ``get_datasources``
+        :returns: The dashboard data and the datasources data per uid
+        """
+        reduce_payload = is_feature_enabled("REDUCE_DASHBOARD_BOOTSTRAP_PAYLOAD")
+        cache_timeout = config["DASHBOARD_BOOTSTRAP_CACHE_TIMEOUT"]
+        cache_key = self.get_bootstrap_cache_key(datasources, reduce_payload)
+        if cache_timeout is not None:
+            bootstrap_data = cache.get(cache_key)
+            if bootstrap_data is not None:
+                return bootstrap_data
+
+        # the columns, metrics and owners of every datasource, in a few queries
+        for datasource_type in {datasource.type for datasource in datasources}:
+            ConnectorRegistry.get_datasources(
+                db.session,
+                datasource_type,
+                [ds.id for ds in datasources if ds.type == datasource_type],
+                eager=True,
+            )
+        bootstrap_data = {
+            "dashboard_data": self.data,
+            "datasources": {
+                datasource.uid: datasource.data_for_slices(slices)
+                if reduce_payload
+                else datasource.data
+                for datasource, slices in datasources.items()
+            },
+        }
+        if cache_timeout is not None:
+            cache.set(cache_key, bootstrap_data, timeout=cache_timeout)
+        return bootstrap_data
+
+    def get_bootstrap_cache_key(
+        self, datasources: Dict["BaseDatasource", List[Slice]], reduce_payload: bool
+    ) -> str:
+        # pylint: disable=no-member
+        versions = [
+            self.id,
+            self.changed_on,
+            [(slc.id, slc.changed_on) for slc in self.slices],
+            sorted((ds.uid, ds.changed_on) for ds in datasources),
+            reduce_payload,
+        ]
+        json_data = json.dumps(versions, default=str)
+        return "dashboard_bootstrap__{}".format(
+            hashlib.md5(json_data.encode("utf-8")).hexdigest()
+        )
+
     @property
     def params(self) -> str:
         return self.json_metadata
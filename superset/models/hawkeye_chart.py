@@ -4,7 +4,7 @@ import os
 from flask_appbuilder import Model
 from typing import Any, Dict
 
-from sqlalchemy import Column, ForeignKey, Integer, String, Table, Text, Boolean, JSON
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, String, Table, Text, Boolean, JSON
 from sqlalchemy.orm import backref, relationship
 from superset.models.helpers import AuditMixinNullable, ImportMixin
 from superset.models.hawkeye_report import HawkeyeReport
@@ -47,6 +47,11 @@ class HawkeyeChart(
     bignumber_type = Column(String(250))
 
     chart_status = Column(String(100))
+    # the latest publication of the report, see superset.tasks.report_publish
+    publish_id = Column(String(36))
+    publish_status = Column(String(16))
+    publish_details = Column(JSON)
+    publish_changed_on = Column(DateTime)
     # created_by = Column(String(100))
     # reviewed_by = Column(String(100))
 
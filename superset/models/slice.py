@@ -105,7 +105,8 @@ class Slice(
     @datasource.getter  # type: ignore
     @utils.memoized
     def get_datasource(self) -> Optional["BaseDatasource"]:
-        return db.session.query(self.cls_model).filter_by(id=self.datasource_id).first()
+        # served from the identity map when already loaded, by a dashboard say
+        return db.session.query(self.cls_model).get(self.datasource_id)
 
     @renders("datasource_name")
     def datasource_link(self) -> Optional[Markup]:
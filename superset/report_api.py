@@ -1,21 +1,24 @@
+import hashlib
 import simplejson as json
 import pdb
 import os
-import requests as http_client
 
 from time import sleep
 from datetime import datetime
 from flask_appbuilder.security.decorators import has_access, has_access_api
 from flask_appbuilder import expose
-from flask import request, g, flash
+from flask import request, g, flash, Response
 from flask_babel import lazy_gettext as _
 from copy import deepcopy
+from sqlalchemy import func
+from sqlalchemy.orm import selectinload
 
 from superset.connectors.connector_registry import ConnectorRegistry
 from superset.utils.decorators import etag_cache, stats_timing
 from superset.models.hawkeye_chart import HawkeyeChart
 from superset.models.hawkeye_report import HawkeyeReport
 from superset.models.slice import Slice
+from superset.tasks import report_publish
 from superset import (
     app,
     db,
@@ -31,6 +34,7 @@ from superset.views.base import (
     json_success,
 )
 from superset.utils import core as utils
+from superset.utils.api_client import APIClient
 from superset.views.utils import (
     apply_display_max_row_limit,
     bootstrap_user_data,
@@ -48,6 +52,26 @@ ANALYTICS_API_HOST = os.environ['ANALYTICS_API_HOST']
 PORTAL_HOST = os.environ['PORTAL_HOST']
 
 stats_logger = config["STATS_LOGGER"]
+analytics_api = APIClient(
+    "analytics",
+    ANALYTICS_API_HOST,
+    headers={
+        "Content-Type": "application/json",
+        "Authorization": "Bearer {}".format(ANALYTICS_API_KEY),
+    },
+    config=config["REPORT_API_CLIENT_CONFIG"],
+    stats_logger=stats_logger,
+)
+portal_api = APIClient(
+    "portal",
+    PORTAL_API_HOST,
+    headers={
+        "Content-Type": "application/json",
+        "Authorization": "Bearer {}".format(PORTAL_API_KEY),
+    },
+    config=config["REPORT_API_CLIENT_CONFIG"],
+    stats_logger=stats_logger,
+)
 REVIEW = "review"
 APPROVED = "approved"
 DRAFT = "draft"
@@ -63,6 +87,8 @@ def is_owner(obj, user):
 
 
 class ReportAPI(BaseSupersetView):
+    # the largest page of the reports list
+    max_page_size = 100
 
     @event_logger.log_this
     @has_access
@@ -376,11 +402,55 @@ class ReportAPI(BaseSupersetView):
         "/list_reports", methods=["GET"]
     )
     def list_reports(self, slice_id=None):
-        reports = db.session.query(HawkeyeReport).all()
-        
-        reports = [item.data for item in reports]
+        """Lists the reports along with their charts
+
+        The optional arguments are ``status``, comma separated chart statuses the
+        reports are filtered on, and ``page`` (zero based) and ``page_size`` for
+        the pagination, the page size being capped to ``max_page_size``. The
+        response carries an ETag changing along with the reports and charts, and
+        is a 304 when the client already has it.
+        """
+        etag = self.get_reports_etag()
+        if etag in request.if_none_match:
+            response = Response(status=304)
+            response.set_etag(etag)
+            return response
+
+        qry = db.session.query(HawkeyeReport)
+        statuses = [s for s in request.args.get("status", "").split(",") if s]
+        if statuses:
+            qry = qry.filter(
+                HawkeyeReport.charts.any(HawkeyeChart.chart_status.in_(statuses))
+            )
+        count = qry.count()
 
-        return json_success(json.dumps({"data": reports}))
+        # the charts of all the reports in a single query, their report being
+        # then found in the session rather than loaded once more
+        qry = qry.options(selectinload(HawkeyeReport.charts)).order_by(HawkeyeReport.id)
+        page_size = request.args.get("page_size", type=int)
+        if page_size and page_size > 0:
+            page_size = min(page_size, self.max_page_size)
+            page = max(request.args.get("page", 0, type=int), 0)
+            qry = qry.limit(page_size).offset(page * page_size)
+
+        reports = [item.data for item in qry.all()]
+
+        response = json_success(json.dumps({"data": reports, "count": count}))
+        response.set_etag(etag)
+        return response
+
+    @staticmethod
+    def get_reports_etag():
+        """The ETag of the reports list, from the last changes to the reports
+        and charts along with their counts, deletions leaving no changed_on"""
+        version = db.session.query(
+            db.session.query(func.max(HawkeyeReport.changed_on)).as_scalar(),
+            db.session.query(func.count(HawkeyeReport.id)).as_scalar(),
+            db.session.query(func.max(HawkeyeChart.changed_on)).as_scalar(),
+            db.session.query(func.count(HawkeyeChart.id)).as_scalar(),
+        ).one()
+        key = json.dumps([list(version), sorted(request.args.items())], default=str)
+        return hashlib.md5(key.encode("utf-8")).hexdigest()
 
 
     @event_logger.log_this
@@ -456,69 +526,53 @@ class ReportAPI(BaseSupersetView):
             force=False,
         )
 
-        query = None
+        druid_query = None
 
         try:
             query_obj = viz_obj.query_obj()
             if query_obj:
-                query = viz_obj.datasource.get_query_str(query_obj)
+                # only renders the query, the broker is not queried
+                druid_query = viz_obj.datasource.get_query_plan(query_obj, phase=1)[-1]
         except Exception as e:
             print(str(e))
             return json_error_response(e)
 
-        chart.druid_query = json.loads(query) if isinstance(query, str) else query
-
-        publish_success = True
-        report_id = None
-        counter = 0
-        while counter <= 5:
-            try:
-                print("Retrying for publish_job_analytics :: {}".format(counter))
-                self.publish_job_analytics(chart)
-                break;
-            except Exception as e:
-                print(str(e))
-                counter += 1;
-                sleep(2)
-        else:
-            print("Max retries reached... publish_job_analytics")
-            publish_success = False
+        # publishing can take a while when the analytics API is slow, the
+        # client polls the status endpoint instead
+        publish_id = report_publish.start_publish(chart.slice_id, druid_query)
 
-        counter = 0
-        while counter <= 5 and publish_success:
-            try:
-                print("Retrying for publish_report_portal :: {}".format(counter))
-                report_id = self.publish_report_portal(chart)
-                break;
-            except Exception as e:
-                print(str(e))
-                counter += 1;
-                sleep(2)
-        else:
-            print("Max retries reached... publish_report_portal")
-            publish_success = False
-
-        if publish_success:
-            chart.chart_status = PUBLISHED
-            chart.hawkeye_report.published_report_id = report_id
-            chart.submitted_as_job = True
+        return json_success(
+            json.dumps(
+                {
+                    "status": "SUCCESS",
+                    "publish_id": publish_id,
+                    "publish_status": report_publish.get_publish_status(publish_id),
+                }
+            ),
+            status=202,
+        )
 
-            self.overwrite_record(chart)
 
-            return json_success(json.dumps({
-                "status": "SUCCESS",
-                "report_status": chart.chart_status,
-                "report_id": chart.hawkeye_report.published_report_id
-            }))
+    @event_logger.log_this
+    @api
+    @has_access_api
+    @handle_api_exception
+    @expose("/publish_status/<publish_id>", methods=["GET"])
+    def publish_status(self, publish_id):
+        """
+        Reports the progress of a publication started by publish_report, until
+        another publication of the same report chart starts
+        """
+        publish_status = report_publish.get_publish_status(publish_id)
+        if publish_status is None:
+            return json_error_response(_("Unknown publication"), status=404)
+        return json_success(json.dumps(publish_status))
+
+    def publish_job_analytics(self, chart, job_config_future=None):
+        if job_config_future is not None:
+            job_config = job_config_future.result()
         else:
-            return json_error_response(
-                _("Publishing report got failed"),
-                status=400,
-            )
-
-
-    def publish_job_analytics(self, chart):
-        job_config = self.get_job_config(chart.chart_id)
+            job_config = self.get_job_config(chart.chart_id)
         
         if job_config is None:
             job_config = self.job_config_template(chart)
@@ -589,12 +643,15 @@ class ReportAPI(BaseSupersetView):
                 raise Exception('ERROR::post_job_config')
 
 
-    def publish_report_portal(self, chart):
+    def publish_report_portal(self, chart, report_config_future=None):
         published_report_id = chart.hawkeye_report.published_report_id
         if published_report_id is None or published_report_id is "":
             report_config = self.report_config_template(chart)
         else:
-            report_config = self.get_report_config(published_report_id)
+            if report_config_future is not None:
+                report_config = report_config_future.result()
+            else:
+                report_config = self.get_report_config(published_report_id)
             try:
                 print(json.dumps(report_config))
                  
@@ -677,35 +734,22 @@ class ReportAPI(BaseSupersetView):
 
 
     def get_job_config(self, chart_id):
-        url = "{}/report/jobs/{}".format(ANALYTICS_API_HOST, chart_id)
-        headers = {
-          'Content-Type': 'application/json',
-          'Authorization': 'Bearer {}'.format(ANALYTICS_API_KEY)
-        }
-
-        response = http_client.request("GET", url, headers=headers, data = {})
+        response = analytics_api.get("/report/jobs/{}".format(chart_id))
 
         return response.json().get('result')
 
 
     def post_job_config(self, job_config, chart):
         if chart.is_new_chart:
-            url = "{}/report/jobs/submit".format(ANALYTICS_API_HOST)
-            method = "POST"
+            path = "/report/jobs/submit"
         else:
-            url = "{}/report/jobs/{}".format(ANALYTICS_API_HOST, chart.chart_id)
-            method = "POST"
-
-        headers = {
-          'Content-Type': 'application/json',
-          'Authorization': 'Bearer {}'.format(ANALYTICS_API_KEY)
-        }
+            path = "/report/jobs/{}".format(chart.chart_id)
 
         job_config = {
             "request": job_config
         }
 
-        response = http_client.request(method, url, headers=headers, data=json.dumps(job_config))
+        response = analytics_api.post(path, job_config)
 
         return response.json()
 
@@ -992,14 +1036,7 @@ class ReportAPI(BaseSupersetView):
 
 
     def get_report_config(self, published_report_id):
-        url = "{}/report/get/{}".format(PORTAL_API_HOST, published_report_id)
-
-        headers = {
-          'Content-Type': 'application/json',
-          'Authorization': 'Bearer {}'.format(PORTAL_API_KEY)
-        }
-
-        response = http_client.request("GET", url, headers=headers, data = {})
+        response = portal_api.get("/report/get/{}".format(published_report_id))
 
         if response.json()['result'].get("reports") is not None:
             return response.json()['result']["reports"][0]
@@ -1008,28 +1045,17 @@ class ReportAPI(BaseSupersetView):
 
 
     def post_report_config(self, report_config, published_report_id=None):
-        if published_report_id is None or published_report_id == '':
-            url = "{}/report/create".format(PORTAL_API_HOST)
-            method = "POST"
-        else:
-            url = "{}/report/update/{}".format(PORTAL_API_HOST, published_report_id)
-            method = "PATCH"
-
-        headers = {
-          'Content-Type': 'application/json',
-          'Authorization': 'Bearer {}'.format(PORTAL_API_KEY)
-        }
-
         report_config = {
             "request": {
                 "report": report_config
             }
         }
-        print(report_config)
-        print(json.dumps(report_config))
-        print(os.environ['PORTAL_API_KEY'])
-        print(json.dumps(headers))
-        response = http_client.request(method, url, headers=headers, data=json.dumps(report_config))
+        if published_report_id is None or published_report_id == '':
+            response = portal_api.post("/report/create", report_config)
+        else:
+            response = portal_api.patch(
+                "/report/update/{}".format(published_report_id), report_config
+            )
         report_id = response.json()['result']['reportId']
         
         return report_id
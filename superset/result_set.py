@@ -20,7 +20,7 @@
 import datetime
 import json
 import logging
-from typing import Any, Callable, Dict, List, Optional, Tuple, Type
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Type
 
 import numpy as np
 import pandas as pd
@@ -63,11 +63,6 @@ def stringify(obj: Any) -> str:
     return json.dumps(obj, default=utils.json_iso_dttm_ser)
 
 
-def stringify_values(array: np.ndarray) -> np.ndarray:
-    vstringify: Callable = np.vectorize(stringify)
-    return vstringify(array)
-
-
 class SupersetResultSet:
     def __init__(
         self,
@@ -80,8 +75,6 @@ class SupersetResultSet:
         column_names: List[str] = []
         pa_data: List[pa.Array] = []
         deduped_cursor_desc: List[Tuple[Any, ...]] = []
-        numpy_dtype: List[Tuple[str, ...]] = []
-        stringified_arr: np.ndarray
 
         if cursor_description:
             # get deduped list of column names
@@ -93,53 +86,13 @@ class SupersetResultSet:
                 for column_name, description in zip(column_names, cursor_description)
             ]
 
-            # generate numpy structured array dtype
-            numpy_dtype = [(column_name, "object") for column_name in column_names]
-
-        # only do expensive recasting if datatype is not standard list of tuples
-        if data and (not isinstance(data, list) or not isinstance(data[0], tuple)):
-            data = [tuple(row) for row in data]
-        array = np.array(data, dtype=numpy_dtype)
-        if array.size > 0:
-            for column in column_names:
-                try:
-                    pa_data.append(pa.array(array[column].tolist()))
-                except (
-                    pa.lib.ArrowInvalid,
-                    pa.lib.ArrowTypeError,
-                    pa.lib.ArrowNotImplementedError,
-                    TypeError,  # this is super hackey, https://issues.apache.org/jira/browse/ARROW-7855
-                ):
-                    # attempt serialization of values as strings
-                    stringified_arr = stringify_values(array[column])
-                    pa_data.append(pa.array(stringified_arr.tolist()))
-
-        if pa_data:
-            for i, column in enumerate(column_names):
-                if pa.types.is_nested(pa_data[i].type):
-                    # TODO: revisit nested column serialization once PyArrow updated with:
-                    # https://github.com/apache/arrow/pull/6199
-                    # Related issue: https://github.com/apache/incubator-superset/issues/8978
-                    stringified_arr = stringify_values(array[column])
-                    pa_data[i] = pa.array(stringified_arr.tolist())
-
-                elif pa.types.is_temporal(pa_data[i].type):
-                    # workaround for bug converting `psycopg2.tz.FixedOffsetTimezone` tzinfo values.
-                    # related: https://issues.apache.org/jira/browse/ARROW-5248
-                    sample = self.first_nonempty(array[column])
-                    if sample and isinstance(sample, datetime.datetime):
-                        try:
-                            if sample.tzinfo:
-                                tz = sample.tzinfo
-                                series = pd.Series(
-                                    array[column], dtype="datetime64[ns]"
-                                )
-                                series = pd.to_datetime(series).dt.tz_localize(tz)
-                                pa_data[i] = pa.Array.from_pandas(
-                                    series, type=pa.timestamp("ns", tz=tz)
-                                )
-                        except Exception as e:
-                            logger.exception(e)
+        if column_names and data:
+            # transpose the rows once, each column is then converted on its own.
+            # Lists of values are much faster to convert than tuples for Arrow.
+            pa_data = [
+                self.convert_column([row[i] for row in data])
+                for i in range(len(column_names))
+            ]
 
         self.table = pa.Table.from_arrays(pa_data, names=column_names)
         self._type_dict: Dict[str, Any] = {}
@@ -153,6 +106,51 @@ class SupersetResultSet:
         except Exception as e:
             logger.exception(e)
 
+    @classmethod
+    def convert_column(cls, values: List[Any]) -> pa.Array:
+        """Converts the values of a column to an Arrow array
+
+        Arrow infers the type of the column in a single pass, which succeeds for
+        the columns holding values of a single type. Columns mixing types and
+        nested columns are serialized to strings instead.
+        """
+        try:
+            array = pa.array(values)
+        except (
+            pa.lib.ArrowInvalid,
+            pa.lib.ArrowTypeError,
+            pa.lib.ArrowNotImplementedError,
+            TypeError,  # this is super hackey, https://issues.apache.org/jira/browse/ARROW-7855
+        ):
+            # attempt serialization of values as strings
+            return pa.array([stringify(value) for value in values])
+
+        if pa.types.is_nested(array.type):
+            # TODO: revisit nested column serialization once PyArrow updated with:
+            # https://github.com/apache/arrow/pull/6199
+            # Related issue: https://github.com/apache/incubator-superset/issues/8978
+            return pa.array([stringify(value) for value in values])
+
+        if pa.types.is_temporal(array.type):
+            # workaround for bug converting `psycopg2.tz.FixedOffsetTimezone` tzinfo values.
+            # related: https://issues.apache.org/jira/browse/ARROW-5248
+            sample = cls.first_nonempty(values)
+            if sample and isinstance(sample, datetime.datetime):
+                try:
+                    if sample.tzinfo:
+                        tz = sample.tzinfo
+                        series = pd.Series(
+                            np.array(values, dtype=object), dtype="datetime64[ns]"
+                        )
+                        series = pd.to_datetime(series).dt.tz_localize(tz)
+                        array = pa.Array.from_pandas(
+                            series, type=pa.timestamp("ns", tz=tz)
+                        )
+                except Exception as e:
+                    logger.exception(e)
+
+        return array
+
     @staticmethod
     def convert_pa_dtype(pa_dtype: pa.DataType) -> Optional[str]:
         if pa.types.is_boolean(pa_dtype):
@@ -172,7 +170,7 @@ class SupersetResultSet:
         return table.to_pandas(integer_object_nulls=True)
 
     @staticmethod
-    def first_nonempty(items: List) -> Any:
+    def first_nonempty(items: Sequence[Any]) -> Any:
         return next((i for i in items if i), None)
 
     def is_temporal(self, db_type_str: Optional[str]) -> bool:
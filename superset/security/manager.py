@@ -17,16 +17,30 @@
 # pylint: disable=C,R,W
 """A set of constants and methods to manage permissions and security"""
 import logging
-from typing import Any, Callable, List, Optional, Set, Tuple, TYPE_CHECKING, Union
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    FrozenSet,
+    Iterable,
+    List,
+    NamedTuple,
+    Optional,
+    Set,
+    Tuple,
+    TYPE_CHECKING,
+    Union,
+)
 
-from flask import current_app, g
+from flask import current_app, g, has_app_context
 from flask_appbuilder import Model
 from flask_appbuilder.security.sqla import models as ab_models
 from flask_appbuilder.security.sqla.manager import SecurityManager
-from flask_appbuilder.security.sqla.models import (
-    assoc_permissionview_role,
-    assoc_user_role,
-)
+from flask_appbuilder.security.sqla.models import assoc_permissionview_role
 from flask_appbuilder.security.views import (
     PermissionModelView,
     PermissionViewModelView,
@@ -35,8 +49,9 @@ from flask_appbuilder.security.views import (
     ViewMenuModelView,
 )
 from flask_appbuilder.widgets import ListWidget
-from sqlalchemy import or_
+from sqlalchemy import event, or_
 from sqlalchemy.engine.base import Connection
+from sqlalchemy.orm import object_session, Session
 from sqlalchemy.orm.mapper import Mapper
 
 from superset import sql_parse
@@ -93,8 +108,31 @@ PermissionModelView.include_route_methods = {RouteMethod.LIST}
 ViewMenuModelView.include_route_methods = {RouteMethod.LIST}
 
 
+RLS_FILTERS_VERSION_KEY = "rls_filters_version"
+PERMISSIONS_VERSION_KEY = "permissions_version"
+# the versions to bump once the transaction of the session commits
+PENDING_CACHE_VERSIONS_KEY = "pending_security_cache_versions"
+
+# permission name -> view menu names
+PermissionsSnapshot = Dict[str, FrozenSet[str]]
+
+# permissions cache key -> expiry and snapshot, for the most recently used sets of
+# roles
+_permissions_snapshots: "OrderedDict[str, Tuple[float, PermissionsSnapshot]]" = (
+    OrderedDict()
+)
+_permissions_snapshots_lock = threading.Lock()
+
+
+class RLSFilter(NamedTuple):
+    id: int  # pylint: disable=invalid-name
+    clause: str
+
+
 class SupersetSecurityManager(SecurityManager):
     userstatschartview = None
+    # the number of permissions snapshots, one per set of roles, kept per process
+    MAX_PERMISSIONS_SNAPSHOTS = 1000
     READ_ONLY_MODEL_VIEWS = {"DatabaseAsync", "DatabaseView", "DruidClusterModelView"}
 
     USER_MODEL_VIEWS = {
@@ -203,6 +241,29 @@ class SupersetSecurityManager(SecurityManager):
             return self.is_item_public(permission_name, view_name)
         return self._has_view_access(user, permission_name, view_name)
 
+    def _has_view_access(self, user: Any, permission_name: str, view_name: str) -> bool:
+        """
+        Return True if the user roles grant the FAB permission/view, False otherwise.
+
+        The roles stored in the metadata database are checked against their
+        permissions snapshot rather than queried.
+
+        :param user: The FAB user
+        :param permission_name: The FAB permission name
+        :param view_name: The FAB view-menu name
+        :returns: Whether the user roles grant the FAB permission/view
+        """
+
+        db_roles = []
+        for role in user.roles:
+            if role.name in self.builtin_roles:
+                if self._has_access_builtin_roles(role, permission_name, view_name):
+                    return True
+            else:
+                db_roles.append(role)
+        permissions = self.get_permissions_snapshot(db_roles)
+        return view_name in permissions.get(permission_name, ())
+
     def can_access_all_queries(self) -> bool:
         """
         Return True if the user can access all queries, False otherwise.
@@ -428,37 +489,110 @@ class SupersetSecurityManager(SecurityManager):
         return db.session.query(self.role_model).filter_by(name="Public").first()
 
     def user_view_menu_names(self, permission_name: str) -> Set[str]:
+        if not g.user.is_anonymous:
+            roles = g.user.roles
+        else:
+            # Properly treat anonymous user
+            public_role = self.get_public_role()
+            if not public_role:
+                return set()
+            roles = [public_role]
+        return set(self.get_permissions_snapshot(roles).get(permission_name, ()))
+
+    def get_permissions_snapshot(self, roles: Iterable[Any]) -> PermissionsSnapshot:
+        """
+        Return the view-menu names granted by the roles, per permission name.
+
+        The snapshot is built once per request and set of roles. With a shared
+        security cache (see SECURITY_CACHE_CONFIG), it is kept there until a role or
+        a permission changes, and in process for SECURITY_CACHE_LOCAL_TIMEOUT
+        seconds at most.
+
+        :param roles: The FAB roles
+        :returns: The view-menu names per permission name
+        """
+        from superset import security_cache
+        from superset.extensions import cache_manager
+
+        role_ids = sorted(role.id for role in roles)
+        roles_key = ",".join(str(role_id) for role_id in role_ids)
+        if not cache_manager.security_cache_is_shared:
+            # a change made through another process would never be seen
+            if not has_app_context():
+                return self._build_permissions_snapshot(role_ids)
+            request_snapshots = g.setdefault("permissions_snapshots", {})
+            if roles_key not in request_snapshots:
+                request_snapshots[roles_key] = self._build_permissions_snapshot(
+                    role_ids
+                )
+            return request_snapshots[roles_key]
+
+        cache_key = "permissions__{}__{}".format(
+            self._get_cache_version(PERMISSIONS_VERSION_KEY), roles_key
+        )
+        now = time.monotonic()
+        with _permissions_snapshots_lock:
+            expires_at, snapshot = _permissions_snapshots.get(cache_key, (0, None))
+            if snapshot is not None and now < expires_at:
+                _permissions_snapshots.move_to_end(cache_key)
+                return snapshot
+
+        pairs = security_cache.get(cache_key)
+        if pairs is None:
+            pairs = [tuple(pair) for pair in self._query_role_permissions(role_ids)]
+            security_cache.set(cache_key, pairs)
+        snapshot = self._get_snapshot(pairs)
+
+        with _permissions_snapshots_lock:
+            _permissions_snapshots[cache_key] = (
+                now + current_app.config["SECURITY_CACHE_LOCAL_TIMEOUT"],
+                snapshot,
+            )
+            _permissions_snapshots.move_to_end(cache_key)
+            while len(_permissions_snapshots) > self.MAX_PERMISSIONS_SNAPSHOTS:
+                _permissions_snapshots.popitem(last=False)
+        return snapshot
+
+    def _build_permissions_snapshot(self, role_ids: List[int]) -> PermissionsSnapshot:
+        return self._get_snapshot(self._query_role_permissions(role_ids))
+
+    @staticmethod
+    def _get_snapshot(pairs: Iterable[Tuple[str, str]]) -> PermissionsSnapshot:
+        view_menu_names: Dict[str, Set[str]] = {}
+        for permission_name, view_menu_name in pairs:
+            view_menu_names.setdefault(permission_name, set()).add(view_menu_name)
+        return {
+            permission_name: frozenset(names)
+            for permission_name, names in view_menu_names.items()
+        }
+
+    def _query_role_permissions(self, role_ids: List[int]) -> List[Tuple[str, str]]:
         from superset import db
 
-        base_query = (
-            db.session.query(self.viewmenu_model.name)
-            .join(self.permissionview_model)
+        if not role_ids:
+            return []
+        return (
+            db.session.query(self.permission_model.name, self.viewmenu_model.name)
+            .select_from(self.permissionview_model)
             .join(self.permission_model)
+            .join(self.viewmenu_model)
             .join(assoc_permissionview_role)
-            .join(self.role_model)
+            .filter(assoc_permissionview_role.c.role_id.in_(role_ids))
+            .distinct()
+            .all()
         )
 
-        if not g.user.is_anonymous:
-            # filter by user id
-            view_menu_names = (
-                base_query.join(assoc_user_role)
-                .join(self.user_model)
-                .filter(self.user_model.id == g.user.id)
-                .filter(self.permission_model.name == permission_name)
-            ).all()
-            return set([s.name for s in view_menu_names])
-
-        # Properly treat anonymous user
-        public_role = self.get_public_role()
-        if public_role:
-            # filter by public role
-            view_menu_names = (
-                base_query.filter(self.role_model.id == public_role.id).filter(
-                    self.permission_model.name == permission_name
-                )
-            ).all()
-            return set([s.name for s in view_menu_names])
-        return set()
+    def bump_permissions_version(  # pylint: disable=unused-argument
+        self, mapper: Mapper, connection: Connection, target: Model
+    ) -> None:
+        """
+        Invalidates the permissions snapshots of every role once committed.
+
+        :param mapper: The role, permission or view-menu mapper
+        :param connection: The DB-API connection
+        :param target: The role, permission or view-menu being persisted
+        """
+        self._bump_cache_version_on_commit(PERMISSIONS_VERSION_KEY, target)
 
     def schemas_accessible_by_user(
         self, database: "Database", schemas: List[str], hierarchical: bool = True
@@ -906,6 +1040,7 @@ class SupersetSecurityManager(SecurityManager):
                     "can_add",
                     "can_reject_report",
                     "can_publish_report",
+                    "can_publish_status",
                 }
                 and pvm.view_menu.name in self.REPORT_USER_ONLY_MODEL_VIEWS
             )
@@ -1041,40 +1176,143 @@ class SupersetSecurityManager(SecurityManager):
 
         self.assert_datasource_permission(viz.datasource)
 
-    def get_rls_filters(self, table: "BaseDatasource"):
+    def get_rls_filters(self, table: "BaseDatasource") -> List[RLSFilter]:
         """
         Retrieves the appropriate row level security filters for the current user and the passed table.
 
+        The filters are resolved once per request. With a shared security cache
+        (see SECURITY_CACHE_CONFIG), they are cached across requests for the roles
+        of the user until a filter changes.
+
         :param table: The table to check against
         :returns: A list of filters.
         """
         if hasattr(g, "user") and hasattr(g.user, "id"):
-            from superset import db
-            from superset.connectors.sqla.models import (
-                RLSFilterRoles,
-                RowLevelSecurityFilter,
-            )
-
-            user_roles = (
-                db.session.query(assoc_user_role.c.role_id)
-                .filter(assoc_user_role.c.user_id == g.user.id)
-                .subquery()
-            )
-            filter_roles = (
-                db.session.query(RLSFilterRoles.c.id)
-                .filter(RLSFilterRoles.c.role_id.in_(user_roles))
-                .subquery()
-            )
-            query = (
-                db.session.query(
-                    RowLevelSecurityFilter.id, RowLevelSecurityFilter.clause
-                )
-                .filter(RowLevelSecurityFilter.table_id == table.id)
-                .filter(RowLevelSecurityFilter.id.in_(filter_roles))
-            )
-            return query.all()
+            request_cache = g.setdefault("rls_filters", {})
+            key = (g.user.id, table.id)
+            if key not in request_cache:
+                request_cache[key] = self._get_cached_rls_filters(table)
+            return request_cache[key]
         return []
 
+    def _get_cached_rls_filters(self, table: "BaseDatasource") -> List[RLSFilter]:
+        from superset import security_cache
+        from superset.extensions import cache_manager
+
+        role_ids = sorted(role.id for role in g.user.roles)
+        if not cache_manager.security_cache_is_shared:
+            # a change made through another process would never be seen
+            return [
+                RLSFilter(rls_filter.id, rls_filter.clause)
+                for rls_filter in self._query_rls_filters(table, role_ids)
+            ]
+
+        # the key changes along with the roles of the user, so only changes to
+        # the filters themselves need to bump the version
+        cache_key = "rls_filters__{}__{}__{}".format(
+            self._get_cache_version(RLS_FILTERS_VERSION_KEY),
+            ",".join(str(role_id) for role_id in role_ids),
+            table.id,
+        )
+        filters = security_cache.get(cache_key)
+        if filters is None:
+            filters = [
+                (rls_filter.id, rls_filter.clause)
+                for rls_filter in self._query_rls_filters(table, role_ids)
+            ]
+            security_cache.set(cache_key, filters)
+        return [RLSFilter(*rls_filter) for rls_filter in filters]
+
+    @staticmethod
+    def _query_rls_filters(table: "BaseDatasource", role_ids: List[int]):
+        from superset import db
+        from superset.connectors.sqla.models import (
+            RLSFilterRoles,
+            RowLevelSecurityFilter,
+        )
+
+        filter_ids = (
+            db.session.query(RLSFilterRoles.c.rls_filter_id)
+            .filter(RLSFilterRoles.c.role_id.in_(role_ids))
+            .subquery()
+        )
+        return (
+            db.session.query(RowLevelSecurityFilter.id, RowLevelSecurityFilter.clause)
+            .filter(RowLevelSecurityFilter.table_id == table.id)
+            .filter(RowLevelSecurityFilter.id.in_(filter_ids))
+            .all()
+        )
+
+    @staticmethod
+    def _get_cache_version(key: str) -> str:
+        """
+        Returns the version of the cached security data stored under the key,
+        shared by all the processes through the security cache and memoized for the
+        request.
+
+        :param key: The cache key of the version
+        :returns: The version
+        """
+        from superset import security_cache
+
+        versions = g.setdefault("security_cache_versions", {})
+        if key not in versions:
+            version = security_cache.get(key)
+            if version is None:
+                # never reuse data cached before the version got evicted
+                version = uuid.uuid4().hex
+                security_cache.set(key, version, timeout=0)
+            versions[key] = version
+        return versions[key]
+
+    @staticmethod
+    def _bump_cache_version(key: str) -> None:
+        """
+        Invalidates the cached security data versioned under the key.
+
+        :param key: The cache key of the version
+        """
+        from superset import security_cache
+
+        security_cache.set(key, uuid.uuid4().hex, timeout=0)
+        if has_app_context():
+            g.pop("security_cache_versions", None)
+            if key == PERMISSIONS_VERSION_KEY:
+                g.pop("permissions_snapshots", None)
+            if key == RLS_FILTERS_VERSION_KEY:
+                g.pop("rls_filters", None)
+
+    @staticmethod
+    def _bump_cache_version_on_commit(key: str, target: Optional[Model]) -> None:
+        """
+        Invalidates the cached security data versioned under the key once the
+        transaction persisting the target commits.
+
+        Bumping the version at flush time would let a concurrent request read the
+        new version along with the data not committed yet, and cache the old data
+        under the new version.
+
+        :param key: The cache key of the version
+        :param target: The instance being persisted
+        """
+        session = object_session(target) if target is not None else None
+        if session is None:
+            SupersetSecurityManager._bump_cache_version(key)
+        else:
+            session.info.setdefault(PENDING_CACHE_VERSIONS_KEY, set()).add(key)
+
+    def bump_rls_filters_version(  # pylint: disable=unused-argument
+        self, mapper: Mapper, connection: Connection, target: Model
+    ) -> None:
+        """
+        Invalidates the cached row level security filters once committed.
+
+        :param mapper: The filter mapper
+        :param connection: The DB-API connection
+        :param target: The filter being persisted
+        """
+        self._bump_cache_version_on_commit(RLS_FILTERS_VERSION_KEY, target)
+
     def get_rls_ids(self, table: "BaseDatasource") -> List[int]:
         """
         Retrieves the appropriate row level security filters IDs for the current user and the passed table.
@@ -1085,3 +1323,15 @@ class SupersetSecurityManager(SecurityManager):
         ids = [f.id for f in self.get_rls_filters(table)]
         ids.sort()  # Combinations rather than permutations
         return ids
+
+
+@event.listens_for(Session, "after_commit")
+def bump_pending_cache_versions(session: Session) -> None:
+    # pylint: disable=protected-access
+    for key in session.info.pop(PENDING_CACHE_VERSIONS_KEY, ()):
+        SupersetSecurityManager._bump_cache_version(key)
+
+
+@event.listens_for(Session, "after_rollback")
+def discard_pending_cache_versions(session: Session) -> None:
+    session.info.pop(PENDING_CACHE_VERSIONS_KEY, None)
@@ -45,6 +45,7 @@ from superset.extensions import celery_app
 from superset.models.sql_lab import Query
 from superset.result_set import SupersetResultSet
 from superset.sql_parse import ParsedQuery
+from superset.utils import chunked_results
 from superset.utils.core import (
     json_iso_dttm_ser,
     QuerySource,
@@ -354,7 +355,7 @@ def execute_sql_statements(
 
     engine = database.get_sqla_engine(
         schema=query.schema,
-        nullpool=True,
+        nullpool=not config["SQLLAB_ENGINE_POOLING"],
         user_name=user_name,
         source=QuerySource.SQL_LAB,
     )
@@ -403,9 +404,21 @@ def execute_sql_statements(
     query.end_time = now_as_float()
 
     use_arrow_data = store_results and results_backend_use_msgpack
-    data, selected_columns, all_columns, expanded_columns = _serialize_and_expand_data(
-        result_set, db_engine_spec, use_arrow_data, expand_data
-    )
+    batch_size = config["RESULTS_BACKEND_BATCH_SIZE"] if use_arrow_data else 0
+    if batch_size:
+        # the rows are stored as record batches, next to the payload
+        data = None
+        selected_columns = all_columns = result_set.columns
+        expanded_columns = []
+    else:
+        (
+            data,
+            selected_columns,
+            all_columns,
+            expanded_columns,
+        ) = _serialize_and_expand_data(
+            result_set, db_engine_spec, use_arrow_data, expand_data
+        )
 
     # TODO: data should be saved separately from metadata (likely in Parquet)
     payload.update(
@@ -423,23 +436,34 @@ def execute_sql_statements(
     if store_results and results_backend:
         key = str(uuid.uuid4())
         logger.info(f"Query {query_id}: Storing results in results backend, key: {key}")
+        cache_timeout = database.cache_timeout
+        if cache_timeout is None:
+            cache_timeout = config["CACHE_DEFAULT_TIMEOUT"]
         with stats_timing("sqllab.query.results_backend_write", stats_logger):
-            with stats_timing(
-                "sqllab.query.results_backend_write_serialization", stats_logger
-            ):
-                serialized_payload = _serialize_payload(
-                    payload, results_backend_use_msgpack
+            if batch_size:
+                chunked_results.store_results(
+                    results_backend,
+                    key,
+                    {k: v for k, v in payload.items() if k != "data"},
+                    result_set.pa_table,
+                    batch_size,
+                    config["RESULTS_BACKEND_COMPRESSION"],
+                    cache_timeout,
                 )
-            cache_timeout = database.cache_timeout
-            if cache_timeout is None:
-                cache_timeout = config["CACHE_DEFAULT_TIMEOUT"]
+            else:
+                with stats_timing(
+                    "sqllab.query.results_backend_write_serialization", stats_logger
+                ):
+                    serialized_payload = _serialize_payload(
+                        payload, results_backend_use_msgpack
+                    )
 
-            compressed = zlib_compress(serialized_payload)
-            logger.debug(
-                f"*** serialized payload size: {getsizeof(serialized_payload)}"
-            )
-            logger.debug(f"*** compressed payload size: {getsizeof(compressed)}")
-            results_backend.set(key, compressed, cache_timeout)
+                compressed = zlib_compress(serialized_payload)
+                logger.debug(
+                    f"*** serialized payload size: {getsizeof(serialized_payload)}"
+                )
+                logger.debug(f"*** compressed payload size: {getsizeof(compressed)}")
+                results_backend.set(key, compressed, cache_timeout)
         query.results_key = key
 
     query.status = QueryStatus.SUCCESS
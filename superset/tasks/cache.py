@@ -18,25 +18,37 @@
 
 import json
 import logging
-from typing import Any, Dict, Optional
-from urllib import request
-from urllib.error import URLError
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
 
+from celery import chord
 from celery.utils.log import get_task_logger
 from sqlalchemy import and_, func
 
-from superset import app, db
+from superset import app, cache, db
 from superset.extensions import celery_app
 from superset.models.core import Log
 from superset.models.dashboard import Dashboard
 from superset.models.slice import Slice
 from superset.models.tags import Tag, TaggedObject
-from superset.utils.core import parse_human_datetime
+from superset.utils.core import (
+    error_msg_from_exception,
+    parse_human_datetime,
+    QueryStatus,
+)
+from superset.utils.dates import now_as_float
 from superset.views.utils import build_extra_filters
 
 logger = get_task_logger(__name__)
 logger.setLevel(logging.INFO)
 
+config = app.config
+stats_logger = config["STATS_LOGGER"]
+
+# a chart, and the extra filters it was loaded with as a sorted JSON list
+ChartRequest = Tuple[int, str]
+
 
 def get_form_data(chart_id, dashboard=None):
     """
@@ -87,8 +99,8 @@ class Strategy:
     """
     A cache warm up strategy.
 
-    Each strategy defines a `get_urls` method that returns a list of URLs to
-    be fetched from the `/superset/warm_up_cache/` endpoint.
+    Each strategy defines a `get_charts` method that returns the charts to warm
+    up, along with the `form_data` overrides to apply to each of them.
 
     Strategies can be configured in `superset/config.py`:
 
@@ -106,11 +118,24 @@ class Strategy:
 
     """
 
+    # charts whose data is cached until then are not warmed up again
+    fresh_until: Optional[datetime] = None
+
     def __init__(self):
         pass
 
-    def get_urls(self):
-        raise NotImplementedError("Subclasses must implement get_urls!")
+    def get_charts(self) -> Iterator[Tuple[Slice, Optional[Dict[str, Any]]]]:
+        raise NotImplementedError("Subclasses must implement get_charts!")
+
+    def get_urls(self) -> List[str]:
+        return [get_url(chart, overrides) for chart, overrides in self.get_charts()]
+
+    def get_payloads(self) -> List[Dict[str, Any]]:
+        """Returns the chart ids and `form_data` overrides the warmup runs with"""
+        return [
+            {"chart_id": chart.id, "form_data": overrides or {"slice_id": chart.id}}
+            for chart, overrides in self.get_charts()
+        ]
 
 
 class DummyStrategy(Strategy):
@@ -131,11 +156,10 @@ class DummyStrategy(Strategy):
 
     name = "dummy"
 
-    def get_urls(self):
+    def get_charts(self):
         session = db.create_scoped_session()
-        charts = session.query(Slice).all()
-
-        return [get_url(chart) for chart in charts]
+        for chart in session.query(Slice).all():
+            yield chart, None
 
 
 class TopNDashboardsStrategy(Strategy):
@@ -163,8 +187,7 @@ class TopNDashboardsStrategy(Strategy):
         self.top_n = top_n
         self.since = parse_human_datetime(since)
 
-    def get_urls(self):
-        urls = []
+    def get_charts(self):
         session = db.create_scoped_session()
 
         records = (
@@ -179,10 +202,7 @@ class TopNDashboardsStrategy(Strategy):
         dashboards = session.query(Dashboard).filter(Dashboard.id.in_(dash_ids)).all()
         for dashboard in dashboards:
             for chart in dashboard.slices:
-                form_data_with_filters = get_form_data(chart.id, dashboard)
-                urls.append(get_url(chart, form_data_with_filters))
-
-        return urls
+                yield chart, get_form_data(chart.id, dashboard)
 
 
 class DashboardTagsStrategy(Strategy):
@@ -207,8 +227,7 @@ class DashboardTagsStrategy(Strategy):
         super(DashboardTagsStrategy, self).__init__()
         self.tags = tags or []
 
-    def get_urls(self):
-        urls = []
+    def get_charts(self):
         session = db.create_scoped_session()
 
         tags = session.query(Tag).filter(Tag.name.in_(self.tags)).all()
@@ -229,7 +248,7 @@ class DashboardTagsStrategy(Strategy):
         tagged_dashboards = session.query(Dashboard).filter(Dashboard.id.in_(dash_ids))
         for dashboard in tagged_dashboards:
             for chart in dashboard.slices:
-                urls.append(get_url(chart))
+                yield chart, None
 
         # add charts that are tagged
         tagged_objects = (
@@ -245,12 +264,319 @@ class DashboardTagsStrategy(Strategy):
         chart_ids = [tagged_object.object_id for tagged_object in tagged_objects]
         tagged_charts = session.query(Slice).filter(Slice.id.in_(chart_ids))
         for chart in tagged_charts:
-            urls.append(get_url(chart))
+            yield chart, None
+
+
+def get_hour_of_week(dttm: datetime) -> int:
+    return dttm.weekday() * 24 + dttm.hour
+
+
+def parse_chart_request(
+    slice_id: Optional[int], log_json: Optional[str]
+) -> ChartRequest:
+    """The chart and extra filters an explore_json log entry was for"""
+    extra_filters: List[Dict[str, Any]] = []
+    try:
+        form_data = json.loads(json.loads(log_json or "{}").get("form_data") or "{}")
+        extra_filters = form_data.get("extra_filters") or []
+        slice_id = slice_id or int(form_data.get("slice_id") or 0)
+    except (AttributeError, TypeError, ValueError):
+        pass
+    return slice_id or 0, json.dumps(extra_filters, sort_keys=True)
+
+
+def get_chart_requests(
+    session, since: datetime, until: Optional[datetime] = None
+) -> Iterator[Tuple[datetime, ChartRequest]]:
+    """
+    The charts loaded since a date, in order.
+
+    The charts of a dashboard are loaded through explore_json as well, along
+    with the dashboard filters applied to them.
+
+    """
+    query = session.query(Log.dttm, Log.slice_id, Log.json).filter(
+        and_(Log.action == "explore_json", Log.dttm >= since)
+    )
+    if until:
+        query = query.filter(Log.dttm < until)
+    for dttm, slice_id, log_json in query.order_by(Log.dttm).yield_per(1000):
+        request = parse_chart_request(slice_id, log_json)
+        if request[0]:
+            yield dttm, request
+
+
+class DemandProfile:
+    """Average number of loads of each chart request per hour of the week"""
+
+    def __init__(self, weeks: float) -> None:
+        self.weeks = max(weeks, 1.0)
+        self.counts: Dict[int, Counter] = defaultdict(Counter)
+
+    def add(self, dttm: datetime, request: ChartRequest, count: int = 1) -> None:
+        self.counts[get_hour_of_week(dttm)][request] += count
+
+    def predict(
+        self, dttm: datetime, top_n: int, min_hits: float = 1.0
+    ) -> List[Tuple[ChartRequest, float]]:
+        """The most loaded requests in the hour of the week of the date"""
+        demand = [
+            (request, count / self.weeks)
+            for request, count in self.counts[get_hour_of_week(dttm)].most_common()
+        ]
+        return [(request, hits) for request, hits in demand if hits >= min_hits][:top_n]
+
+
+def get_demand_profile(
+    requests: Iterable[Tuple[datetime, ChartRequest]], weeks: float
+) -> DemandProfile:
+    profile = DemandProfile(weeks)
+    for dttm, request in requests:
+        profile.add(dttm, request)
+    return profile
+
+
+class PredictiveStrategy(Strategy):
+    """
+    Warm up the charts, with the filters, expected to be loaded in the next hour.
+
+    The charts loaded over the past weeks are counted by hour of the week, and
+    the ones loaded at least `min_hits` times on average in the hour starting
+    within `lead_time` minutes are warmed up, the most loaded first. Charts
+    still cached until the end of that hour are skipped. Schedule it a bit
+    before each hour, `scripts/simulate_predictive_warmup.py` estimates the hit
+    rate it brings for given parameters:
+
+        CELERYBEAT_SCHEDULE = {
+            'cache-warmup-predictive': {
+                'task': 'cache-warmup',
+                'schedule': crontab(minute=45, hour='*'),
+                'kwargs': {
+                    'strategy_name': 'predictive',
+                    'top_n': 50,
+                    'since': '28 days ago',
+                    'lead_time': 15,
+                },
+            },
+        }
+
+    """
+
+    name = "predictive"
+
+    def __init__(self, top_n=50, since="28 days ago", lead_time=15, min_hits=1.0):
+        super(PredictiveStrategy, self).__init__()
+        self.top_n = top_n
+        self.since = parse_human_datetime(since)
+        self.weeks = (datetime.now() - self.since).total_seconds() / (7 * 24 * 3600)
+        self.min_hits = min_hits
+        # the logs and the cached data are timestamped in UTC
+        self.peak = (datetime.utcnow() + timedelta(minutes=lead_time)).replace(
+            minute=0, second=0, microsecond=0
+        )
+        self.fresh_until = self.peak + timedelta(hours=1)
+
+    def get_charts(self):
+        session = db.create_scoped_session()
 
-        return urls
+        profile = get_demand_profile(
+            get_chart_requests(session, self.since), self.weeks
+        )
+        hot_requests = profile.predict(self.peak, self.top_n, self.min_hits)
+        chart_ids = {slice_id for (slice_id, _), _ in hot_requests}
+        charts = {
+            chart.id: chart
+            for chart in session.query(Slice).filter(Slice.id.in_(chart_ids))
+        }
+        for (slice_id, extra_filters), _ in hot_requests:
+            if slice_id not in charts:
+                continue
+            form_data: Dict[str, Any] = {"slice_id": slice_id}
+            if extra_filters != "[]":
+                form_data["extra_filters"] = json.loads(extra_filters)
+            yield charts[slice_id], form_data
+
+
+strategies = [
+    DummyStrategy,
+    TopNDashboardsStrategy,
+    DashboardTagsStrategy,
+    PredictiveStrategy,
+]
+
+
+def get_viz_obj(form_data: Dict[str, Any], force: bool = False):
+    """Builds the viz of a chart as the explore_json endpoint does"""
+    # pylint: disable=import-outside-toplevel
+    from superset.views.utils import get_form_data as get_explore_form_data, get_viz
+
+    with app.test_request_context(query_string={"form_data": json.dumps(form_data)}):
+        form_data, slc = get_explore_form_data(use_slice_data=True)
+    if slc is None:
+        raise ValueError(f"Chart {form_data.get('slice_id')} not found")
+    return get_viz(
+        datasource_type=slc.datasource_type,
+        datasource_id=slc.datasource_id,
+        form_data=form_data,
+        force=force,
+    )
+
+
+def is_cached_until(cache_key: str, cache_timeout: int, until: datetime) -> bool:
+    """Whether the data cached under the key is still there at a date (UTC)"""
+    cache_value = cache.get(cache_key)
+    if not cache_value:
+        return False
+    try:
+        cached_dttm = datetime.strptime(
+            config["DATA_CACHE_SERIALIZER"].loads(cache_value)["dttm"],
+            "%Y-%m-%dT%H:%M:%S",
+        )
+    except Exception:  # pylint: disable=broad-except
+        return False
+    # a timeout of 0 never expires
+    return not cache_timeout or cached_dttm + timedelta(seconds=cache_timeout) >= until
 
 
-strategies = [DummyStrategy, TopNDashboardsStrategy, DashboardTagsStrategy]
+def get_warmup_jobs(
+    payloads: List[Dict[str, Any]], fresh_until: Optional[datetime] = None
+) -> Tuple[Dict[str, List[Dict[str, Any]]], List[Dict[str, Any]]]:
+    """Groups the payloads by database, once per cache key
+
+    Charts sharing a cache key (the same chart in several dashboards without
+    filters for instance) only need to be warmed up once. Given `fresh_until`,
+    the charts still cached until then are skipped.
+
+    :returns: the payloads to warm up by database, and the ones that failed
+    """
+    jobs: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    errors: List[Dict[str, Any]] = []
+    cache_keys = set()
+    for payload in payloads:
+        try:
+            viz_obj = get_viz_obj(payload["form_data"])
+            query_obj = viz_obj.query_obj()
+            # markup and such don't query anything
+            cache_key = viz_obj.cache_key(query_obj) if query_obj else None
+        except Exception as ex:  # pylint: disable=broad-except
+            logger.exception("Failed to load chart %s", payload["chart_id"])
+            errors.append(
+                {
+                    "chart_id": payload["chart_id"],
+                    "success": False,
+                    "error": error_msg_from_exception(ex),
+                }
+            )
+            continue
+        if cache_key is None:
+            continue
+        if cache_key in cache_keys:
+            stats_logger.incr("cache_warmup.duplicate")
+            continue
+        cache_keys.add(cache_key)
+        if fresh_until and is_cached_until(
+            cache_key, viz_obj.cache_timeout, fresh_until
+        ):
+            stats_logger.incr("cache_warmup.fresh")
+            continue
+        datasource = viz_obj.datasource
+        jobs[f"{datasource.type}__{datasource.database.id}"].append(payload)
+    return jobs, errors
+
+
+def warm_up_chart(chart_id: int, form_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Refreshes the cached data of a chart, and reports how it went"""
+    start = now_as_float()
+    result: Dict[str, Any] = {"chart_id": chart_id, "success": False}
+    try:
+        viz_obj = get_viz_obj(form_data, force=True)
+        payload = viz_obj.get_payload()
+        result["cache_key"] = payload.get("cache_key")
+        result["bytes"] = viz_obj.cached_bytes
+        result["error"] = payload.get("error")
+        result["success"] = payload.get("status") != QueryStatus.FAILED
+    except Exception as ex:  # pylint: disable=broad-except
+        logger.exception("Failed to warm up chart %s", chart_id)
+        result["error"] = error_msg_from_exception(ex)
+    finally:
+        db.session.remove()
+    result["duration"] = now_as_float() - start
+    stats_logger.timing("cache_warmup.chart", result["duration"])
+    stats_logger.incr(
+        "cache_warmup.success" if result["success"] else "cache_warmup.error"
+    )
+    return result
+
+
+@celery_app.task(name="cache-refresh-chart")
+def refresh_chart(  # pylint: disable=too-many-arguments
+    datasource_type: str,
+    datasource_id: int,
+    form_data: Dict[str, Any],
+    cache_key: str,
+    query_obj: Dict[str, Any],
+    extra: Dict[str, Any],
+) -> None:
+    """
+    Refreshes the cached data of a chart served stale.
+
+    :param cache_key: The key of the cached data
+    :param query_obj: The query the data was cached for, see dump_query_obj
+    :param extra: The extra key/values of the cache key
+    """
+    # pylint: disable=import-outside-toplevel
+    from superset.views.utils import get_viz
+    from superset.viz import get_refresh_key, load_query_obj
+
+    start = now_as_float()
+    try:
+        viz_obj = get_viz(
+            datasource_type=datasource_type,
+            datasource_id=datasource_id,
+            form_data=form_data,
+            force=True,
+        )
+        query_obj = load_query_obj(query_obj)
+        if viz_obj.cache_key(query_obj, **extra) != cache_key:
+            # e.g. the chart or its datasource changed since: refreshing would cache
+            # other data, under another key. The stale entry is dropped instead,
+            # for the next request to query the data again
+            logger.warning("Cannot refresh %s, dropping it", cache_key)
+            stats_logger.incr("stale_while_revalidate.key_mismatch")
+            cache.delete(cache_key)
+            return
+        payload = viz_obj.get_df_payload(query_obj, **extra)
+        if payload.get("status") == QueryStatus.FAILED:
+            logger.error("Failed to refresh %s: %s", cache_key, payload.get("error"))
+    except Exception:  # pylint: disable=broad-except
+        logger.exception("Failed to refresh %s", cache_key)
+    finally:
+        cache.delete(get_refresh_key(cache_key))
+        db.session.remove()
+    stats_logger.timing("stale_while_revalidate.refresh", now_as_float() - start)
+
+
+@celery_app.task(name="cache-warmup-charts")
+def warm_up_charts(payloads: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Warms the charts up one after the other"""
+    return [
+        warm_up_chart(payload["chart_id"], payload["form_data"]) for payload in payloads
+    ]
+
+
+@celery_app.task(name="cache-warmup-report")
+def report_warmup(
+    results: List[List[Dict[str, Any]]], errors: List[Dict[str, Any]]
+) -> Dict[str, Any]:
+    results = [result for chunk in results for result in chunk] + errors
+    report = {
+        "success": [result for result in results if result["success"]],
+        "errors": [result for result in results if not result["success"]],
+    }
+    logger.info(
+        "Warmed up %s charts, %s errors", len(report["success"]), len(report["errors"])
+    )
+    return report
 
 
 @celery_app.task(name="cache-warmup")
@@ -258,7 +584,10 @@ def cache_warmup(strategy_name, *args, **kwargs):
     """
     Warm up cache.
 
-    This task periodically hits charts to warm up the cache.
+    This task periodically warms the charts returned by the strategy up. The
+    charts are processed in parallel by `cache-warmup-charts` tasks, up to
+    CACHE_WARMUP_MAX_CONCURRENCY_PER_DATABASE at a time against a database.
+    The `cache-warmup-report` task gathers the results of each chart.
 
     """
     logger.info("Loading strategy")
@@ -280,14 +609,18 @@ def cache_warmup(strategy_name, *args, **kwargs):
         logger.exception(message)
         return message
 
-    results = {"success": [], "errors": []}
-    for url in strategy.get_urls():
-        try:
-            logger.info(f"Fetching {url}")
-            request.urlopen(url)
-            results["success"].append(url)
-        except URLError:
-            logger.exception("Error warming up cache!")
-            results["errors"].append(url)
-
-    return results
+    payloads = strategy.get_payloads()
+    jobs, errors = get_warmup_jobs(payloads, fresh_until=strategy.fresh_until)
+    concurrency = config["CACHE_WARMUP_MAX_CONCURRENCY_PER_DATABASE"]
+    header = [
+        warm_up_charts.s(database_payloads[i::concurrency])
+        for database_payloads in jobs.values()
+        for i in range(min(concurrency, len(database_payloads)))
+    ]
+    if header:
+        chord(header)(report_warmup.s(errors))
+    return {
+        "charts": len(payloads),
+        "scheduled": sum(len(database_payloads) for database_payloads in jobs.values()),
+        "errors": errors,
+    }
@@ -0,0 +1,217 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+"""Publishes the reports to the analytics API, then to the portal
+
+Each step is retried with an exponential backoff. The progress of the latest
+publication of a report chart is kept on its row in the metadata database, for
+the status endpoint to report and so that a publication in progress isn't
+queued twice.
+"""
+import logging
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from celery.utils.log import get_task_logger
+from sqlalchemy import or_
+
+from superset import app, db
+from superset.extensions import celery_app
+from superset.models.hawkeye_chart import HawkeyeChart
+
+logger = get_task_logger(__name__)
+logger.setLevel(logging.INFO)
+
+config = app.config
+stats_logger = config["STATS_LOGGER"]
+
+ANALYTICS_STEP = "analytics"
+PORTAL_STEP = "portal"
+
+PENDING = "pending"
+RUNNING = "running"
+RETRYING = "retrying"
+SUCCESS = "success"
+FAILED = "failed"
+IN_PROGRESS = {PENDING, RUNNING, RETRYING}
+
+
+def get_publish_status(publish_id: str) -> Optional[Dict[str, Any]]:
+    chart = db.session.query(HawkeyeChart).filter_by(publish_id=publish_id).first()
+    if chart is None or chart.publish_status is None:
+        return None
+    return {
+        "publish_id": publish_id,
+        "status": chart.publish_status,
+        **(chart.publish_details or {}),
+    }
+
+
+def set_publish_status(chart: HawkeyeChart, status: str, **kwargs: Any) -> None:
+    """Commits the progress of the publication along with the chart"""
+    chart.publish_status = status
+    chart.publish_details = kwargs
+    chart.publish_changed_on = datetime.now()
+    db.session.commit()
+
+
+def start_publish(slice_id: int, druid_query: Any) -> str:
+    """
+    Queues the publication of the report chart of the slice, unless another one
+    is in progress.
+
+    A publication which didn't move for REPORT_PUBLISH_STATUS_TIMEOUT seconds is
+    considered lost, e.g. along with its worker, and doesn't prevent new ones.
+
+    :param slice_id: The slice the report chart belongs to
+    :param druid_query: The query of the slice, sent to the analytics API
+    :returns: The id of the publication, started or in progress
+    """
+    publish_id = str(uuid.uuid4())
+    now = datetime.now()
+    lost_before = now - timedelta(seconds=config["REPORT_PUBLISH_STATUS_TIMEOUT"])
+    # a single conditional update, so that concurrent requests can't both start
+    started = (
+        db.session.query(HawkeyeChart)
+        .filter(HawkeyeChart.slice_id == slice_id)
+        .filter(
+            or_(
+                HawkeyeChart.publish_status.is_(None),
+                HawkeyeChart.publish_status.notin_(IN_PROGRESS),
+                HawkeyeChart.publish_changed_on < lost_before,
+            )
+        )
+        .update(
+            {
+                HawkeyeChart.publish_id: publish_id,
+                HawkeyeChart.publish_status: PENDING,
+                HawkeyeChart.publish_details: {"step": ANALYTICS_STEP, "attempt": 0},
+                HawkeyeChart.publish_changed_on: now,
+            },
+            synchronize_session=False,
+        )
+    )
+    db.session.commit()
+    if not started:
+        stats_logger.incr("report_publish.in_progress")
+        return (
+            db.session.query(HawkeyeChart.publish_id)
+            .filter(HawkeyeChart.slice_id == slice_id)
+            .scalar()
+        )
+
+    publish_report.apply_async(
+        kwargs={
+            "publish_id": publish_id,
+            "slice_id": slice_id,
+            "druid_query": druid_query,
+        },
+        task_id=publish_id,
+    )
+    return publish_id
+
+
+@celery_app.task(name="report_api.publish_report", bind=True, max_retries=None)
+def publish_report(  # pylint: disable=too-many-arguments
+    ctask,
+    publish_id: str,
+    slice_id: int,
+    druid_query: Any,
+    chart_id: Optional[str] = None,
+    step: str = ANALYTICS_STEP,
+    attempt: int = 0,
+) -> None:
+    """
+    Publishes the report of a slice, resuming from the failed step on retries.
+
+    :param publish_id: The id the status of the publication is kept under
+    :param slice_id: The slice the report chart belongs to
+    :param druid_query: The query of the slice, sent to the analytics API
+    :param chart_id: The report chart id as renamed by the analytics step, if any
+    :param step: The step to start from
+    :param attempt: The attempt of the step, from 0
+    """
+    # pylint: disable=import-outside-toplevel
+    from superset.report_api import PUBLISHED, ReportAPI
+
+    report_api = ReportAPI()
+    chart = db.session.query(HawkeyeChart).filter_by(slice_id=slice_id).one()
+    if chart.publish_id != publish_id:
+        logger.warning("Publication %s was superseded, skipping it", publish_id)
+        return
+    chart.druid_query = druid_query
+    if chart_id:
+        chart.chart_id = chart_id
+
+    try:
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            report_config = None
+            published_report_id = chart.hawkeye_report.published_report_id
+            if published_report_id:
+                report_config = executor.submit(
+                    report_api.get_report_config, published_report_id
+                )
+            if step == ANALYTICS_STEP:
+                set_publish_status(chart, RUNNING, step=step, attempt=attempt)
+                # the existing report config is fetched in the meantime
+                job_config = executor.submit(report_api.get_job_config, chart.chart_id)
+                report_api.publish_job_analytics(chart, job_config_future=job_config)
+                step, attempt = PORTAL_STEP, 0
+
+            # commits the changes of the analytics step along with the progress
+            set_publish_status(chart, RUNNING, step=step, attempt=attempt)
+            report_id = report_api.publish_report_portal(
+                chart, report_config_future=report_config
+            )
+    except Exception as ex:  # pylint: disable=broad-except
+        logger.exception("Publishing the report of slice %s failed", slice_id)
+        # the analytics step may have renamed the chart, the portal needs it
+        chart_id = chart.chart_id
+        db.session.rollback()
+        if attempt < config["REPORT_PUBLISH_MAX_RETRIES"]:
+            stats_logger.incr("report_publish.retry")
+            set_publish_status(
+                chart, RETRYING, step=step, attempt=attempt + 1, error=str(ex)
+            )
+            raise ctask.retry(
+                kwargs={
+                    "publish_id": publish_id,
+                    "slice_id": slice_id,
+                    "druid_query": druid_query,
+                    "chart_id": chart_id,
+                    "step": step,
+                    "attempt": attempt + 1,
+                },
+                countdown=config["REPORT_PUBLISH_RETRY_BACKOFF"] * 2 ** attempt,
+            )
+        stats_logger.incr("report_publish.failed")
+        set_publish_status(chart, FAILED, step=step, attempt=attempt, error=str(ex))
+        return
+
+    chart.chart_status = PUBLISHED
+    chart.hawkeye_report.published_report_id = report_id
+    chart.submitted_as_job = True
+    stats_logger.incr("report_publish.success")
+    set_publish_status(
+        chart,
+        SUCCESS,
+        step=step,
+        attempt=attempt,
+        report_status=PUBLISHED,
+        report_id=report_id,
+    )
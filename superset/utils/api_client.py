@@ -0,0 +1,245 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+"""HTTP client for the JSON APIs the reports are published to
+
+Calls go through one ``requests.Session`` per API, so keep-alive connections are
+reused across calls and threads, and every call has connect and read timeouts.
+Idempotent calls are retried with an exponential backoff and full jitter. A
+circuit breaker counts the consecutive failures of an API. Once it opens, calls
+fail fast with ``APIUnavailable`` instead of tying a worker up until the
+timeouts expire. After ``reset_timeout`` seconds a single trial call is let
+through, and its outcome closes or reopens the circuit.
+"""
+import logging
+import os
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+import requests
+import simplejson as json
+from requests.adapters import HTTPAdapter
+
+from superset.exceptions import SupersetException
+from superset.utils.dates import now_as_float
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_API_CLIENT_CONFIG: Dict[str, Any] = {
+    "pool_size": 10,
+    "connect_timeout": 5,
+    "read_timeout": 60,
+    "max_retries": 2,
+    "backoff_factor": 0.5,
+    "failure_threshold": 5,
+    "reset_timeout": 30,
+}
+
+RETRY_METHODS = frozenset(["GET", "HEAD", "OPTIONS"])
+RETRY_STATUSES = frozenset([502, 503, 504])
+
+
+class APIUnavailable(SupersetException):
+    status = 503
+
+
+class CircuitBreaker:
+    """Thread-safe count of the consecutive failures of a backend"""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        failure_threshold: int,
+        reset_timeout: float,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state()
+
+    def _state(self) -> str:
+        if self._opened_at is None:
+            return self.CLOSED
+        if self._clock() - self._opened_at >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def allow_request(self) -> bool:
+        """Whether a call may go through, only one at a time once half open"""
+        with self._lock:
+            state = self._state()
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._trial_running or self._failures >= self.failure_threshold:
+                self._opened_at = self._clock()
+            self._trial_running = False
+
+
+class APIClient:
+    """Calls one JSON API, see the module docstring"""
+
+    def __init__(
+        self,
+        name: str,
+        base_url: str,
+        headers: Optional[Dict[str, str]] = None,
+        config: Optional[Dict[str, Any]] = None,
+        stats_logger: Optional[Any] = None,
+    ) -> None:
+        self.name = name
+        self.base_url = base_url.rstrip("/")
+        self.headers = headers or {}
+        self.config = {**DEFAULT_API_CLIENT_CONFIG, **(config or {})}
+        self.stats_logger = stats_logger
+        self.circuit_breaker = CircuitBreaker(
+            self.config["failure_threshold"], self.config["reset_timeout"]
+        )
+        self._session: Optional[requests.Session] = None
+        self._session_pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+    @property
+    def session(self) -> requests.Session:
+        """The session of this process, connections can't be shared after a fork"""
+        with self._lock:
+            if self._session is None or self._session_pid != os.getpid():
+                adapter = HTTPAdapter(
+                    pool_connections=self.config["pool_size"],
+                    pool_maxsize=self.config["pool_size"],
+                )
+                session = requests.Session()
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                self._session = session
+                self._session_pid = os.getpid()
+            return self._session
+
+    def close(self) -> None:
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+            self._session = None
+
+    def _incr(self, key: str) -> None:
+        if self.stats_logger:
+            self.stats_logger.incr(f"api_client.{self.name}.{key}")
+
+    def _backoff(self, attempt: int) -> float:
+        return random.uniform(0, self.config["backoff_factor"] * 2 ** attempt)
+
+    def request(
+        self, method: str, path: str, json_data: Optional[Any] = None
+    ) -> requests.Response:
+        """Sends a request to the API
+
+        Only the idempotent methods are retried, on connection errors, timeouts
+        and 502/503/504 responses. Writes are left to the caller to retry, as the
+        API may have applied them before failing.
+
+        :raises APIUnavailable: when the circuit is open, or the API failed
+        """
+        method = method.upper()
+        # serialized first, a payload which isn't JSON isn't a failure of the API
+        data = json.dumps(json_data) if json_data is not None else None
+        if not self.circuit_breaker.allow_request():
+            self._incr("circuit_open")
+            raise APIUnavailable(f"The {self.name} API is unavailable")
+
+        try:
+            response = self._send(method, path, data)
+        except BaseException:
+            # whatever interrupted the call, a half open circuit mustn't be left
+            # waiting for the outcome of its trial call
+            self.circuit_breaker.record_failure()
+            raise
+        self.circuit_breaker.record_success()
+        return response
+
+    def _send(self, method: str, path: str, data: Optional[str]) -> requests.Response:
+        max_retries = self.config["max_retries"] if method in RETRY_METHODS else 0
+        timeout = (self.config["connect_timeout"], self.config["read_timeout"])
+        attempt = 0
+        while True:
+            start = now_as_float()
+            try:
+                response = self.session.request(
+                    method,
+                    self.base_url + path,
+                    headers=self.headers,
+                    data=data,
+                    timeout=timeout,
+                )
+                error: Optional[str] = None
+                if response.status_code in RETRY_STATUSES:
+                    error = f"{response.status_code} response"
+            except requests.RequestException as ex:
+                response = None
+                error = str(ex)
+            if self.stats_logger:
+                self.stats_logger.timing(
+                    f"api_client.{self.name}.latency", now_as_float() - start
+                )
+
+            if error is None:
+                return response
+            self._incr("error")
+            logger.warning(
+                "%s %s to the %s API failed: %s", method, path, self.name, error
+            )
+            if attempt >= max_retries:
+                raise APIUnavailable(
+                    f"The {self.name} API failed to answer {method} {path}: {error}"
+                )
+            attempt += 1
+            self._incr("retry")
+            time.sleep(self._backoff(attempt))
+
+    def get(self, path: str) -> requests.Response:
+        return self.request("GET", path)
+
+    def post(self, path: str, json_data: Any) -> requests.Response:
+        return self.request("POST", path, json_data=json_data)
+
+    def patch(self, path: str, json_data: Any) -> requests.Response:
+        return self.request("PATCH", path, json_data=json_data)
@@ -16,6 +16,7 @@
 # under the License.
 from flask import Flask
 from flask_caching import Cache
+from flask_caching.backends import NullCache, SimpleCache
 
 from superset.typing import CacheConfig
 
@@ -26,12 +27,16 @@ class CacheManager:
 
         self._tables_cache = None
         self._cache = None
+        self._security_cache = None
 
     def init_app(self, app: Flask) -> None:
         self._cache = self._setup_cache(app, app.config["CACHE_CONFIG"])
         self._tables_cache = self._setup_cache(
             app, app.config["TABLE_NAMES_CACHE_CONFIG"]
         )
+        self._security_cache = self._setup_cache(
+            app, app.config["SECURITY_CACHE_CONFIG"]
+        )
 
     @staticmethod
     def _setup_cache(app: Flask, cache_config: CacheConfig) -> Cache:
@@ -50,3 +55,13 @@ class CacheManager:
     @property
     def cache(self) -> Cache:
         return self._cache
+
+    @property
+    def security_cache(self) -> Cache:
+        return self._security_cache
+
+    @property
+    def security_cache_is_shared(self) -> bool:
+        """Whether all the processes see the same security cache"""
+        backend = getattr(self._security_cache, "cache", None)
+        return not isinstance(backend, (NullCache, SimpleCache))
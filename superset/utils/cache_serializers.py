@@ -0,0 +1,142 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+"""Serializers for the chart data cache
+
+The chart data cache stores a dict made of the query's dataframe (``df``) and a
+few scalar metadata fields (``query``, ``dttm``). Historically that dict was
+pickled as a whole, which is slow to load back for large frames. The Arrow
+based serializer stores the frame as an Arrow IPC stream (or a Parquet file)
+prefixed by a small JSON header holding the metadata, and falls back to
+unpickling for blobs that were written before the switch.
+"""
+import logging
+import pickle as pkl
+import struct
+from typing import Any, Dict, Optional
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import simplejson as json
+
+logger = logging.getLogger(__name__)
+
+# blobs written by ArrowCacheSerializer start with this marker, anything else
+# is assumed to be a legacy pickled payload
+MAGIC = b"SUPERSET_DF\x01"
+HEADER_LENGTH = struct.Struct(">I")
+
+ARROW_FORMATS = ("ipc", "parquet")
+ARROW_COMPRESSIONS = (None, "lz4", "zstd")
+
+
+class BaseCacheSerializer:
+    """Base class for chart data cache serializers"""
+
+    def dumps(self, value: Dict[str, Any]) -> bytes:
+        """Serialize a cache value holding a ``df`` dataframe"""
+        raise NotImplementedError()
+
+    def loads(self, blob: bytes) -> Dict[str, Any]:
+        """Deserialize a blob written by any of the known serializers"""
+        if is_arrow_payload(blob):
+            return _loads_arrow(blob)
+        return pkl.loads(blob)
+
+
+class PickleCacheSerializer(BaseCacheSerializer):
+    """Pickles the whole cache value, the historical behavior"""
+
+    def dumps(self, value: Dict[str, Any]) -> bytes:
+        return pkl.dumps(value, protocol=pkl.HIGHEST_PROTOCOL)
+
+
+class ArrowCacheSerializer(BaseCacheSerializer):
+    """Stores dataframes in a columnar Arrow format
+
+    :param fmt: either ``ipc`` (Arrow streaming format) or ``parquet``
+    :param compression: ``None``, ``lz4`` or ``zstd``
+    """
+
+    def __init__(self, fmt: str = "ipc", compression: Optional[str] = None) -> None:
+        if fmt not in ARROW_FORMATS:
+            raise ValueError(f"Unsupported format: {fmt}")
+        if compression not in ARROW_COMPRESSIONS:
+            raise ValueError(f"Unsupported compression: {compression}")
+        self.fmt = fmt
+        self.compression = compression
+
+    def dumps(self, value: Dict[str, Any]) -> bytes:
+        df = value.get("df")
+        if not isinstance(df, pd.DataFrame):
+            return pkl.dumps(value, protocol=pkl.HIGHEST_PROTOCOL)
+        try:
+            table = pa.Table.from_pandas(df)
+        except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError) as e:
+            # mixed type object columns can't be represented in Arrow,
+            # those frames are still cached, just not in a columnar format
+            logger.info("Falling back to pickle for the data cache: %s", e)
+            return pkl.dumps(value, protocol=pkl.HIGHEST_PROTOCOL)
+
+        sink = pa.BufferOutputStream()
+        if self.fmt == "parquet":
+            pq.write_table(table, sink, compression=self.compression or "none")
+            body = sink.getvalue()
+            size = body.size
+        else:
+            writer = pa.ipc.new_stream(sink, table.schema)
+            writer.write_table(table)
+            writer.close()
+            body = sink.getvalue()
+            size = body.size
+            if self.compression:
+                body = pa.compress(body, codec=self.compression)
+
+        header = {k: v for k, v in value.items() if k != "df"}
+        header["__format__"] = self.fmt
+        header["__compression__"] = self.compression
+        header["__size__"] = size
+        header_bytes = json.dumps(header).encode("utf-8")
+        return b"".join(
+            [MAGIC, HEADER_LENGTH.pack(len(header_bytes)), header_bytes, body]
+        )
+
+
+def is_arrow_payload(blob: bytes) -> bool:
+    return isinstance(blob, bytes) and blob.startswith(MAGIC)
+
+
+def _loads_arrow(blob: bytes) -> Dict[str, Any]:
+    offset = len(MAGIC)
+    (header_length,) = HEADER_LENGTH.unpack_from(blob, offset)
+    offset += HEADER_LENGTH.size
+    header = json.loads(blob[offset : offset + header_length].decode("utf-8"))
+    offset += header_length
+
+    # slicing a pyarrow buffer doesn't copy the underlying memory
+    body = pa.py_buffer(blob)[offset:]
+    fmt = header.pop("__format__")
+    compression = header.pop("__compression__")
+    size = header.pop("__size__")
+    if fmt == "parquet":
+        table = pq.read_table(pa.BufferReader(body))
+    else:
+        if compression:
+            body = pa.decompress(body, decompressed_size=size, codec=compression)
+        table = pa.ipc.open_stream(body).read_all()
+    header["df"] = table.to_pandas()
+    return header
@@ -0,0 +1,142 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+"""SQL Lab results stored as Arrow record batches in the results backend
+
+The rows are split into batches of a fixed number of rows, each one stored as a
+compressed Arrow IPC stream under its own key (``<key>/<batch number>``). The
+results key itself holds a small index entry with the query payload (status,
+columns, query...) and the batch sizes, so that a page of results or a CSV
+export only reads and decompresses the batches it needs.
+"""
+import zlib
+from typing import Any, Dict, Iterator, Optional
+
+import pyarrow as pa
+import simplejson as json
+
+from superset.utils.core import json_iso_dttm_ser
+
+# index entries start with this marker, anything else is a legacy single blob
+MAGIC = b"SUPERSET_RESULTS\x01"
+COMPRESSIONS = ("zlib", "lz4", "zstd")
+
+
+class ResultsNotFound(Exception):
+    """Some batches of the results expired from the results backend"""
+
+
+def is_chunked_results(blob: Any) -> bool:
+    return isinstance(blob, bytes) and blob.startswith(MAGIC)
+
+
+def get_batch_key(key: str, batch: int) -> str:
+    return f"{key}/{batch}"
+
+
+def _compress(data: bytes, compression: str) -> bytes:
+    if compression == "zlib":
+        return zlib.compress(data)
+    return pa.compress(data, codec=compression, asbytes=True)
+
+
+def _decompress(data: bytes, compression: str, size: int) -> bytes:
+    if compression == "zlib":
+        return zlib.decompress(data)
+    return pa.decompress(data, decompressed_size=size, codec=compression, asbytes=True)
+
+
+def store_results(  # pylint: disable=too-many-arguments
+    results_backend: Any,
+    key: str,
+    payload: Dict[str, Any],
+    table: pa.Table,
+    batch_size: int,
+    compression: str = "zlib",
+    timeout: Optional[int] = None,
+) -> None:
+    """Stores the rows of ``table`` by batches along with the index entry
+
+    :param payload: the query payload, without its ``data``
+    """
+    if compression not in COMPRESSIONS:
+        raise ValueError(f"Unsupported compression: {compression}")
+
+    sizes = []
+    for batch, offset in enumerate(range(0, max(table.num_rows, 1), batch_size)):
+        sink = pa.BufferOutputStream()
+        writer = pa.ipc.new_stream(sink, table.schema)
+        writer.write_table(table.slice(offset, batch_size))
+        writer.close()
+        data = sink.getvalue().to_pybytes()
+        sizes.append(len(data))
+        results_backend.set(
+            get_batch_key(key, batch), _compress(data, compression), timeout
+        )
+
+    # the index goes last so that readers never see partially stored results
+    index = {
+        "payload": payload,
+        "num_rows": table.num_rows,
+        "batch_size": batch_size,
+        "compression": compression,
+        "sizes": sizes,
+    }
+    results_backend.set(
+        key,
+        MAGIC + json.dumps(index, default=json_iso_dttm_ser).encode("utf-8"),
+        timeout,
+    )
+
+
+def load_index(blob: bytes) -> Dict[str, Any]:
+    return json.loads(blob[len(MAGIC) :].decode("utf-8"))
+
+
+def load_batch(results_backend: Any, key: str, index: Dict[str, Any], batch: int):
+    blob = results_backend.get(get_batch_key(key, batch))
+    if not blob:
+        raise ResultsNotFound(f"Batch {batch} of {key} is missing")
+    data = _decompress(blob, index["compression"], index["sizes"][batch])
+    return pa.ipc.open_stream(data).read_all()
+
+
+def iter_batches(
+    results_backend: Any, key: str, index: Dict[str, Any]
+) -> Iterator[pa.Table]:
+    for batch in range(len(index["sizes"])):
+        yield load_batch(results_backend, key, index, batch)
+
+
+def load_rows(
+    results_backend: Any,
+    key: str,
+    index: Dict[str, Any],
+    offset: int = 0,
+    limit: Optional[int] = None,
+) -> pa.Table:
+    """Returns the rows ``[offset, offset + limit)``, reading only their batches"""
+    batch_size = index["batch_size"]
+    stop = index["num_rows"] if limit is None else offset + limit
+    stop = min(stop, index["num_rows"])
+    first = min(offset // batch_size, len(index["sizes"]) - 1)
+    last = max(first, (stop - 1) // batch_size)
+    tables = [
+        load_batch(results_backend, key, index, batch)
+        for batch in range(first, last + 1)
+    ]
+    table = pa.concat_tables(tables)
+    return table.slice(offset - first * batch_size, max(stop - offset, 0))
@@ -37,7 +37,18 @@ from email.mime.text import MIMEText
 from email.utils import formatdate
 from enum import Enum
 from time import struct_time
-from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Set, Tuple, Union
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+)
 from urllib.parse import unquote_plus
 
 import bleach
@@ -51,7 +62,16 @@ from cryptography.hazmat.backends import default_backend
 from cryptography.hazmat.backends.openssl.x509 import _Certificate
 from dateutil.parser import parse
 from dateutil.relativedelta import relativedelta
-from flask import current_app, flash, Flask, g, Markup, render_template
+from flask import (
+    _request_ctx_stack,
+    current_app,
+    flash,
+    Flask,
+    g,
+    has_app_context,
+    Markup,
+    render_template,
+)
 from flask_appbuilder import SQLA
 from flask_appbuilder.security.sqla.models import User
 from flask_babel import gettext as __, lazy_gettext as _
@@ -59,6 +79,7 @@ from sqlalchemy import event, exc, select, Text
 from sqlalchemy.dialects.mysql import MEDIUMTEXT
 from sqlalchemy.sql.type_api import Variant
 from sqlalchemy.types import TEXT, TypeDecorator
+from werkzeug.local import LocalProxy
 
 from superset.exceptions import (
     CertificateException,
@@ -1171,6 +1192,56 @@ def get_username() -> Optional[str]:
         return None
 
 
+def merge_into_current_session(obj: Any) -> Any:
+    """Returns the copy of an ORM instance attached to the session of the thread
+
+    An instance loaded by another thread must not be used as is: its lazy loads
+    and expired attributes would run on the session of that thread, and
+    sessions can't be shared across threads. The loaded state is copied over,
+    without querying the database.
+    """
+    from superset import db
+
+    if sa.inspect(obj, raiseerr=False) is None:
+        # not an ORM instance, e.g. the anonymous user
+        return obj
+    try:
+        return db.session.merge(obj, load=False)
+    except sa.exc.InvalidRequestError:
+        # instances with pending changes can't be copied without a load
+        logger.warning("Could not merge %s into the session of the thread", obj)
+        return obj
+
+
+def with_current_context(func: Callable) -> Callable:
+    """Wraps ``func`` so it runs with the current app context, request and user
+
+    Used to run parts of a request in other threads, which don't inherit the
+    Flask contexts. Each call pushes its own app context, so the threads get
+    their own database session, removed once ``func`` returns. The user is
+    merged into that session, see ``merge_into_current_session``.
+    """
+    if not has_app_context():
+        return func
+    flask_app = current_app._get_current_object()
+    request_ctx = _request_ctx_stack.top
+    user = getattr(g, "user", None)
+    if isinstance(user, LocalProxy):
+        user = user._get_current_object()
+
+    @functools.wraps(func)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        with flask_app.app_context():
+            if user is not None:
+                g.user = merge_into_current_session(user)
+            if request_ctx is None:
+                return func(*args, **kwargs)
+            with request_ctx.copy():
+                return func(*args, **kwargs)
+
+    return wrapper
+
+
 def parse_ssl_cert(certificate: str) -> _Certificate:
     """
     Parses the contents of a certificate and returns a valid certificate object
@@ -0,0 +1,73 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+"""Helpers rendering CSV exports by chunks
+
+Exports are rendered one dataframe at a time so that the full CSV document never
+has to be held in memory, the chunks being sent to the client as they come.
+"""
+import zlib
+from typing import Any, Iterable, Iterator, List, Sequence
+
+import pandas as pd
+
+
+def split_df(df: pd.DataFrame, chunk_size: int) -> Iterator[pd.DataFrame]:
+    """Yields ``df`` by slices of at most ``chunk_size`` rows, at least one"""
+    yield df.iloc[:chunk_size]
+    for start in range(chunk_size, len(df.index), chunk_size):
+        yield df.iloc[start : start + chunk_size]
+
+
+def split_records(
+    records: Sequence[Any], columns: List[str], chunk_size: int
+) -> Iterator[pd.DataFrame]:
+    """Yields dataframes of at most ``chunk_size`` records, at least one"""
+    yield pd.DataFrame.from_records(records[:chunk_size], columns=columns)
+    for start in range(chunk_size, len(records), chunk_size):
+        yield pd.DataFrame.from_records(
+            records[start : start + chunk_size], columns=columns
+        )
+
+
+def df_chunks_to_csv(chunks: Iterable[pd.DataFrame], **kwargs: Any) -> Iterator[str]:
+    """Renders the dataframes as a single CSV document
+
+    The header comes from the first dataframe, ``kwargs`` are passed to
+    ``DataFrame.to_csv``.
+    """
+    kwargs.pop("encoding", None)
+    header = kwargs.pop("header", True)
+    for df in chunks:
+        yield df.to_csv(header=header, **kwargs)
+        header = False
+
+
+def encode_csv(
+    chunks: Iterable[str], encoding: str = "utf-8", gzip: bool = False
+) -> Iterator[bytes]:
+    """Encodes the CSV chunks, compressing them into a gzip stream if asked"""
+    if not gzip:
+        for chunk in chunks:
+            yield chunk.encode(encoding)
+        return
+
+    compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode(encoding))
+        if data:
+            yield data
+    yield compressor.flush()
@@ -0,0 +1,145 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+"""Pooled SQLAlchemy engines shared across the queries of a process
+
+Creating an engine per query with a ``NullPool`` means a new connection, and
+often a TLS handshake, for every chart. Here the engines are kept per database,
+final URL and engine parameters, so that one engine exists per impersonated user
+and its connections are reused across queries. The engines are dropped when the
+process forks (Celery workers), as connections can't be shared across processes.
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+import simplejson as json
+from sqlalchemy import create_engine, exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.engine.url import URL
+from sqlalchemy.pool import QueuePool
+
+from superset.utils.dates import now_as_float
+
+DEFAULT_POOL_OPTIONS: Dict[str, Any] = {
+    "pool_size": 5,
+    "max_overflow": 10,
+    "pool_timeout": 30,
+    "pool_recycle": 3600,
+    "pool_pre_ping": True,
+}
+
+# engine key -> (database id, engine)
+_engines: "OrderedDict[str, Tuple[Optional[int], Engine]]" = OrderedDict()
+_engines_lock = threading.Lock()
+_engines_pid = os.getpid()
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool sending its checkout times and saturation to the stats logger"""
+
+    def __init__(self, creator, stats_logger=None, **kwargs):
+        super().__init__(creator, **kwargs)
+        self.stats_logger = stats_logger
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.stats_logger = self.stats_logger
+        return pool
+
+    def _do_get(self):
+        if not self.stats_logger:
+            return super()._do_get()
+
+        if self.checkedout() >= self.size():
+            self.stats_logger.incr("sqla_pool.overflow")
+            if -1 < self._max_overflow <= self.overflow():
+                # every connection is in use, the checkout has to wait
+                self.stats_logger.incr("sqla_pool.saturated")
+        start = now_as_float()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            self.stats_logger.incr("sqla_pool.timeout")
+            raise
+        finally:
+            self.stats_logger.timing("sqla_pool.checkout", now_as_float() - start)
+
+
+def get_engine_key(database_id: Optional[int], url: URL, params: Dict[str, Any]) -> str:
+    """Identifies the engines, the URL holds the impersonated user if any"""
+    data = json.dumps(
+        [database_id, str(url), params], sort_keys=True, default=repr
+    ).encode("utf-8")
+    return hashlib.sha256(data).hexdigest()
+
+
+def set_pool_params(
+    url: URL,
+    params: Dict[str, Any],
+    options: Optional[Dict[str, Any]] = None,
+    stats_logger: Any = None,
+) -> None:
+    """Sets the pool options in the engine parameters, unless already set
+
+    Dialects not pooling their connections by default (SQLite files for
+    instance) are left alone.
+    """
+    poolclass = params.get("poolclass") or url.get_dialect().get_pool_class(url)
+    if poolclass is not QueuePool:
+        return
+    params["poolclass"] = InstrumentedQueuePool
+    params.setdefault("stats_logger", stats_logger)
+    for key, value in {**DEFAULT_POOL_OPTIONS, **(options or {})}.items():
+        params.setdefault(key, value)
+
+
+def get_engine(
+    database_id: Optional[int], url: URL, params: Dict[str, Any], max_engines: int = 100
+) -> Engine:
+    """Returns the engine shared by the queries using the same URL and parameters
+
+    The least recently used engines are disposed of past ``max_engines``.
+    """
+    global _engines_pid  # pylint: disable=global-statement
+    key = get_engine_key(database_id, url, params)
+    with _engines_lock:
+        if _engines_pid != os.getpid():
+            # the connections belong to the parent process, leave them be
+            _engines.clear()
+            _engines_pid = os.getpid()
+
+        if key in _engines:
+            _engines.move_to_end(key)
+            return _engines[key][1]
+
+        engine = create_engine(url, **params)
+        _engines[key] = (database_id, engine)
+        while len(_engines) > max_engines:
+            _, (_, evicted) = _engines.popitem(last=False)
+            evicted.dispose()
+        return engine
+
+
+def dispose_engines(database_id: Optional[int] = None) -> None:
+    """Closes the pooled connections, of a single database or of all of them"""
+    with _engines_lock:
+        for key, (engine_database_id, engine) in list(_engines.items()):
+            if database_id is None or engine_database_id == database_id:
+                engine.dispose()
+                del _engines[key]
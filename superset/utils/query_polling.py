@@ -0,0 +1,157 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+"""Polling of the SQL Lab queries running on engines reporting their progress
+
+The poll interval starts short and grows while the progress of the query doesn't
+move, so long queries are polled less and less often. Progress is only written
+to the metadata database when it moved by ``progress_threshold`` percent, or
+along with the next read of the ``Query`` row.
+
+Stop requests go through a channel instead of the ``Query`` row: an event for
+the pollers of the process, and the cache for the other processes. The row is
+still read every ``stop_check_interval`` seconds, in case the cache is not
+shared (or not configured) or the query was stopped by other means.
+"""
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from sqlalchemy.orm import Session
+
+from superset.utils.core import QueryStatus
+
+DEFAULT_POLLING_CONFIG: Dict[str, Any] = {
+    "min_interval": 1,
+    "max_interval": 10,
+    "backoff": 1.5,
+    "progress_threshold": 5,
+    "stop_check_interval": 10,
+}
+
+STOP_KEY_TIMEOUT = 60 * 60 * 24
+
+_stop_events: Dict[int, threading.Event] = {}
+_stop_events_lock = threading.Lock()
+
+
+def get_stop_key(query_id: int) -> str:
+    return f"sqllab_query_stopped__{query_id}"
+
+
+def request_stop(query_id: int, cache: Optional[Any] = None) -> None:
+    """Tells the poller of the query, wherever it runs, to cancel it"""
+    with _stop_events_lock:
+        event = _stop_events.get(query_id)
+    if event:
+        event.set()
+    if cache is not None:
+        cache.set(get_stop_key(query_id), True, timeout=STOP_KEY_TIMEOUT)
+
+
+class QueryPoller:  # pylint: disable=too-many-instance-attributes
+    """Paces the polls of a running query and coalesces its progress updates
+
+    Use it as a context manager, so that the last progress gets written::
+
+        with QueryPoller(query, session, cache=cache) as poller:
+            while cursor_is_running():
+                if poller.is_stopped():
+                    cursor.cancel()
+                    break
+                poller.update_progress(get_progress())
+                poller.wait()
+    """
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        query: Any,
+        session: Session,
+        cache: Optional[Any] = None,
+        stop_statuses: Iterable[str] = (QueryStatus.STOPPED,),
+        clock: Callable[[], float] = time.monotonic,
+        **config: Any,
+    ) -> None:
+        self.config = {**DEFAULT_POLLING_CONFIG, **config}
+        self.query = query
+        self.query_id = query.id
+        self.session = session
+        self.cache = cache
+        self.stop_statuses = set(stop_statuses)
+        self.interval = self.config["min_interval"]
+        self._clock = clock
+        self._last_stop_check = clock()
+        self._written_progress = query.progress or 0
+        self._dirty = False
+        self._stop_event = threading.Event()
+
+    def __enter__(self) -> "QueryPoller":
+        with _stop_events_lock:
+            _stop_events[self.query_id] = self._stop_event
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        with _stop_events_lock:
+            if _stop_events.get(self.query_id) is self._stop_event:
+                del _stop_events[self.query_id]
+        self.flush()
+
+    def is_stopped(self) -> bool:
+        if self._stop_event.is_set():
+            return True
+        if self.cache is not None and self.cache.get(get_stop_key(self.query_id)):
+            return True
+        now = self._clock()
+        if now - self._last_stop_check < self.config["stop_check_interval"]:
+            return False
+        self._last_stop_check = now
+        # ends the transaction, so that the status committed by others is seen
+        self.flush(force=True)
+        status = (
+            self.session.query(type(self.query).status)
+            .filter_by(id=self.query_id)
+            .scalar()
+        )
+        return status in self.stop_statuses
+
+    def wait(self) -> None:
+        """Sleeps until the next poll, or until the query is stopped"""
+        self._stop_event.wait(self.interval)
+        self.interval = min(
+            self.interval * self.config["backoff"], self.config["max_interval"]
+        )
+
+    def update_progress(self, progress: float) -> None:
+        """Polls faster again when the query moved, and writes big moves"""
+        if progress <= (self.query.progress or 0):
+            return
+        self.query.progress = progress
+        self.interval = self.config["min_interval"]
+        self._dirty = True
+        if progress - self._written_progress >= self.config["progress_threshold"]:
+            self.flush()
+
+    def set_tracking_url(self, tracking_url: str) -> None:
+        self.query.tracking_url = tracking_url
+        self._dirty = True
+        self.flush()
+
+    def flush(self, force: bool = False) -> None:
+        if self._dirty or force:
+            progress = self.query.progress or 0
+            self.session.commit()
+            self._written_progress = progress
+            self._dirty = False
@@ -0,0 +1,167 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+"""Coalescing of the requests computing the same cache key
+
+On a cache miss, the first request takes a lock on the key and computes the
+value, the other requests wait for the value to be cached instead of computing
+it as well. The lock is an ``add`` to the cache backend, which is atomic on the
+shared backends (Redis, Memcached), so requests are coalesced across the web
+servers. Without a backend, the locks are kept in a dictionary of the process.
+
+Waiters give up after ``wait_timeout`` seconds and compute the value themselves,
+and the lock expires after ``lock_timeout`` seconds should its holder die. If
+the holder releases the lock without caching a value (the query failed), one of
+the waiters takes the lock over.
+"""
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, Optional, Tuple
+
+
+class LocalLockStore:
+    """The subset of the cache API the locks need, kept in the process"""
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic) -> None:
+        self._clock = clock
+        self._values: Dict[str, Tuple[Any, Optional[float]]] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, key: str) -> Any:
+        value, expires = self._values.get(key, (None, None))
+        if expires is not None and expires <= self._clock():
+            del self._values[key]
+            return None
+        return value
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            return self._get(key)
+
+    def add(self, key: str, value: Any, timeout: Optional[float] = None) -> bool:
+        with self._lock:
+            if self._get(key) is not None:
+                return False
+            self._values[key] = (value, self._clock() + timeout if timeout else None)
+            return True
+
+    def delete(self, key: str) -> bool:
+        with self._lock:
+            return self._values.pop(key, None) is not None
+
+
+_local_lock_store = LocalLockStore()
+
+
+def get_lock_key(key: str) -> str:
+    return f"single_flight__{key}"
+
+
+class Lease:
+    """The lock of a key, to release once its value is cached"""
+
+    def __init__(self, lock_store: Any, key: str) -> None:
+        self.lock_store = lock_store
+        self.lock_key = get_lock_key(key)
+        self.token = str(uuid.uuid4())
+
+    def acquire(self, timeout: float) -> bool:
+        return bool(self.lock_store.add(self.lock_key, self.token, timeout=timeout))
+
+    def release(self) -> None:
+        # the lock may have expired and been taken over since
+        if self.lock_store.get(self.lock_key) == self.token:
+            self.lock_store.delete(self.lock_key)
+
+
+class SingleFlight:  # pylint: disable=too-many-instance-attributes
+    """Lets one request compute the value of a key while the others wait for it
+
+    ::
+
+        value, lease = single_flight.get(key, cache.get)
+        if value is None:
+            try:
+                value = compute()
+                cache.set(key, value)
+            finally:
+                if lease:
+                    lease.release()
+    """
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        lock_store: Optional[Any] = None,
+        wait_timeout: float = 30,
+        lock_timeout: float = 120,
+        poll_interval: float = 0.05,
+        max_poll_interval: float = 1,
+        stats_logger: Optional[Any] = None,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        self.lock_store = lock_store if lock_store is not None else _local_lock_store
+        self.wait_timeout = wait_timeout
+        self.lock_timeout = lock_timeout
+        self.poll_interval = poll_interval
+        self.max_poll_interval = max_poll_interval
+        self.stats_logger = stats_logger
+        self._clock = clock
+        self._sleep = sleep
+
+    def _incr(self, key: str) -> None:
+        if self.stats_logger:
+            self.stats_logger.incr(f"single_flight.{key}")
+
+    def get(
+        self, key: str, get_value: Callable[[str], Any]
+    ) -> Tuple[Any, Optional[Lease]]:
+        """Returns the value computed by another request, or the lock of the key
+
+        :param key: the cache key
+        :param get_value: reads the value of the key from the cache
+        :returns: the cached value and no lease when another request computed
+            it, no value and the lease to release otherwise. When waiting timed
+            out, neither: the value is computed without holding the lock.
+        """
+        if not self.wait_timeout:
+            return None, None
+        lease = Lease(self.lock_store, key)
+        deadline = self._clock() + self.wait_timeout
+        interval = self.poll_interval
+        waited = False
+        while True:
+            if lease.acquire(self.lock_timeout):
+                # the value may have been cached since the caller read it
+                value = get_value(key)
+                if value:
+                    lease.release()
+                    self._incr("coalesced")
+                    return value, None
+                # when waiting, the previous holder gave up without a value
+                self._incr("takeover" if waited else "leader")
+                return None, lease
+            if self._clock() >= deadline:
+                self._incr("timeout")
+                return None, None
+            self._sleep(interval)
+            interval = min(interval * 2, self.max_poll_interval)
+            waited = True
+            value = get_value(key)
+            if value:
+                self._incr("coalesced")
+                return value, None
@@ -0,0 +1,173 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+"""Day buckets of the time range of the time series queries
+
+A time series grouped by a time grain of a day or less can be queried by parts
+of its time range and stitched back together, each row belonging to the day
+its timestamp falls in. The whole days that ended long enough ago for all their
+data to have landed (the settled days) don't change anymore: they are cached on
+their own and reused as relative time ranges move, or by the time comparisons
+of other charts. Only the days missing from the cache and the partial or recent
+days of the range are queried, in a query per contiguous range.
+
+This requires a time range excluding its end, which the ``[start, end)`` time
+range endpoints do, and all of the series to be selected: a series limit picks
+the series over the whole range.
+"""
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, NamedTuple, Tuple
+
+import pandas as pd
+
+from superset.utils.core import DTTM_ALIAS, TimeRangeEndpoint
+
+BUCKET_SIZE = timedelta(days=1)
+
+# longer ranges are left to a single query, rather than a cache read per day
+MAX_BUCKETS = 366
+
+# time grains dividing a day, none of their periods spans two days
+SQLA_TIME_GRAINS = {
+    None,
+    "PT1S",
+    "PT1M",
+    "PT5M",
+    "PT10M",
+    "PT15M",
+    "PT0.5H",
+    "PT1H",
+    "P1D",
+}
+DRUID_PERIODS = {
+    "PT1S",
+    "PT5S",
+    "PT30S",
+    "PT1M",
+    "PT5M",
+    "PT10M",
+    "PT15M",
+    "PT30M",
+    "PT1H",
+    "PT6H",
+    "P1D",
+}
+
+
+class Bucket(NamedTuple):
+    start: datetime
+    end: datetime
+    # a whole day old enough to be cached
+    settled: bool
+
+
+def floor_day(dttm: datetime) -> datetime:
+    return dttm.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def supports_time_buckets(query_obj: Dict[str, Any], datasource: Any) -> bool:
+    """Whether the query can be run by parts of its time range"""
+    from_dttm = query_obj.get("from_dttm")
+    to_dttm = query_obj.get("to_dttm")
+    if not (query_obj.get("is_timeseries") and from_dttm and to_dttm):
+        return False
+    if query_obj.get("timeseries_limit"):
+        return False
+    if to_dttm - from_dttm > MAX_BUCKETS * BUCKET_SIZE:
+        return False
+
+    extras = query_obj.get("extras") or {}
+    if datasource.type == "table":
+        endpoints = tuple(extras.get("time_range_endpoints") or ())
+        return (
+            endpoints == (TimeRangeEndpoint.INCLUSIVE, TimeRangeEndpoint.EXCLUSIVE)
+            and extras.get("time_grain_sqla") in SQLA_TIME_GRAINS
+        )
+    if datasource.type == "druid":
+        # pylint: disable=import-outside-toplevel
+        from superset.connectors.druid.models import DRUID_TZ
+
+        # Druid intervals always exclude their end
+        if extras.get("druid_time_origin"):
+            return False
+        # the periods start in the time zone of the queries (see run_query), which
+        # only matches the naive midnights the days are split at when it's UTC
+        timezone = from_dttm.replace(tzinfo=DRUID_TZ).tzname() if DRUID_TZ else None
+        if timezone not in (None, "UTC"):
+            return False
+        granularity = datasource.granularity(query_obj.get("granularity"))
+        return (
+            isinstance(granularity, dict) and granularity.get("period") in DRUID_PERIODS
+        )
+    return False
+
+
+def get_buckets(
+    from_dttm: datetime, to_dttm: datetime, settled_until: datetime
+) -> List[Bucket]:
+    """Splits the ``[from_dttm, to_dttm)`` range at midnight"""
+    buckets = []
+    start = from_dttm
+    while start < to_dttm:
+        day = floor_day(start)
+        end = min(day + BUCKET_SIZE, to_dttm)
+        whole_day = start == day and end == day + BUCKET_SIZE
+        buckets.append(Bucket(start, end, whole_day and end <= settled_until))
+        start = end
+    return buckets
+
+
+def merge_buckets(buckets: Iterable[Bucket]) -> List[Tuple[datetime, datetime]]:
+    """The contiguous ranges covering the buckets, in order"""
+    ranges: List[Tuple[datetime, datetime]] = []
+    for bucket in buckets:
+        if ranges and ranges[-1][1] == bucket.start:
+            ranges[-1] = (ranges[-1][0], bucket.end)
+        else:
+            ranges.append((bucket.start, bucket.end))
+    return ranges
+
+
+def get_timestamps(df: pd.DataFrame) -> pd.Series:
+    """The naive timestamps of the frame, in the time zone they were queried in"""
+    timestamps = pd.to_datetime(df[DTTM_ALIAS])
+    if timestamps.dt.tz is not None:
+        timestamps = timestamps.dt.tz_localize(None)
+    return timestamps
+
+
+def split_frame(
+    df: pd.DataFrame, buckets: Iterable[Bucket]
+) -> Dict[datetime, pd.DataFrame]:
+    """The rows of the frame by start of the bucket of the day of their timestamp
+
+    :param df: a frame holding the timestamps of the data, as queried
+    :param buckets: buckets of distinct days
+    """
+    if df.empty or DTTM_ALIAS not in df.columns:
+        return {bucket.start: df.iloc[0:0] for bucket in buckets}
+    days = get_timestamps(df).dt.floor("D")
+    return {
+        bucket.start: df[days == floor_day(bucket.start)].reset_index(drop=True)
+        for bucket in buckets
+    }
+
+
+def stitch_frames(frames: List[pd.DataFrame]) -> pd.DataFrame:
+    non_empty = [df for df in frames if not df.empty]
+    if not non_empty:
+        return frames[0] if frames else pd.DataFrame()
+    return pd.concat(non_empty, ignore_index=True, sort=False)
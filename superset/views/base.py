@@ -15,14 +15,25 @@
 # specific language governing permissions and limitations
 # under the License.
 import functools
+import itertools
 import logging
 import traceback
 from datetime import datetime
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterable, List, Optional
 
 import simplejson as json
 import yaml
-from flask import abort, flash, g, get_flashed_messages, redirect, Response, session
+from flask import (
+    abort,
+    flash,
+    g,
+    get_flashed_messages,
+    redirect,
+    request,
+    Response,
+    session,
+    stream_with_context,
+)
 from flask_appbuilder import BaseView, ModelView
 from flask_appbuilder.actions import action
 from flask_appbuilder.forms import DynamicForm
@@ -38,7 +49,7 @@ from wtforms.fields.core import Field, UnboundField
 from superset import appbuilder, conf, db, get_feature_flags, security_manager
 from superset.exceptions import SupersetException, SupersetSecurityException
 from superset.translations.utils import get_language_pack
-from superset.utils import core as utils
+from superset.utils import core as utils, csv
 
 from .utils import bootstrap_user_data
 
@@ -366,6 +377,29 @@ class CsvResponse(Response):  # pylint: disable=too-many-ancestors
     charset = conf["CSV_EXPORT"].get("encoding", "utf-8")
 
 
+def csv_stream_response(
+    chunks: Iterable[str], headers: Dict[str, str], mimetype: str = "text/csv"
+) -> CsvResponse:
+    """Streams the CSV chunks, gzip compressed when enabled and accepted
+
+    The first chunk is rendered before returning, so that the errors raised
+    while running the query are still reported as such.
+    """
+    chunks = iter(chunks)
+    chunks = itertools.chain([next(chunks, "")], chunks)
+    use_gzip = conf["CSV_EXPORT_GZIP"] and "gzip" in request.accept_encodings
+    response = CsvResponse(
+        stream_with_context(csv.encode_csv(chunks, CsvResponse.charset, use_gzip)),
+        status=200,
+        headers=headers,
+        mimetype=mimetype,
+    )
+    if use_gzip:
+        response.headers["Content-Encoding"] = "gzip"
+    response.vary.add("Accept-Encoding")
+    return response
+
+
 def check_ownership(obj: Any, raise_if_false: bool = True) -> bool:
     """Meant to be used in `pre_update` hooks on models to enforce ownership
 
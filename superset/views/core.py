@@ -18,7 +18,6 @@
 import logging
 import re
 import pdb
-from collections import defaultdict
 from contextlib import closing
 from datetime import datetime, timedelta
 from typing import Any, Callable, cast, Dict, List, Optional, Union
@@ -26,7 +25,6 @@ from urllib import parse
 
 import backoff
 import msgpack
-import pandas as pd
 import pyarrow as pa
 import simplejson as json
 from flask import abort, flash, g, Markup, redirect, render_template, request, Response
@@ -43,6 +41,7 @@ from sqlalchemy.exc import (
     OperationalError,
     SQLAlchemyError,
 )
+from sqlalchemy.orm import subqueryload
 from sqlalchemy.orm.session import Session
 from werkzeug.urls import Href
 
@@ -50,6 +49,7 @@ import superset.models.core as models
 from superset import (
     app,
     appbuilder,
+    cache,
     conf,
     dataframe,
     db,
@@ -87,10 +87,11 @@ from superset.security.analytics_db_safety import (
 )
 from superset.sql_parse import ParsedQuery
 from superset.sql_validators import get_validator_by_name
-from superset.utils import core as utils, dashboard_import_export
+from superset.utils import chunked_results, core as utils, csv, dashboard_import_export
 from superset.utils.dashboard_filter_scopes_converter import copy_filter_scopes
 from superset.utils.dates import now_as_float
 from superset.utils.decorators import etag_cache, stats_timing
+from superset.utils.query_polling import request_stop
 from superset.views.database.filters import DatabaseFilter
 from superset.views.utils import get_dashboard_extra_filters
 
@@ -99,7 +100,7 @@ from .base import (
     BaseSupersetView,
     check_ownership,
     common_bootstrap_payload,
-    CsvResponse,
+    csv_stream_response,
     data_payload_response,
     DeleteMixin,
     generate_download_headers,
@@ -232,18 +233,7 @@ def _deserialize_results_payload(
         with stats_timing("sqllab.query.results_backend_pa_deserialize", stats_logger):
             pa_table = pa.deserialize(ds_payload["data"])
 
-        df = result_set.SupersetResultSet.convert_table_to_df(pa_table)
-        ds_payload["data"] = dataframe.df_to_records(df) or []
-
-        db_engine_spec = query.database.db_engine_spec
-        all_columns, data, expanded_columns = db_engine_spec.expand_data(
-            ds_payload["selected_columns"], ds_payload["data"]
-        )
-        ds_payload.update(
-            {"data": data, "columns": all_columns, "expanded_columns": expanded_columns}
-        )
-
-        return ds_payload
+        return _expand_results_payload(ds_payload, pa_table, query)
     else:
         with stats_timing(
             "sqllab.query.results_backend_json_deserialize", stats_logger
@@ -251,6 +241,35 @@ def _deserialize_results_payload(
             return json.loads(payload)  # type: ignore
 
 
+def _expand_results_payload(payload: dict, pa_table: pa.Table, query) -> dict:
+    df = result_set.SupersetResultSet.convert_table_to_df(pa_table)
+    payload["data"] = dataframe.df_to_records(df) or []
+
+    db_engine_spec = query.database.db_engine_spec
+    all_columns, data, expanded_columns = db_engine_spec.expand_data(
+        payload["selected_columns"], payload["data"]
+    )
+    payload.update(
+        {"data": data, "columns": all_columns, "expanded_columns": expanded_columns}
+    )
+
+    return payload
+
+
+def _load_chunked_results_payload(
+    key: str, index: dict, query, offset: int = 0, limit: Optional[int] = None
+) -> dict:
+    """Loads the rows ``[offset, offset + limit)`` of results stored by batches"""
+    with stats_timing("sqllab.query.results_backend_pa_deserialize", stats_logger):
+        pa_table = chunked_results.load_rows(results_backend, key, index, offset, limit)
+    payload = _expand_results_payload(index["payload"], pa_table, query)
+    if offset or pa_table.num_rows < index["num_rows"]:
+        payload["offset"] = offset
+    if offset + pa_table.num_rows < index["num_rows"]:
+        payload["displayLimitReached"] = True
+    return payload
+
+
 def get_cta_schema_name(
     database: Database, user: ab_models.User, schema: str, sql: str
 ) -> Optional[str]:
@@ -621,9 +640,8 @@ class Superset(BaseSupersetView):
         self, viz_obj, csv=False, query=False, results=False, samples=False
     ):
         if csv:
-            return CsvResponse(
-                viz_obj.get_csv(),
-                status=200,
+            return csv_stream_response(
+                viz_obj.iter_csv(),
                 headers=generate_download_headers("csv"),
                 mimetype="application/csv",
             )
@@ -1792,7 +1810,7 @@ class Superset(BaseSupersetView):
     def dashboard(self, dashboard_id):
         """Server side rendering for a dashboard"""
         session = db.session()
-        qry = session.query(Dashboard)
+        qry = session.query(Dashboard).options(subqueryload(Dashboard.slices))
         if dashboard_id.isdigit():
             qry = qry.filter_by(id=int(dashboard_id))
         else:
@@ -1802,11 +1820,7 @@ class Superset(BaseSupersetView):
         if not dash:
             abort(404)
 
-        datasources = defaultdict(list)
-        for slc in dash.slices:
-            datasource = slc.datasource
-            if datasource:
-                datasources[datasource].append(slc)
+        datasources = dash.get_datasources()
 
         if config["ENABLE_ACCESS_REQUEST"]:
             for datasource in datasources:
@@ -1821,13 +1835,7 @@ class Superset(BaseSupersetView):
                         "superset/request_access/?" f"dashboard_id={dash.id}&"
                     )
 
-        # Filter out unneeded fields from the datasource payload
-        datasources_payload = {
-            datasource.uid: datasource.data_for_slices(slices)
-            if is_feature_enabled("REDUCE_DASHBOARD_BOOTSTRAP_PAYLOAD")
-            else datasource.data
-            for datasource, slices in datasources.items()
-        }
+        bootstrap_payload = dash.get_bootstrap_data(datasources)
 
         dash_edit_perm = check_ownership(
             dash, raise_if_false=False
@@ -1856,7 +1864,7 @@ class Superset(BaseSupersetView):
             edit_mode=edit_mode,
         )
 
-        dashboard_data = dash.data
+        dashboard_data = dict(bootstrap_payload["dashboard_data"])
         dashboard_data.update(
             {
                 "standalone_mode": standalone_mode,
@@ -1876,7 +1884,7 @@ class Superset(BaseSupersetView):
         bootstrap_data = {
             "user_id": g.user.get_id(),
             "dashboard_data": dashboard_data,
-            "datasources": datasources_payload,
+            "datasources": bootstrap_payload["datasources"],
             "common": common_bootstrap_payload(),
             "editMode": edit_mode,
             "urlParams": url_params,
@@ -2101,7 +2109,8 @@ class Superset(BaseSupersetView):
         """Serves a key off of the results backend
 
         It is possible to pass the `rows` query argument to limit the number
-        of rows returned.
+        of rows returned. When the results are stored by batches, the `offset`
+        query argument returns the page of rows starting at that offset.
         """
         if not results_backend:
             return json_error_response("Results backend isn't configured")
@@ -2133,6 +2142,30 @@ class Superset(BaseSupersetView):
                 security_manager.get_table_access_error_msg(rejected_tables), status=403
             )
 
+        if chunked_results.is_chunked_results(blob):
+            try:
+                offset = int(request.args.get("offset", 0))
+                rows = request.args.get("rows")
+                limit = int(rows) if rows else None
+            except ValueError:
+                return json_error_response(
+                    "Invalid `rows` or `offset` argument", status=400
+                )
+            if limit is None and offset:
+                limit = config["DISPLAY_MAX_ROW"]
+            try:
+                obj = _load_chunked_results_payload(
+                    key, chunked_results.load_index(blob), query, offset, limit
+                )
+            except chunked_results.ResultsNotFound:
+                return json_error_response(
+                    "Data could not be retrieved. You may want to re-run the query.",
+                    status=410,
+                )
+            return json_success(
+                json.dumps(obj, default=utils.json_iso_dttm_ser, ignore_nan=True)
+            )
+
         payload = utils.zlib_decompress(blob, decode=not results_backend_use_msgpack)
         obj: dict = _deserialize_results_payload(
             payload, query, cast(bool, results_backend_use_msgpack)
@@ -2175,6 +2208,9 @@ class Superset(BaseSupersetView):
             return self.json_response("OK")
         query.status = QueryStatus.STOPPED
         db.session.commit()
+        # the query may be polled by another process, which doesn't re-read
+        # the status on every poll
+        request_stop(query.id, cache)
 
         return self.json_response("OK")
 
@@ -2496,7 +2532,16 @@ class Superset(BaseSupersetView):
                 "Fetching CSV from results backend " "[{}]".format(query.results_key)
             )
             blob = results_backend.get(query.results_key)
-        if blob:
+        chunk_size = config["CSV_EXPORT_CHUNK_SIZE"]
+        if chunked_results.is_chunked_results(blob):
+            logger.info("Streaming the record batches")
+            chunks = (
+                result_set.SupersetResultSet.convert_table_to_df(table)
+                for table in chunked_results.iter_batches(
+                    results_backend, query.results_key, chunked_results.load_index(blob)
+                )
+            )
+        elif blob:
             logger.info("Decompressing")
             payload = utils.zlib_decompress(
                 blob, decode=not results_backend_use_msgpack
@@ -2505,32 +2550,37 @@ class Superset(BaseSupersetView):
                 payload, query, results_backend_use_msgpack
             )
             columns = [c["name"] for c in obj["columns"]]
-            df = pd.DataFrame.from_records(obj["data"], columns=columns)
-            logger.info("Using pandas to convert to CSV")
-            csv = df.to_csv(index=False, **config["CSV_EXPORT"])
+            chunks = csv.split_records(obj["data"], columns, chunk_size)
         else:
             logger.info("Running a query to turn into CSV")
             sql = query.select_sql or query.executed_sql
-            df = query.database.get_df(sql, query.schema)
-            # TODO(bkyryliuk): add compression=gzip for big files.
-            csv = df.to_csv(index=False, **config["CSV_EXPORT"])
-        response = Response(csv, mimetype="text/csv")
-        response.headers[
-            "Content-Disposition"
-        ] = f"attachment; filename={query.name}.csv"
+            chunks = query.database.iter_df(sql, query.schema, chunk_size)
+
         event_info = {
             "event_type": "data_export",
             "client_id": client_id,
-            "row_count": len(df.index),
+            "row_count": 0,
             "database": query.database.name,
             "schema": query.schema,
             "sql": query.sql,
             "exported_format": "csv",
         }
-        logger.info(
-            f"CSV exported: {repr(event_info)}", extra={"superset_event": event_info}
+
+        def count_rows(chunks):
+            for df in chunks:
+                event_info["row_count"] += len(df.index)
+                yield df
+            logger.info(
+                f"CSV exported: {repr(event_info)}",
+                extra={"superset_event": event_info},
+            )
+
+        return csv_stream_response(
+            csv.df_chunks_to_csv(
+                count_rows(chunks), index=False, **config["CSV_EXPORT"]
+            ),
+            headers={"Content-Disposition": f"attachment; filename={query.name}.csv"},
         )
-        return response
 
     @api
     @handle_api_exception
@@ -23,7 +23,7 @@ from sqlalchemy import MetaData
 from superset import app, security_manager
 from superset.exceptions import CertificateException, SupersetException
 from superset.security.analytics_db_safety import check_sqlalchemy_uri
-from superset.utils import core as utils
+from superset.utils import core as utils, engine_registry
 from superset.views.database.filters import DatabaseFilter
 
 
@@ -222,6 +222,13 @@ class DatabaseMixin:
     def pre_update(self, database):
         self._pre_add_update(database)
 
+    def post_update(self, database):  # pylint: disable=no-self-use
+        # the connections of the pooled engines may use the previous settings
+        engine_registry.dispose_engines(database.id)
+
+    def post_delete(self, database):  # pylint: disable=no-self-use
+        engine_registry.dispose_engines(database.id)
+
     def pre_delete(self, obj):  # pylint: disable=no-self-use
         if obj.tables:
             raise SupersetException(
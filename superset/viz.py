@@ -25,13 +25,24 @@ import hashlib
 import inspect
 import logging
 import math
-import pickle as pkl
 import re
+import threading
 import uuid
 from collections import defaultdict, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from itertools import product
-from typing import Any, Dict, List, Optional, Set, Tuple, TYPE_CHECKING
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    TYPE_CHECKING,
+)
 
 import geohash
 import numpy as np
@@ -39,6 +50,7 @@ import pandas as pd
 import polyline
 import simplejson as json
 from dateutil import relativedelta as rdelta
+from dateutil.parser import parse as parse_dttm
 from flask import request
 from flask_babel import lazy_gettext as _
 from geopy.point import Point
@@ -47,25 +59,60 @@ from pandas.tseries.frequencies import to_offset
 
 from superset import app, cache, get_manifest_files, security_manager
 from superset.constants import NULL_STRING
+from superset.dataframe import df_to_records
 from superset.exceptions import NullValueException, SpatialException
-from superset.models.helpers import QueryResult
+from superset.models.helpers import json_to_dict, QueryResult
 from superset.typing import VizData
-from superset.utils import core as utils
-from superset.utils.core import (
-    DTTM_ALIAS,
-    JS_MAX_INTEGER,
-    merge_extra_filters,
-    to_adhoc,
-)
+from superset.utils import core as utils, csv, time_buckets
+from superset.utils.core import DTTM_ALIAS, merge_extra_filters, to_adhoc
+from superset.utils.decorators import stats_timing
+from superset.utils.single_flight import SingleFlight
 
 if TYPE_CHECKING:
     from superset.connectors.base.models import BaseDatasource
 
 config = app.config
 stats_logger = config["STATS_LOGGER"]
+cache_serializer = config["DATA_CACHE_SERIALIZER"]
 relative_start = config["DEFAULT_RELATIVE_START_TIME"]
 relative_end = config["DEFAULT_RELATIVE_END_TIME"]
 logger = logging.getLogger(__name__)
+single_flight = SingleFlight(
+    cache,
+    wait_timeout=config["CHART_SINGLE_FLIGHT_WAIT_TIMEOUT"],
+    lock_timeout=config["CHART_SINGLE_FLIGHT_LOCK_TIMEOUT"],
+    stats_logger=stats_logger,
+)
+
+_extra_queries_executor: Optional[ThreadPoolExecutor] = None
+_extra_queries_lock = threading.Lock()
+
+
+def get_refresh_key(cache_key: str) -> str:
+    return f"refresh__{cache_key}"
+
+
+# the dates of the query objects, sent to the refresh task as ISO strings
+QUERY_OBJ_DTTM_KEYS = ("from_dttm", "to_dttm", "inner_from_dttm", "inner_to_dttm")
+
+
+def dump_query_obj(query_obj: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        key: value.isoformat()
+        if key in QUERY_OBJ_DTTM_KEYS and isinstance(value, datetime)
+        else value
+        for key, value in query_obj.items()
+    }
+
+
+def load_query_obj(query_obj: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        key: parse_dttm(value)
+        if key in QUERY_OBJ_DTTM_KEYS and isinstance(value, str)
+        else value
+        for key, value in query_obj.items()
+    }
+
 
 METRIC_KEYS = [
     "metric",
@@ -79,6 +126,18 @@ METRIC_KEYS = [
 ]
 
 
+def get_extra_queries_executor() -> ThreadPoolExecutor:
+    """Returns the pool running the extra queries of the charts"""
+    global _extra_queries_executor
+    with _extra_queries_lock:
+        if _extra_queries_executor is None:
+            _extra_queries_executor = ThreadPoolExecutor(
+                max_workers=config["EXTRA_QUERIES_WORKERS"],
+                thread_name_prefix="viz-extra-query",
+            )
+    return _extra_queries_executor
+
+
 class BaseViz:
 
     """All visualizations derive this base class"""
@@ -89,6 +148,9 @@ class BaseViz:
     is_timeseries = False
     cache_type = "df"
     enforce_numerical_metrics = True
+    # whether the frame can be stitched together from the days of its time range
+    # (see superset.utils.time_buckets), the viz not using the order of the rows
+    cache_time_buckets = False
 
     def __init__(
         self,
@@ -122,6 +184,10 @@ class BaseViz:
         # (FilterBox for instance)
         self._any_cache_key: Optional[str] = None
         self._any_cached_dttm: Optional[str] = None
+        # size of the payloads this viz wrote to the cache
+        self.cached_bytes = 0
+        # whether some data was served past its cache timeout
+        self.is_stale = False
         self._extra_chart_data: List[Tuple[str, pd.DataFrame]] = []
 
         self.process_metrics()
@@ -144,17 +210,6 @@ class BaseViz:
         self.all_metrics = list(self.metric_dict.values())
         self.metric_labels = list(self.metric_dict.keys())
 
-    @staticmethod
-    def handle_js_int_overflow(data):
-        for d in data.get("records", dict()):
-            for k, v in list(d.items()):
-                if isinstance(v, int):
-                    # if an int is too big for Java Script to handle
-                    # convert it to a string
-                    if abs(v) > JS_MAX_INTEGER:
-                        d[k] = str(v)
-        return data
-
     def run_extra_queries(self):
         """Lifecycle method to use when more than one query is needed
 
@@ -220,19 +275,34 @@ class BaseViz:
 
         self.error_msg = ""
 
-        timestamp_format = None
-        if self.datasource.type == "table":
-            granularity_col = self.datasource.get_column(query_obj["granularity"])
-            if granularity_col:
-                timestamp_format = granularity_col.python_date_format
+        if (
+            self.cache_time_buckets
+            and cache
+            and config["TIME_BUCKET_CACHE_TIMEOUT"] is not None
+            and time_buckets.supports_time_buckets(query_obj, self.datasource)
+        ):
+            df = self.get_df_by_time_buckets(query_obj)
+            if df is not None:
+                return df
 
         # The datasource here can be different backend but the interface is common
-        self.results = self.datasource.query(query_obj)
+        self.results = self.query_datasource(query_obj)
         self.query = self.results.query
         self.status = self.results.status
         self.error_message = self.results.error_message
+        return self.process_query_df(self.results.df, query_obj)
+
+    def process_query_df(
+        self, df: pd.DataFrame, query_obj: Dict[str, Any]
+    ) -> pd.DataFrame:
+        """Normalizes the timestamps and metrics of the dataframe returned by the
+        datasource, done by chunks when exporting results"""
+        timestamp_format = None
+        if self.datasource.type == "table":
+            granularity_col = self.datasource.get_column(query_obj["granularity"])
+            if granularity_col:
+                timestamp_format = granularity_col.python_date_format
 
-        df = self.results.df
         # Transform the timestamp we received from database to pandas supported
         # datetime format. If no python_date_format is specified, the pattern will
         # be considered as the default ISO date format
@@ -243,7 +313,7 @@ class BaseViz:
                 if timestamp_format in ("epoch_s", "epoch_ms"):
                     # Column has already been formatted as a timestamp.
                     dttm_col = df[DTTM_ALIAS]
-                    one_ts_val = dttm_col[0]
+                    one_ts_val = dttm_col.iloc[0]
 
                     # convert time column to pandas Timestamp, but different
                     # ways to convert depending on string or int types
@@ -273,6 +343,113 @@ class BaseViz:
             df.replace([np.inf, -np.inf], np.nan, inplace=True)
         return df
 
+    def query_datasource(self, query_obj: Dict[str, Any]) -> QueryResult:
+        return self.datasource.query(query_obj)
+
+    @staticmethod
+    def get_bucket_query_obj(
+        query_obj: Dict[str, Any], from_dttm: datetime, to_dttm: datetime
+    ) -> Dict[str, Any]:
+        bucket_query_obj = copy.copy(query_obj)
+        bucket_query_obj["from_dttm"] = from_dttm
+        bucket_query_obj["to_dttm"] = to_dttm
+        # only used by series limits, which can't be split
+        bucket_query_obj.pop("inner_from_dttm", None)
+        bucket_query_obj.pop("inner_to_dttm", None)
+        return bucket_query_obj
+
+    def get_df_by_time_buckets(  # pylint: disable=too-many-locals
+        self, query_obj: Dict[str, Any]
+    ) -> Optional[pd.DataFrame]:
+        """
+        Stitches the frame of a time series together from the days of its time
+        range, queried or read from the cache. Returns None when the frame
+        reaches the row limit, the rows a single query would keep being unknown.
+        """
+        settled_until = datetime.now() - timedelta(
+            seconds=config["TIME_BUCKET_CACHE_SETTLE_DELAY"]
+        )
+        buckets = time_buckets.get_buckets(
+            query_obj["from_dttm"], query_obj["to_dttm"], settled_until
+        )
+        # the days are cached with the timestamps of the data, before the offset
+        # and the time shift, so that time comparisons can use them as well
+        offset = timedelta(hours=self.datasource.offset or 0) + self.time_shift
+        cache_keys = {
+            bucket.start: self.cache_key(
+                self.get_bucket_query_obj(query_obj, bucket.start, bucket.end),
+                time_range=None,
+                time_bucket=bucket.start.isoformat(),
+            )
+            for bucket in buckets
+            if bucket.settled
+        }
+        frames: Dict[datetime, pd.DataFrame] = {}
+        queries: Dict[datetime, str] = {}
+        if not self.force:
+            for start, cache_key in cache_keys.items():
+                cache_value = cache.get(cache_key)
+                if not cache_value:
+                    continue
+                try:
+                    cache_value = cache_serializer.loads(cache_value)
+                    frames[start] = cache_value["df"]
+                    queries[start] = cache_value["query"]
+                    stats_logger.incr("loaded_time_bucket_from_cache")
+                except Exception as e:
+                    logger.exception(e)
+
+        self.status = utils.QueryStatus.SUCCESS
+        missing = [bucket for bucket in buckets if bucket.start not in frames]
+        for from_dttm, to_dttm in time_buckets.merge_buckets(missing):
+            self.results = self.query_datasource(
+                self.get_bucket_query_obj(query_obj, from_dttm, to_dttm)
+            )
+            self.query = self.results.query
+            self.status = self.results.status
+            self.error_message = self.results.error_message
+            df = self.process_query_df(self.results.df, query_obj)
+            if self.status == utils.QueryStatus.FAILED:
+                return df
+            if len(df.index) >= query_obj["row_limit"]:
+                stats_logger.incr("time_buckets_row_limit")
+                return None
+            if not df.empty and DTTM_ALIAS in df.columns:
+                df[DTTM_ALIAS] -= offset
+            days = [bucket for bucket in missing if from_dttm <= bucket.start < to_dttm]
+            for start, frame in time_buckets.split_frame(df, days).items():
+                frames[start] = frame
+                queries[start] = self.results.query
+                if start in cache_keys:
+                    self.cache_time_bucket(cache_keys[start], frame, self.results.query)
+
+        df = time_buckets.stitch_frames([frames[bucket.start] for bucket in buckets])
+        if len(df.index) >= query_obj["row_limit"]:
+            stats_logger.incr("time_buckets_row_limit")
+            return None
+        if not df.empty and DTTM_ALIAS in df.columns:
+            df[DTTM_ALIAS] += offset
+        self.query = ";\n\n".join(
+            OrderedDict((queries[bucket.start], None) for bucket in buckets)
+        )
+        return df
+
+    def cache_time_bucket(self, cache_key: str, df: pd.DataFrame, query: str) -> None:
+        try:
+            cached_dttm = datetime.utcnow().isoformat().split(".")[0]
+            cache_value = cache_serializer.dumps(
+                dict(dttm=cached_dttm, df=df, query=query)
+            )
+            stats_logger.incr("set_time_bucket_cache_key")
+            cache.set(
+                cache_key, cache_value, timeout=config["TIME_BUCKET_CACHE_TIMEOUT"]
+            )
+            self.cached_bytes += len(cache_value)
+        except Exception as e:
+            logger.warning("Could not cache key {}".format(cache_key))
+            logger.exception(e)
+            cache.delete(cache_key)
+
     def df_metrics_to_num(self, df):
         """Converting metrics to numeric when pandas.read_sql cannot"""
         metrics = self.metric_labels
@@ -364,6 +541,71 @@ class BaseViz:
             return self.datasource.database.cache_timeout
         return config["CACHE_DEFAULT_TIMEOUT"]
 
+    @property
+    def max_staleness(self) -> int:
+        """
+        Seconds the cached data is still served for past its cache timeout, while
+        it is refreshed in the background. Set by the `stale_while_revalidate` key
+        of the datasource params, or else of the database extra. 0 disables it.
+        """
+        database = getattr(self.datasource, "database", None)
+        for params in (self.datasource.params, getattr(database, "extra", None)):
+            if isinstance(params, str):
+                max_staleness = json_to_dict(params).get("stale_while_revalidate")
+                if max_staleness is not None:
+                    return int(max_staleness)
+        return 0
+
+    def get_staleness(self, cached_dttm: str) -> float:
+        """Seconds past its cache timeout data cached at the given date is"""
+        if not self.cache_timeout:
+            return 0
+        age = datetime.utcnow() - datetime.strptime(cached_dttm, "%Y-%m-%dT%H:%M:%S")
+        return max(age.total_seconds() - self.cache_timeout, 0)
+
+    def can_refresh_in_background(self, query_obj: Dict[str, Any]) -> bool:
+        """
+        Whether a Celery task, which has neither the user nor the request, computes
+        the same cache key for the query. The row level security filters and the
+        extra cache keys of the templates depend on them.
+        """
+        return not security_manager.get_rls_ids(
+            self.datasource
+        ) and not self.datasource.get_extra_cache_keys(query_obj)
+
+    def refresh_in_background(
+        self, cache_key: str, query_obj: Dict[str, Any], **extra: Any
+    ) -> None:
+        """
+        Refreshes the cached data in a Celery task, unless one is running.
+
+        :param cache_key: The key of the cached data
+        :param query_obj: The query the data was cached for
+        :param extra: The extra key/values of the cache key, see cache_key
+        """
+        refresh_key = get_refresh_key(cache_key)
+        if not cache.add(
+            refresh_key, True, timeout=config["CHART_SINGLE_FLIGHT_LOCK_TIMEOUT"]
+        ):
+            stats_logger.incr("stale_while_revalidate.in_flight")
+            return
+        # pylint: disable=import-outside-toplevel
+        from superset.tasks.cache import refresh_chart
+
+        try:
+            refresh_chart.delay(
+                self.datasource.type,
+                self.datasource.id,
+                self.form_data,
+                cache_key,
+                dump_query_obj(query_obj),
+                extra,
+            )
+            stats_logger.incr("stale_while_revalidate.refresh")
+        except Exception as e:
+            logger.exception(e)
+            cache.delete(refresh_key)
+
     def get_json(self):
         return json.dumps(
             self.get_payload(), default=utils.json_int_dttm_ser, ignore_nan=True
@@ -380,10 +622,10 @@ class BaseViz:
 
         The `extra` arguments are currently used by time shift queries, since
         different time shifts wil differ only in the `from_dttm` and `to_dttm`
-        values which are stripped.
+        values which are stripped, and by the days of the time series cached on
+        their own, which replace the time range with the day.
         """
         cache_dict = copy.copy(query_obj)
-        cache_dict.update(extra)
 
         for k in ["from_dttm", "to_dttm"]:
             del cache_dict[k]
@@ -393,9 +635,51 @@ class BaseViz:
         cache_dict["extra_cache_keys"] = self.datasource.get_extra_cache_keys(query_obj)
         cache_dict["rls"] = security_manager.get_rls_ids(self.datasource)
         cache_dict["changed_on"] = self.datasource.changed_on
+        cache_dict.update(extra)
         json_data = self.json_dumps(cache_dict, sort_keys=True)
         return hashlib.md5(json_data.encode("utf-8")).hexdigest()
 
+    def run_concurrently(self, func: Callable, args_list: List[Tuple]) -> List[Any]:
+        """Runs ``func(viz_obj, *args)`` in the extra queries pool for each args
+
+        Each call gets its own copy of the viz as the queries store their status
+        and results on it, the state of the copies is merged back in order. The
+        copies use the datasource merged into the session of their thread.
+        """
+
+        def run(*args):
+            viz_obj = copy.copy(self)
+            viz_obj.datasource = utils.merge_into_current_session(self.datasource)
+            viz_obj.cached_bytes = 0
+            return viz_obj, func(viz_obj, *args)
+
+        run = utils.with_current_context(run)
+        executor = get_extra_queries_executor()
+        futures = [executor.submit(run, *args) for args in args_list]
+        results = []
+        for future in futures:
+            viz_obj, result = future.result()
+            self.merge_query_state(viz_obj)
+            results.append(result)
+        return results
+
+    def merge_query_state(self, viz_obj: "BaseViz") -> None:
+        """Copies the state left by queries run on a copy of this viz
+
+        Mirrors running these queries on the viz itself: the latest query status
+        wins and the cache metadata is kept once any of the queries hit the cache.
+        """
+        self.query = viz_obj.query
+        self.status = viz_obj.status
+        self.error_message = viz_obj.error_message
+        self.results = viz_obj.results
+        self.cached_bytes += viz_obj.cached_bytes
+        if viz_obj.is_stale:
+            self.is_stale = True
+        if viz_obj._any_cache_key:
+            self._any_cache_key = viz_obj._any_cache_key
+            self._any_cached_dttm = viz_obj._any_cached_dttm
+
     def get_payload(self, query_obj=None):
         """Returns a payload of metadata and data"""
         self.run_extra_queries()
@@ -417,20 +701,36 @@ class BaseViz:
         is_loaded = False
         stacktrace = None
         df = None
-        cached_dttm = datetime.utcnow().isoformat().split(".")[0]
+        lease = None
         if cache_key and cache and not self.force:
             cache_value = cache.get(cache_key)
+            if not cache_value:
+                # other requests may be running the same query already
+                cache_value, lease = single_flight.get(cache_key, cache.get)
             if cache_value:
                 stats_logger.incr("loading_from_cache")
                 try:
-                    cache_value = pkl.loads(cache_value)
-                    df = cache_value["df"]
-                    self.query = cache_value["query"]
-                    self._any_cached_dttm = cache_value["dttm"]
-                    self._any_cache_key = cache_key
-                    self.status = utils.QueryStatus.SUCCESS
-                    is_loaded = True
-                    stats_logger.incr("loaded_from_cache")
+                    cache_value = cache_serializer.loads(cache_value)
+                    max_staleness = self.max_staleness
+                    staleness = (
+                        self.get_staleness(cache_value["dttm"])
+                        if max_staleness > 0
+                        else 0
+                    )
+                    if staleness <= max_staleness and (
+                        not staleness or self.can_refresh_in_background(query_obj)
+                    ):
+                        df = cache_value["df"]
+                        self.query = cache_value["query"]
+                        self._any_cached_dttm = cache_value["dttm"]
+                        self._any_cache_key = cache_key
+                        self.status = utils.QueryStatus.SUCCESS
+                        is_loaded = True
+                        stats_logger.incr("loaded_from_cache")
+                    if is_loaded and staleness:
+                        self.is_stale = True
+                        stats_logger.incr("loaded_stale_from_cache")
+                        self.refresh_in_background(cache_key, query_obj, **kwargs)
                 except Exception as e:
                     logger.exception(e)
                     logger.error(
@@ -441,6 +741,8 @@ class BaseViz:
         if query_obj and not is_loaded:
             try:
                 df = self.get_df(query_obj)
+                # the staleness of the data is counted from the end of its query
+                cached_dttm = datetime.utcnow().isoformat().split(".")[0]
                 if self.status != utils.QueryStatus.FAILED:
                     stats_logger.incr("loaded_from_source")
                     if not self.force:
@@ -461,20 +763,32 @@ class BaseViz:
             ):
                 try:
                     cache_value = dict(dttm=cached_dttm, df=df, query=self.query)
-                    cache_value = pkl.dumps(cache_value, protocol=pkl.HIGHEST_PROTOCOL)
+                    cache_value = cache_serializer.dumps(cache_value)
 
                     logger.info(
                         "Caching {} chars at key {}".format(len(cache_value), cache_key)
                     )
 
                     stats_logger.incr("set_cache_key")
-                    cache.set(cache_key, cache_value, timeout=self.cache_timeout)
+                    timeout = self.cache_timeout
+                    max_staleness = self.max_staleness
+                    if (
+                        timeout
+                        and max_staleness
+                        and self.can_refresh_in_background(query_obj)
+                    ):
+                        # kept past the timeout to be served stale
+                        timeout += max_staleness
+                    cache.set(cache_key, cache_value, timeout=timeout)
+                    self.cached_bytes += len(cache_value)
                 except Exception as e:
                     # cache.set call can fail if the backend is down or if
                     # the key is too large or whatever other reasons
                     logger.warning("Could not cache key {}".format(cache_key))
                     logger.exception(e)
                     cache.delete(cache_key)
+        if lease:
+            lease.release()
         return {
             "cache_key": self._any_cache_key,
             "cached_dttm": self._any_cached_dttm,
@@ -483,6 +797,7 @@ class BaseViz:
             "error": self.error_message,
             "form_data": self.form_data,
             "is_cached": self._any_cache_key is not None,
+            "is_stale": self.is_stale,
             "query": self.query,
             "status": self.status,
             "stacktrace": stacktrace,
@@ -517,6 +832,27 @@ class BaseViz:
         include_index = not isinstance(df.index, pd.RangeIndex)
         return df.to_csv(index=include_index, **config["CSV_EXPORT"])
 
+    def iter_csv(self) -> Iterator[str]:
+        """Yields the CSV export by chunks, see ``get_csv``
+
+        Visualizations reading the datasource through ``BaseViz.get_df`` stream
+        their rows from the database, the others split their dataframe.
+        """
+        chunk_size = config["CSV_EXPORT_CHUNK_SIZE"]
+        query_obj = self.query_obj()
+        if type(self).get_df is BaseViz.get_df and query_obj:
+            chunks = (
+                self.process_query_df(df, query_obj)
+                for df in self.datasource.query_chunks(query_obj, chunk_size)
+            )
+            return csv.df_chunks_to_csv(chunks, index=False, **config["CSV_EXPORT"])
+
+        df = self.get_df(query_obj)
+        include_index = not isinstance(df.index, pd.RangeIndex)
+        return csv.df_chunks_to_csv(
+            csv.split_df(df, chunk_size), index=include_index, **config["CSV_EXPORT"]
+        )
+
     def get_data(self, df: pd.DataFrame) -> VizData:
         return df.to_dict(orient="records")
 
@@ -635,11 +971,7 @@ class TableViz(BaseViz):
             axis=1,
         )
 
-        data = self.handle_js_int_overflow(
-            dict(records=df.to_dict(orient="records"), columns=list(df.columns))
-        )
-
-        return data
+        return dict(records=df_to_records(df), columns=list(df.columns))
 
     def json_dumps(self, obj, sort_keys=False):
         return json.dumps(
@@ -1113,6 +1445,7 @@ class BigNumberViz(BaseViz):
     verbose_name = _("Big Number with Trendline")
     credits = 'a <a href="https://github.com/airbnb/superset">Superset</a> original'
     is_timeseries = True
+    cache_time_buckets = True
 
     def query_obj(self):
         d = super().query_obj()
@@ -1166,6 +1499,7 @@ class NVD3TimeSeriesViz(NVD3Viz):
     verbose_name = _("Time Series - Line Chart")
     sort_series = False
     is_timeseries = True
+    cache_time_buckets = True
     pivot_fill_value: Optional[int] = None
 
     def to_series(self, df, classed="", title_suffix=""):
@@ -1273,24 +1607,35 @@ class NVD3TimeSeriesViz(NVD3Viz):
         # backwards compatibility
         if not isinstance(time_compare, list):
             time_compare = [time_compare]
+        if not time_compare:
+            return
 
-        for option in time_compare:
-            query_object = self.query_obj()
-            delta = utils.parse_past_timedelta(option)
-            query_object["inner_from_dttm"] = query_object["from_dttm"]
-            query_object["inner_to_dttm"] = query_object["to_dttm"]
+        base_query_object = self.query_obj()
+        base_query_object["inner_from_dttm"] = base_query_object["from_dttm"]
+        base_query_object["inner_to_dttm"] = base_query_object["to_dttm"]
 
-            if not query_object["from_dttm"] or not query_object["to_dttm"]:
-                raise Exception(
-                    _(
-                        "`Since` and `Until` time bounds should be specified "
-                        "when using the `Time Shift` feature."
-                    )
+        if not base_query_object["from_dttm"] or not base_query_object["to_dttm"]:
+            raise Exception(
+                _(
+                    "`Since` and `Until` time bounds should be specified "
+                    "when using the `Time Shift` feature."
                 )
+            )
+
+        def run_time_compare_query(viz_obj, option, delta):
+            query_object = copy.deepcopy(base_query_object)
             query_object["from_dttm"] -= delta
             query_object["to_dttm"] -= delta
+            stats_key = "time_compare.{}".format(re.sub(r"\W+", "_", option))
+            with stats_timing(stats_key, stats_logger):
+                payload = viz_obj.get_df_payload(query_object, time_compare=option)
+            return payload.get("df")
 
-            df2 = self.get_df_payload(query_object, time_compare=option).get("df")
+        options = [
+            (option, utils.parse_past_timedelta(option)) for option in time_compare
+        ]
+        dataframes = self.run_concurrently(run_time_compare_query, options)
+        for (option, delta), df2 in zip(options, dataframes):
             if df2 is not None and DTTM_ALIAS in df2:
                 label = "{} offset".format(option)
                 df2[DTTM_ALIAS] += delta
@@ -1896,6 +2241,16 @@ class FilterBoxViz(BaseViz):
     cache_type = "get_data"
     filter_row_limit = 1000
 
+    def __init__(
+        self,
+        datasource: "BaseDatasource",
+        form_data: Dict[str, Any],
+        force: bool = False,
+    ):
+        super().__init__(datasource, form_data, force)
+        # results of the batched query by column, popped as the columns load
+        self._batched_results: Dict[str, QueryResult] = {}
+
     def query_obj(self):
         return None
 
@@ -1904,17 +2259,52 @@ class FilterBoxViz(BaseViz):
         filters = self.form_data.get("filter_configs") or []
         qry["row_limit"] = self.filter_row_limit
         self.dataframes = {}
+        query_objs: Dict[str, Dict[str, Any]] = OrderedDict()
         for flt in filters:
             col = flt.get("column")
             if not col:
                 raise Exception(
                     _("Invalid filter configuration, please select a column")
                 )
-            qry["groupby"] = [col]
             metric = flt.get("metric")
-            qry["metrics"] = [metric] if metric else []
-            df = self.get_df_payload(query_obj=qry).get("df")
-            self.dataframes[col] = df
+            query_obj = copy.deepcopy(qry)
+            query_obj["groupby"] = [col]
+            query_obj["metrics"] = [metric] if metric else []
+            query_objs[col] = query_obj
+
+        if self.datasource.supports_query_batch:
+            # the columns missing from the cache are fetched in one round trip,
+            # every column is then loaded and cached on its own
+            self._batched_results = self.query_batch(query_objs)
+            for col, query_obj in query_objs.items():
+                self.dataframes[col] = self.get_df_payload(query_obj=query_obj).get(
+                    "df"
+                )
+        else:
+            dataframes = self.run_concurrently(
+                lambda viz_obj, query_obj: viz_obj.get_df_payload(
+                    query_obj=query_obj
+                ).get("df"),
+                [(query_obj,) for query_obj in query_objs.values()],
+            )
+            self.dataframes = dict(zip(query_objs.keys(), dataframes))
+
+    def query_batch(
+        self, query_objs: Dict[str, Dict[str, Any]]
+    ) -> Dict[str, QueryResult]:
+        """Runs the queries of the columns which aren't cached yet in one batch"""
+        missing = OrderedDict()
+        for col, query_obj in query_objs.items():
+            if self.force or not cache or not cache.get(self.cache_key(query_obj)):
+                missing[col] = query_obj
+        if len(missing) < 2:
+            return {}
+        results = self.datasource.query_batch(list(missing.values()))
+        return dict(zip(missing.keys(), results))
+
+    def query_datasource(self, query_obj: Dict[str, Any]) -> QueryResult:
+        result = self._batched_results.pop(query_obj["groupby"][0], None)
+        return result or super().query_datasource(query_obj)
 
     def get_data(self, df: pd.DataFrame) -> VizData:
         filters = self.form_data.get("filter_configs") or []
@@ -0,0 +1,210 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+# isort:skip_file
+"""Unit tests for the client of the report publishing APIs"""
+import json
+import os
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from unittest.mock import Mock
+
+import tests.test_app
+from superset.utils.api_client import APIClient, APIUnavailable, CircuitBreaker
+
+from .base_tests import SupersetTestCase
+
+
+class StubAPIHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    connections: set = set()
+    calls: Counter = Counter()
+    flaky_failures = 0
+
+    def do_GET(self):
+        self.handle_call()
+
+    def do_POST(self):
+        self.handle_call()
+
+    def handle_call(self):
+        StubAPIHandler.connections.add(self.client_address)
+        StubAPIHandler.calls[(self.command, self.path)] += 1
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length)) if length else None
+        if self.path == "/down":
+            self.reply(503, {"error": "Service unavailable"})
+        elif self.path == "/flaky" and StubAPIHandler.flaky_failures:
+            StubAPIHandler.flaky_failures -= 1
+            self.reply(503, {"error": "Service unavailable"})
+        elif self.path == "/slow":
+            time.sleep(0.5)
+            self.reply(200, {"result": "late"})
+        else:
+            self.reply(
+                200,
+                {"result": {"auth": self.headers["Authorization"], "request": body}},
+            )
+
+    def reply(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class APIClientTestCase(SupersetTestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = HTTPServer(("localhost", 0), StubAPIHandler)
+        cls.base_url = "http://localhost:{}".format(cls.server.server_port)
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        StubAPIHandler.connections.clear()
+        StubAPIHandler.calls.clear()
+        StubAPIHandler.flaky_failures = 0
+
+    def get_client(self, **config):
+        config = {"backoff_factor": 0, "read_timeout": 0.2, **config}
+        return APIClient(
+            "stub",
+            self.base_url,
+            headers={"Authorization": "Bearer key"},
+            config=config,
+            stats_logger=Mock(),
+        )
+
+    def test_get(self):
+        client = self.get_client()
+        response = client.get("/report/get/1")
+        self.assertEqual(
+            {"auth": "Bearer key", "request": None}, response.json()["result"]
+        )
+        client.stats_logger.timing.assert_called_once()
+        self.assertEqual(
+            "api_client.stub.latency", client.stats_logger.timing.call_args[0][0]
+        )
+
+    def test_post(self):
+        client = self.get_client()
+        response = client.post("/report/create", {"request": {"report": {"a": 1}}})
+        self.assertEqual(
+            {"request": {"report": {"a": 1}}}, response.json()["result"]["request"]
+        )
+
+    def test_connections_are_reused(self):
+        client = self.get_client()
+        for _ in range(5):
+            client.get("/report/get/1")
+        self.assertEqual(1, len(StubAPIHandler.connections))
+
+    def test_get_is_retried(self):
+        StubAPIHandler.flaky_failures = 2
+        client = self.get_client(max_retries=2)
+        response = client.get("/flaky")
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(3, StubAPIHandler.calls[("GET", "/flaky")])
+        client.stats_logger.incr.assert_any_call("api_client.stub.retry")
+
+    def test_post_is_not_retried(self):
+        StubAPIHandler.flaky_failures = 1
+        client = self.get_client(max_retries=2)
+        with self.assertRaises(APIUnavailable):
+            client.post("/flaky", {})
+        self.assertEqual(1, StubAPIHandler.calls[("POST", "/flaky")])
+
+    def test_read_timeout(self):
+        client = self.get_client(max_retries=0)
+        start = time.monotonic()
+        with self.assertRaises(APIUnavailable):
+            client.get("/slow")
+        self.assertLess(time.monotonic() - start, 0.5)
+        client.stats_logger.incr.assert_any_call("api_client.stub.error")
+
+    def test_circuit_breaker_fails_fast(self):
+        client = self.get_client(max_retries=0, failure_threshold=2)
+        for _ in range(2):
+            with self.assertRaises(APIUnavailable):
+                client.get("/down")
+        self.assertEqual(CircuitBreaker.OPEN, client.circuit_breaker.state)
+
+        with self.assertRaises(APIUnavailable):
+            client.get("/report/get/1")
+        self.assertEqual(0, StubAPIHandler.calls[("GET", "/report/get/1")])
+        client.stats_logger.incr.assert_any_call("api_client.stub.circuit_open")
+
+    def test_circuit_breaker_half_open(self):
+        now = [0.0]
+        breaker = CircuitBreaker(
+            failure_threshold=1, reset_timeout=10, clock=lambda: now[0]
+        )
+        breaker.record_failure()
+        self.assertFalse(breaker.allow_request())
+
+        now[0] = 10.0
+        self.assertEqual(CircuitBreaker.HALF_OPEN, breaker.state)
+        # a single trial call goes through
+        self.assertTrue(breaker.allow_request())
+        self.assertFalse(breaker.allow_request())
+        breaker.record_failure()
+        self.assertEqual(CircuitBreaker.OPEN, breaker.state)
+
+        now[0] = 20.0
+        self.assertTrue(breaker.allow_request())
+        breaker.record_success()
+        self.assertEqual(CircuitBreaker.CLOSED, breaker.state)
+        self.assertTrue(breaker.allow_request())
+
+    def test_interrupted_trial_call_reopens_the_circuit(self):
+        client = self.get_client(max_retries=0, failure_threshold=1, reset_timeout=0)
+        with self.assertRaises(APIUnavailable):
+            client.get("/down")
+        self.assertEqual(CircuitBreaker.HALF_OPEN, client.circuit_breaker.state)
+
+        client._session = Mock(request=Mock(side_effect=KeyboardInterrupt))
+        client._session_pid = os.getpid()
+        with self.assertRaises(KeyboardInterrupt):
+            client.get("/report/get/1")
+        # the next trial call isn't refused forever
+        client.close()
+        self.assertEqual(200, client.get("/report/get/1").status_code)
+        self.assertEqual(CircuitBreaker.CLOSED, client.circuit_breaker.state)
+
+    def test_payload_is_serialized_before_the_trial_call(self):
+        client = self.get_client(max_retries=0, failure_threshold=1, reset_timeout=0)
+        with self.assertRaises(APIUnavailable):
+            client.get("/down")
+
+        with self.assertRaises(TypeError):
+            client.post("/report/create", {"request": object()})
+        self.assertEqual(0, StubAPIHandler.calls[("POST", "/report/create")])
+        response = client.post("/report/create", {"request": {}})
+        self.assertEqual(200, response.status_code)
@@ -0,0 +1,86 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+"""Unit tests for the chart data cache serializers"""
+import pickle as pkl
+from datetime import datetime
+from unittest import TestCase
+
+import pandas as pd
+
+from superset.utils.cache_serializers import (
+    ArrowCacheSerializer,
+    is_arrow_payload,
+    PickleCacheSerializer,
+)
+
+
+class CacheSerializersTestCase(TestCase):
+    def get_cache_value(self):
+        df = pd.DataFrame(
+            {
+                "__timestamp": [datetime(2020, 1, 1), datetime(2020, 1, 2)],
+                "name": ["foo", None],
+                "sum__num": [1.5, 2.0],
+                "count": [1, 2],
+            }
+        )
+        return dict(dttm="2020-01-01T00:00:00", df=df, query="SELECT 1")
+
+    def assert_roundtrip(self, serializer):
+        value = self.get_cache_value()
+        loaded = serializer.loads(serializer.dumps(value))
+        self.assertEqual(loaded["dttm"], value["dttm"])
+        self.assertEqual(loaded["query"], value["query"])
+        pd.testing.assert_frame_equal(loaded["df"], value["df"])
+
+    def test_pickle_roundtrip(self):
+        self.assert_roundtrip(PickleCacheSerializer())
+
+    def test_arrow_roundtrip(self):
+        for fmt in ("ipc", "parquet"):
+            for compression in (None, "lz4", "zstd"):
+                serializer = ArrowCacheSerializer(fmt=fmt, compression=compression)
+                self.assertTrue(
+                    is_arrow_payload(serializer.dumps(self.get_cache_value()))
+                )
+                self.assert_roundtrip(serializer)
+
+    def test_arrow_reads_legacy_pickle(self):
+        value = self.get_cache_value()
+        blob = pkl.dumps(value, protocol=pkl.HIGHEST_PROTOCOL)
+        loaded = ArrowCacheSerializer().loads(blob)
+        pd.testing.assert_frame_equal(loaded["df"], value["df"])
+
+    def test_pickle_reads_arrow(self):
+        value = self.get_cache_value()
+        blob = ArrowCacheSerializer(compression="lz4").dumps(value)
+        loaded = PickleCacheSerializer().loads(blob)
+        pd.testing.assert_frame_equal(loaded["df"], value["df"])
+
+    def test_arrow_falls_back_to_pickle(self):
+        value = self.get_cache_value()
+        value["df"] = pd.DataFrame({"mixed": [1, "a", [1, 2]]})
+        blob = ArrowCacheSerializer().dumps(value)
+        self.assertFalse(is_arrow_payload(blob))
+        loaded = ArrowCacheSerializer().loads(blob)
+        pd.testing.assert_frame_equal(loaded["df"], value["df"])
+
+    def test_invalid_arguments(self):
+        with self.assertRaises(ValueError):
+            ArrowCacheSerializer(fmt="feather")
+        with self.assertRaises(ValueError):
+            ArrowCacheSerializer(compression="snappy")
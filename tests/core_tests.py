@@ -20,6 +20,7 @@ import cgi
 import csv
 import datetime
 import doctest
+import gzip
 import io
 import json
 import logging
@@ -55,7 +56,7 @@ from superset.models.datasource_access_request import DatasourceAccessRequest
 from superset.models.slice import Slice
 from superset.models.sql_lab import Query
 from superset.result_set import SupersetResultSet
-from superset.utils import core as utils
+from superset.utils import chunked_results, core as utils
 from superset.views import core as views
 from superset.views.database.views import DatabaseView
 
@@ -634,6 +635,30 @@ class CoreTests(SupersetTestCase):
         self.assertEqual(list(expected_data), list(data))
         self.logout()
 
+    @mock.patch.dict(
+        "superset.views.core.config",
+        {"CSV_EXPORT_CHUNK_SIZE": 2, "CSV_EXPORT_GZIP": True},
+    )
+    def test_csv_endpoint_streaming(self):
+        self.login("admin")
+        sql = """
+            SELECT name
+            FROM birth_names
+            WHERE name = 'James'
+            LIMIT 5
+        """
+        client_id = "{}".format(random.getrandbits(64))[:10]
+        self.run_sql(sql, client_id, raise_on_error=True)
+
+        resp = self.client.get(
+            "/superset/csv/{}".format(client_id), headers={"Accept-Encoding": "gzip"}
+        )
+        self.assertTrue(resp.is_streamed)
+        self.assertEqual("gzip", resp.headers["Content-Encoding"])
+        data = csv.reader(io.StringIO(gzip.decompress(resp.data).decode("utf-8")))
+        self.assertEqual([["name"]] + [["James"]] * 5, list(data))
+        self.logout()
+
     def test_extra_table_metadata(self):
         self.login("admin")
         dbid = utils.get_example_database().id
@@ -1096,6 +1121,103 @@ class CoreTests(SupersetTestCase):
             self.assertDictEqual(deserialized_payload, payload)
             expand_data.assert_called_once()
 
+    def test_chunked_results_compressions(self):
+        store = {}
+        results_backend = mock.Mock()
+        results_backend.set.side_effect = lambda key, value, timeout: store.update(
+            {key: value}
+        )
+        results_backend.get.side_effect = store.get
+        data = [(i, f"name_{i}") for i in range(25)]
+        cursor_descr = (("id", "int"), ("name", "string"))
+        pa_table = SupersetResultSet(data, cursor_descr, BaseEngineSpec()).pa_table
+        for compression in ("zlib", "lz4", "zstd"):
+            store.clear()
+            chunked_results.store_results(
+                results_backend, "key", {"status": "success"}, pa_table, 10, compression
+            )
+            self.assertEqual(
+                {"key", "key/0", "key/1", "key/2"}, set(store.keys()), compression
+            )
+            index = chunked_results.load_index(store["key"])
+            self.assertEqual(25, index["num_rows"])
+            self.assertEqual({"status": "success"}, index["payload"])
+
+            table = chunked_results.load_rows(results_backend, "key", index, 8, 5)
+            self.assertEqual(list(range(8, 13)), table.column("id").to_pylist())
+            self.assertEqual(
+                25,
+                sum(
+                    batch.num_rows
+                    for batch in chunked_results.iter_batches(
+                        results_backend, "key", index
+                    )
+                ),
+            )
+
+        del store["key/1"]
+        with self.assertRaises(chunked_results.ResultsNotFound):
+            chunked_results.load_rows(results_backend, "key", index, 8, 5)
+
+    @mock.patch("superset.views.core.results_backend")
+    @mock.patch("superset.views.core.db")
+    def test_chunked_results_paging(self, mock_superset_db, mock_results_backend):
+        query_mock = mock.Mock()
+        query_mock.sql = "SELECT *"
+        query_mock.database.db_engine_spec = BaseEngineSpec()
+        query_mock.schema = "superset"
+        mock_superset_db.session.query().filter_by().one_or_none.return_value = (
+            query_mock
+        )
+        store = {}
+        mock_results_backend.set.side_effect = lambda key, value, timeout: store.update(
+            {key: value}
+        )
+        mock_results_backend.get.side_effect = store.get
+
+        data = [(i,) for i in range(100)]
+        results = SupersetResultSet(data, (("col_0", "int"),), BaseEngineSpec())
+        payload = {
+            "status": utils.QueryStatus.SUCCESS,
+            "query": {"rows": 100},
+            "selected_columns": results.columns,
+        }
+        chunked_results.store_results(
+            mock_results_backend, "key", payload, results.pa_table, 30
+        )
+
+        # get all results
+        result = json.loads(self.get_resp("/superset/results/key/"))
+        self.assertEqual([{"col_0": i} for i in range(100)], result["data"])
+        self.assertNotIn("displayLimitReached", result)
+
+        # first page
+        result = json.loads(self.get_resp("/superset/results/key/?rows=10"))
+        self.assertEqual([{"col_0": i} for i in range(10)], result["data"])
+        self.assertTrue(result["displayLimitReached"])
+        self.assertEqual(0, result["offset"])
+
+        # page spanning two batches
+        result = json.loads(self.get_resp("/superset/results/key/?rows=10&offset=25"))
+        self.assertEqual([{"col_0": i} for i in range(25, 35)], result["data"])
+        self.assertEqual(25, result["offset"])
+
+        # last page
+        result = json.loads(self.get_resp("/superset/results/key/?rows=10&offset=95"))
+        self.assertEqual([{"col_0": i} for i in range(95, 100)], result["data"])
+        self.assertNotIn("displayLimitReached", result)
+
+        # only the batches of the page are read
+        mock_results_backend.get.reset_mock()
+        self.get_resp("/superset/results/key/?rows=10&offset=65")
+        self.assertEqual(
+            ["key", "key/2"],
+            [call[0][0] for call in mock_results_backend.get.call_args_list],
+        )
+
+        resp = self.client.get("/superset/results/key/?offset=a")
+        self.assertEqual(400, resp.status_code)
+
     @mock.patch.dict(
         "superset.extensions.feature_flag_manager._feature_flags",
         {"FOO": lambda x: 1},
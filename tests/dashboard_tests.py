@@ -20,13 +20,16 @@ import copy
 import json
 import unittest
 from random import random
+from unittest.mock import patch
 
+import sqlalchemy as sqla
 from flask import escape
 from sqlalchemy import func
+from sqlalchemy.orm import subqueryload
 from typing import Dict
 
 import tests.test_app
-from superset import db, security_manager
+from superset import app, db, security_manager
 from superset.connectors.sqla.models import SqlaTable
 from superset.models import core as models
 from superset.models.dashboard import Dashboard
@@ -71,6 +74,71 @@ class DashboardTests(SupersetTestCase):
         for title, url in urls.items():
             assert escape(title) in self.client.get(url).data.decode("utf-8")
 
+    def get_bootstrap_data(self, dash_id):
+        """Returns the bootstrap data of a new request along with its queries"""
+        db.session.expunge_all()
+        statements = []
+
+        def count_statements(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        sqla.event.listen(db.engine, "before_cursor_execute", count_statements)
+        try:
+            dash = (
+                db.session.query(Dashboard)
+                .options(subqueryload(Dashboard.slices))
+                .filter_by(id=dash_id)
+                .one()
+            )
+            bootstrap_data = dash.get_bootstrap_data(dash.get_datasources())
+        finally:
+            sqla.event.remove(db.engine, "before_cursor_execute", count_statements)
+        return bootstrap_data, statements
+
+    def test_dashboard_bootstrap_query_count(self):
+        dash = db.session.query(Dashboard).filter_by(slug="births").first()
+        dash_id, slices_count = dash.id, len(dash.slices)
+
+        with patch.dict(app.config, {"DASHBOARD_BOOTSTRAP_CACHE_TIMEOUT": None}):
+            expected, statements = self.get_bootstrap_data(dash_id)
+        self.assertEqual(slices_count, len(expected["dashboard_data"]["slices"]))
+        self.assertLess(len(statements), slices_count)
+        columns_statements = [s for s in statements if "table_columns.column_name" in s]
+        self.assertEqual(1, len(columns_statements))
+
+        # the first request fills the cache up, the next ones read it
+        self.get_bootstrap_data(dash_id)
+        bootstrap_data, statements = self.get_bootstrap_data(dash_id)
+        self.assertEqual(
+            json.loads(json.dumps(expected, default=str))["datasources"],
+            json.loads(json.dumps(bootstrap_data, default=str))["datasources"],
+        )
+        self.assertFalse([s for s in statements if "table_columns.column_name" in s])
+
+    def test_dashboard_bootstrap_cache_invalidation(self):
+        dash = db.session.query(Dashboard).filter_by(slug="births").first()
+        dash_id = dash.id
+        slc = dash.slices[0]
+        slice_id, slice_name = slc.id, slc.slice_name
+
+        bootstrap_data, _ = self.get_bootstrap_data(dash_id)
+        slices = {s["slice_id"]: s for s in bootstrap_data["dashboard_data"]["slices"]}
+        self.assertEqual(slice_name, slices[slice_id]["slice_name"])
+
+        slc = db.session.query(Slice).get(slice_id)
+        slc.slice_name = "Renamed chart"
+        db.session.commit()
+        try:
+            bootstrap_data, _ = self.get_bootstrap_data(dash_id)
+            slices = {
+                s["slice_id"]: s for s in bootstrap_data["dashboard_data"]["slices"]
+            }
+            self.assertEqual("Renamed chart", slices[slice_id]["slice_name"])
+        finally:
+            slc = db.session.query(Slice).get(slice_id)
+            slc.slice_name = slice_name
+            db.session.commit()
+
     def test_new_dashboard(self):
         self.login(username="admin")
         dash_count_before = db.session.query(func.count(Dashboard.id)).first()[0]
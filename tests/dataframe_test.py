@@ -51,3 +51,28 @@ class SupersetDataFrameTestCase(SupersetTestCase):
                 {"a": 2, "b": 100, "c": "c2"},
             ],
         )
+
+    def test_js_max_int_columns(self):
+        df = pd.DataFrame(
+            {
+                "a": np.array([1, 9007199254740992, -9007199254740992], dtype=np.int64),
+                "b": np.array([1, 2, 18446744073709551615], dtype=np.uint64),
+                # ints with missing values, as returned by the result set
+                "c": pd.Series([None, 1239162456494753670, 3], dtype=object),
+                "d": ["1239162456494753670", "x", "y"],
+            }
+        )
+
+        self.assertEqual(
+            df_to_records(df),
+            [
+                {"a": 1, "b": 1, "c": None, "d": "1239162456494753670"},
+                {"a": "9007199254740992", "b": 2, "c": "1239162456494753670", "d": "x"},
+                {
+                    "a": "-9007199254740992",
+                    "b": "18446744073709551615",
+                    "c": 3,
+                    "d": "y",
+                },
+            ],
+        )
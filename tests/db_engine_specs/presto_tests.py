@@ -20,6 +20,7 @@ import pandas as pd
 from sqlalchemy.engine.result import RowProxy
 from sqlalchemy.sql import select
 
+from superset import app
 from superset.db_engine_specs.presto import PrestoEngineSpec
 from tests.db_engine_specs.base_tests import DbEngineSpecTestCase
 
@@ -435,3 +436,21 @@ class PrestoTests(DbEngineSpecTestCase):
             }
         ]
         self.assertEqual(formatted_cost, expected)
+
+    def test_handle_cursor_coalesces_progress(self):
+        polls = [
+            {"stats": {"state": "RUNNING", "completedSplits": i, "totalSplits": 100}}
+            for i in range(1, 13)
+        ]
+        cursor = mock.Mock()
+        cursor.poll.side_effect = polls + [None]
+        query = mock.Mock(id=1, progress=0)
+        session = mock.Mock()
+        polling_config = {"min_interval": 0, "max_interval": 0}
+        with mock.patch.dict(app.config["SQLLAB_POLLING_CONFIG"], polling_config):
+            PrestoEngineSpec.handle_cursor(cursor, query, session)
+        self.assertEqual(13, cursor.poll.call_count)
+        self.assertEqual(12, query.progress)
+        # written at 5%, 10% and when done
+        self.assertEqual(3, session.commit.call_count)
+        cursor.cancel.assert_not_called()
@@ -0,0 +1,131 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+# isort:skip_file
+"""Unit tests for the pooled Druid broker client"""
+import json
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import tests.test_app
+from superset.connectors.druid.broker_client import (
+    close_broker_sessions,
+    get_broker_session,
+    get_timeout,
+)
+
+from .base_tests import SupersetTestCase
+
+TOPN_RESULT = [
+    {
+        "timestamp": "2012-01-01T00:00:00.000Z",
+        "result": [{"dim1": "Canada", "count": 12}, {"dim1": "USA", "count": 6}],
+    }
+]
+
+
+class StubBrokerHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    connections: set = set()
+
+    def do_POST(self):
+        StubBrokerHandler.connections.add(self.client_address)
+        length = int(self.headers["Content-Length"])
+        query = json.loads(self.rfile.read(length))
+        if query["dataSource"] == "broken":
+            self.reply(500, {"error": "Unknown exception"})
+        else:
+            self.reply(200, TOPN_RESULT)
+
+    def do_GET(self):
+        self.reply(200, {"version": "0.16.0"})
+
+    def reply(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@unittest.skipUnless(
+    SupersetTestCase.is_module_installed("pydruid"), "pydruid not installed"
+)
+class DruidBrokerClientTestCase(SupersetTestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = HTTPServer(("localhost", 0), StubBrokerHandler)
+        cls.base_url = "http://localhost:{}".format(cls.server.server_port)
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        close_broker_sessions()
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def get_client(self):
+        from superset.connectors.druid.broker_client import PooledPyDruid
+
+        return PooledPyDruid(
+            self.base_url,
+            "druid/v2",
+            session=get_broker_session(self.base_url),
+            timeout=get_timeout(),
+        )
+
+    def topn(self, client, datasource="ds"):
+        return client.topn(
+            datasource=datasource,
+            granularity="all",
+            intervals="2012-01-01/2012-01-02",
+            aggregations={"count": {"type": "count", "name": "count"}},
+            dimension="dim1",
+            metric="count",
+            threshold=2,
+        )
+
+    def test_query(self):
+        client = self.get_client()
+        self.topn(client)
+        df = client.export_pandas()
+        self.assertEqual(["Canada", "USA"], df["dim1"].tolist())
+
+    def test_connections_are_reused(self):
+        StubBrokerHandler.connections.clear()
+        for _ in range(5):
+            self.topn(self.get_client())
+        self.assertEqual(1, len(StubBrokerHandler.connections))
+
+    def test_session_per_broker(self):
+        self.assertIs(
+            get_broker_session(self.base_url), get_broker_session(self.base_url)
+        )
+        self.assertIsNot(
+            get_broker_session(self.base_url), get_broker_session("http://other:8082")
+        )
+
+    def test_druid_error(self):
+        with self.assertRaises(IOError) as context:
+            self.topn(self.get_client(), datasource="broken")
+        self.assertIn("Unknown exception", str(context.exception))
@@ -17,7 +17,8 @@
 # isort:skip_file
 import json
 import unittest
-from unittest.mock import Mock
+from datetime import datetime
+from unittest.mock import Mock, patch
 
 import tests.test_app
 import superset.connectors.druid.models as models
@@ -384,6 +385,85 @@ class DruidFuncTestCase(SupersetTestCase):
         res = DruidDatasource.get_filters([filtr], ["A"], column_dict)
         self.assertEqual(6, res.filter["filter"]["value"])
 
+    @unittest.skipUnless(
+        SupersetTestCase.is_module_installed("pydruid"), "pydruid not installed"
+    )
+    def test_add_filter_from_pre_query_data_single_dimension(self):
+        import pandas as pd
+
+        ds = DruidDatasource(datasource_name="datasource")
+        df = pd.DataFrame({"dim1": ["a", "b", "a", None], "count": [4, 3, 2, 1]})
+        res = ds._add_filter_from_pre_query_data(df, ["dim1"], None)
+        self.assertEqual(
+            {"type": "in", "dimension": "dim1", "values": ["a", "b", None]},
+            res.filter["filter"],
+        )
+
+        df = pd.DataFrame({"dim1": ["a"], "count": [4]})
+        dim_filter = models.Dimension("dim2") == "x"
+        res = ds._add_filter_from_pre_query_data(df, ["dim1"], dim_filter)
+        self.assertEqual("and", res.filter["filter"]["type"])
+        pre_query_filter, original_filter = res.filter["filter"]["fields"]
+        self.assertEqual(
+            {"type": "selector", "dimension": "dim1", "value": "a"},
+            pre_query_filter.filter["filter"],
+        )
+        self.assertIs(dim_filter, original_filter)
+
+        res = ds._add_filter_from_pre_query_data(pd.DataFrame(), ["dim1"], None)
+        self.assertIsNone(res)
+
+    @unittest.skipUnless(
+        SupersetTestCase.is_module_installed("pydruid"), "pydruid not installed"
+    )
+    def test_add_filter_from_pre_query_data_multiple_dimensions(self):
+        import pandas as pd
+
+        ds = DruidDatasource(datasource_name="datasource")
+        df = pd.DataFrame(
+            {"dim1": ["a", "a", "b", "a"], "dim2": [1, 2, 1, 1], "count": [4, 3, 2, 1]}
+        )
+        res = ds._add_filter_from_pre_query_data(df, ["dim1", "dim2"], None)
+        self.assertEqual("or", res.filter["filter"]["type"])
+        groups = [
+            [f.filter["filter"] for f in group.filter["filter"]["fields"]]
+            for group in res.filter["filter"]["fields"]
+        ]
+        self.assertEqual(
+            [
+                [
+                    {"type": "selector", "dimension": "dim1", "value": "a"},
+                    {"type": "in", "dimension": "dim2", "values": [1, 2]},
+                ],
+                [
+                    {"type": "selector", "dimension": "dim1", "value": "b"},
+                    {"type": "selector", "dimension": "dim2", "value": 1},
+                ],
+            ],
+            groups,
+        )
+
+    @unittest.skipUnless(
+        SupersetTestCase.is_module_installed("pydruid"), "pydruid not installed"
+    )
+    def test_add_filter_from_pre_query_data_extraction_fn(self):
+        import pandas as pd
+
+        ds = DruidDatasource(datasource_name="datasource")
+        dimension_spec = {
+            "type": "extraction",
+            "dimension": "build",
+            "outputName": "buildPrefix",
+            "outputType": "STRING",
+            "extractionFn": {"type": "regex", "expr": "(^[0-9A-Za-z]{3})"},
+        }
+        df = pd.DataFrame({"buildPrefix": ["22B", "22C"], "count": [2, 1]})
+        res = ds._add_filter_from_pre_query_data(df, [dimension_spec], None)
+        self.assertEqual("in", res.filter["filter"]["type"])
+        self.assertEqual("build", res.filter["filter"]["dimension"])
+        self.assertEqual(["22B", "22C"], res.filter["filter"]["values"])
+        self.assertIsInstance(res.extraction_function, RegexExtraction)
+
     @unittest.skipUnless(
         SupersetTestCase.is_module_installed("pydruid"), "pydruid not installed"
     )
@@ -1104,6 +1184,82 @@ class DruidFuncTestCase(SupersetTestCase):
         self.assertEqual({"count1", "sum1", "sum2"}, set(aggregations.keys()))
         self.assertEqual({"div1"}, set(post_aggregations.keys()))
 
+    def get_plan_datasource(self):
+        ds = DruidDatasource(datasource_name="datasource")
+        ds.get_having_filters = Mock(return_value=[])
+        ds.columns = [DruidColumn(column_name="dim1"), DruidColumn(column_name="dim2")]
+        ds.metrics = [
+            DruidMetric(
+                metric_name="count1",
+                metric_type="count",
+                json=json.dumps({"type": "count", "name": "count1"}),
+            )
+        ]
+        return ds
+
+    @unittest.skipUnless(
+        SupersetTestCase.is_module_installed("pydruid"), "pydruid not installed"
+    )
+    def test_get_query_plan_two_phase_topn(self):
+        ds = self.get_plan_datasource()
+        query_obj = dict(
+            groupby=["dim1"],
+            metrics=["count1"],
+            granularity="day",
+            from_dttm=datetime(2020, 1, 1),
+            to_dttm=datetime(2020, 1, 8),
+            timeseries_limit=5,
+            filter=[{"col": "dim2", "op": "==", "val": "a"}],
+        )
+        with patch.object(models, "run_in_query_pool") as run_in_query_pool:
+            plan = ds.get_query_plan(query_obj)
+        run_in_query_pool.assert_not_called()
+
+        self.assertEqual(2, len(plan))
+        pre_qry, qry = plan
+        self.assertEqual("topN", pre_qry["queryType"])
+        self.assertEqual("all", pre_qry["granularity"])
+        self.assertEqual("dim1", pre_qry["dimension"])
+        self.assertEqual(5, pre_qry["threshold"])
+        self.assertEqual("topN", qry["queryType"])
+        self.assertNotEqual("all", qry["granularity"])
+        # without phase one's results only the chart filters are known
+        self.assertEqual(
+            {"type": "selector", "dimension": "dim2", "value": "a"}, qry["filter"]
+        )
+
+    @unittest.skipUnless(
+        SupersetTestCase.is_module_installed("pydruid"), "pydruid not installed"
+    )
+    def test_get_query_str_does_not_query_broker(self):
+        ds = self.get_plan_datasource()
+
+        def get_query_obj():
+            return dict(
+                groupby=["dim1", "dim2"],
+                metrics=["count1"],
+                granularity="day",
+                from_dttm=datetime(2020, 1, 1),
+                to_dttm=datetime(2020, 1, 8),
+                timeseries_limit=5,
+                filter=[],
+            )
+
+        with patch.object(models, "run_in_query_pool") as run_in_query_pool:
+            query_str = ds.get_query_str(get_query_obj(), phase=2)
+            phase_one_str = ds.get_query_str(get_query_obj())
+            plan = ds.get_query_plan(get_query_obj(), phase=1)
+        run_in_query_pool.assert_not_called()
+
+        self.assertIn("// Phase 1", query_str)
+        self.assertIn("// Phase 2", query_str)
+        self.assertNotIn("// Phase 2", phase_one_str)
+        self.assertEqual(1, len(plan))
+        self.assertEqual("groupBy", plan[0]["queryType"])
+        self.assertEqual({"dim1", "dim2"}, set(plan[0]["dimensions"]))
+        self.assertEqual(5, plan[0]["limitSpec"]["limit"])
+        self.assertIn(json.dumps(plan[0], indent=2), phase_one_str)
+
     @unittest.skipUnless(
         SupersetTestCase.is_module_installed("pydruid"), "pydruid not installed"
     )
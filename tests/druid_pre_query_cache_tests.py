@@ -0,0 +1,133 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+# isort:skip_file
+"""Unit tests for the Druid phase one query cache"""
+import threading
+from unittest.mock import Mock
+
+import pandas as pd
+
+import tests.test_app
+from superset import cache
+from superset.connectors.druid.pre_query_cache import (
+    get_pre_query_cache_key,
+    PreQueryCache,
+)
+from superset.utils.cache_serializers import PickleCacheSerializer
+
+from .base_tests import SupersetTestCase
+
+QUERY = {"queryType": "topN", "dataSource": "ds", "dimension": "dim1"}
+
+
+class DruidPreQueryCacheTestCase(SupersetTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_cache_key(self):
+        key = get_pre_query_cache_key("http://a:8082/druid/v2", QUERY)
+        self.assertEqual(
+            key,
+            get_pre_query_cache_key(
+                "http://a:8082/druid/v2", dict(reversed(QUERY.items()))
+            ),
+        )
+        self.assertNotEqual(
+            key, get_pre_query_cache_key("http://b:8082/druid/v2", QUERY)
+        )
+        self.assertNotEqual(
+            key,
+            get_pre_query_cache_key(
+                "http://a:8082/druid/v2", {**QUERY, "threshold": 5}
+            ),
+        )
+
+    def test_results_are_cached(self):
+        pre_query_cache = PreQueryCache()
+        df = pd.DataFrame({"dim1": ["Canada", "USA"]})
+        run = Mock(return_value=df)
+        stats_logger = Mock()
+        for _ in range(3):
+            result = pre_query_cache.get_or_run(
+                "key", run, cache, PickleCacheSerializer(), 60, stats_logger
+            )
+            pd.testing.assert_frame_equal(df, result)
+        self.assertEqual(1, run.call_count)
+        stats_logger.incr.assert_any_call("druid_pre_query_cache_miss")
+        stats_logger.incr.assert_any_call("druid_pre_query_cache_hit")
+
+    def test_without_cache(self):
+        pre_query_cache = PreQueryCache()
+        run = Mock(return_value=pd.DataFrame())
+        pre_query_cache.get_or_run("key", run, None, PickleCacheSerializer(), 60)
+        pre_query_cache.get_or_run("key", run, None, PickleCacheSerializer(), 60)
+        self.assertEqual(2, run.call_count)
+
+    def test_concurrent_queries_are_coalesced(self):
+        pre_query_cache = PreQueryCache()
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+
+        def run():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return pd.DataFrame({"dim1": ["Canada"]})
+
+        results = []
+        coalesced = threading.Semaphore(0)
+        stats_logger = Mock()
+        stats_logger.incr.side_effect = (
+            lambda key: coalesced.release()
+            if key == "druid_pre_query_coalesced"
+            else None
+        )
+
+        def query():
+            results.append(
+                pre_query_cache.get_or_run(
+                    "key", run, None, PickleCacheSerializer(), 60, stats_logger
+                )
+            )
+
+        owner = threading.Thread(target=query)
+        owner.start()
+        started.wait(5)
+        waiters = [threading.Thread(target=query) for _ in range(3)]
+        for thread in waiters:
+            thread.start()
+        for _ in waiters:
+            coalesced.acquire(timeout=5)
+        release.set()
+        for thread in [owner] + waiters:
+            thread.join(5)
+
+        self.assertEqual(1, len(calls))
+        self.assertEqual(4, len(results))
+
+    def test_errors_are_not_cached(self):
+        pre_query_cache = PreQueryCache()
+        run = Mock(side_effect=IOError("broker is down"))
+        with self.assertRaises(IOError):
+            pre_query_cache.get_or_run("key", run, cache, PickleCacheSerializer(), 60)
+        run = Mock(return_value=pd.DataFrame())
+        pre_query_cache.get_or_run("key", run, cache, PickleCacheSerializer(), 60)
+        self.assertEqual(1, run.call_count)
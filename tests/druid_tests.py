@@ -99,7 +99,7 @@ GB_RESULT_SET = [
     },
 ]
 
-DruidCluster.get_druid_version = lambda _: "0.9.1"  # type: ignore
+DruidCluster.get_druid_version_fetcher = lambda _: lambda: "0.9.1"  # type: ignore
 
 
 class DruidTests(SupersetTestCase):
@@ -148,7 +148,7 @@ class DruidTests(SupersetTestCase):
     @unittest.skipUnless(
         SupersetTestCase.is_module_installed("pydruid"), "pydruid not installed"
     )
-    @patch("superset.connectors.druid.models.PyDruid")
+    @patch("superset.connectors.druid.models.PooledPyDruid")
     def test_client(self, PyDruid):
         self.login(username="admin")
         cluster = self.get_cluster(PyDruid)
@@ -342,7 +342,7 @@ class DruidTests(SupersetTestCase):
     @unittest.skipUnless(
         SupersetTestCase.is_module_installed("pydruid"), "pydruid not installed"
     )
-    @patch("superset.connectors.druid.models.PyDruid")
+    @patch("superset.connectors.druid.models.PooledPyDruid")
     def test_sync_druid_perm(self, PyDruid):
         self.login(username="admin")
         instance = PyDruid.return_value
@@ -393,7 +393,7 @@ class DruidTests(SupersetTestCase):
     @unittest.skipUnless(
         SupersetTestCase.is_module_installed("pydruid"), "pydruid not installed"
     )
-    @patch("superset.connectors.druid.models.PyDruid")
+    @patch("superset.connectors.druid.models.PooledPyDruid")
     def test_refresh_metadata(self, PyDruid):
         self.login(username="admin")
         cluster = self.get_cluster(PyDruid)
@@ -423,7 +423,7 @@ class DruidTests(SupersetTestCase):
     @unittest.skipUnless(
         SupersetTestCase.is_module_installed("pydruid"), "pydruid not installed"
     )
-    @patch("superset.connectors.druid.models.PyDruid")
+    @patch("superset.connectors.druid.models.PooledPyDruid")
     def test_refresh_metadata_augment_type(self, PyDruid):
         self.login(username="admin")
         cluster = self.get_cluster(PyDruid)
@@ -458,7 +458,7 @@ class DruidTests(SupersetTestCase):
     @unittest.skipUnless(
         SupersetTestCase.is_module_installed("pydruid"), "pydruid not installed"
     )
-    @patch("superset.connectors.druid.models.PyDruid")
+    @patch("superset.connectors.druid.models.PooledPyDruid")
     def test_refresh_metadata_augment_verbose_name(self, PyDruid):
         self.login(username="admin")
         cluster = self.get_cluster(PyDruid)
@@ -511,7 +511,7 @@ class DruidTests(SupersetTestCase):
     @unittest.skipUnless(
         SupersetTestCase.is_module_installed("pydruid"), "pydruid not installed"
     )
-    @patch("superset.connectors.druid.models.PyDruid")
+    @patch("superset.connectors.druid.models.PooledPyDruid")
     def test_druid_time_granularities(self, PyDruid):
         self.login(username="admin")
         cluster = self.get_cluster(PyDruid)
@@ -572,7 +572,7 @@ class DruidTests(SupersetTestCase):
     @unittest.skipUnless(
         SupersetTestCase.is_module_installed("pydruid"), "pydruid not installed"
     )
-    @patch("superset.connectors.druid.models.PyDruid")
+    @patch("superset.connectors.druid.models.PooledPyDruid")
     def test_external_metadata(self, PyDruid):
         self.login(username="admin")
         self.login(username="admin")
@@ -0,0 +1,95 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+"""Unit tests for the Druid broker version cache"""
+import threading
+from unittest import TestCase
+from unittest.mock import Mock
+
+from superset.connectors.druid.version_cache import DruidVersionCache, get_capabilities
+
+
+class DruidVersionCacheTestCase(TestCase):
+    def test_get_capabilities(self):
+        self.assertEqual(
+            get_capabilities("0.8.1"),
+            {"realtime_segment_metadata": False, "float_aggregators": False},
+        )
+        self.assertEqual(
+            get_capabilities("0.9.1"),
+            {"realtime_segment_metadata": True, "float_aggregators": False},
+        )
+        self.assertEqual(
+            get_capabilities("0.16.0-incubating"),
+            {"realtime_segment_metadata": True, "float_aggregators": True},
+        )
+
+    def test_hit_and_miss(self):
+        cache = DruidVersionCache()
+        fetch = Mock(return_value="0.9.1")
+        stats_logger = Mock()
+        key = (1, "http://localhost:8082", None)
+
+        self.assertEqual(cache.get(key, fetch, 60, stats_logger).version, "0.9.1")
+        self.assertEqual(cache.get(key, fetch, 60, stats_logger).version, "0.9.1")
+        self.assertEqual(fetch.call_count, 1)
+        stats_logger.incr.assert_any_call("druid_version_cache_miss")
+        stats_logger.incr.assert_any_call("druid_version_cache_hit")
+
+    def test_background_refresh(self):
+        cache = DruidVersionCache()
+        key = (1, "http://localhost:8082", None)
+        cache.get(key, Mock(return_value="0.9.1"), 60)
+
+        refreshed = threading.Event()
+
+        def fetch():
+            refreshed.set()
+            return "0.17.0"
+
+        # an expired entry is still served while being refreshed
+        self.assertEqual(cache.get(key, fetch, 0).version, "0.9.1")
+        self.assertTrue(refreshed.wait(5))
+        for thread in threading.enumerate():
+            if thread is not threading.current_thread() and thread.daemon:
+                thread.join(5)
+        self.assertEqual(cache.get(key, Mock(), 60).version, "0.17.0")
+
+    def test_failed_refresh_keeps_entry(self):
+        cache = DruidVersionCache()
+        key = (1, "http://localhost:8082", None)
+        cache.get(key, Mock(return_value="0.9.1"), 60)
+        cache._refresh(key, Mock(side_effect=IOError()))
+        self.assertEqual(cache.get(key, Mock(), 60).version, "0.9.1")
+
+    def test_invalidate(self):
+        cache = DruidVersionCache()
+        cache.get((1, "http://a:8082", None), Mock(return_value="0.9.1"), 60)
+        cache.get((2, "http://b:8082", None), Mock(return_value="0.9.1"), 60)
+        cache.invalidate(1)
+
+        fetch = Mock(return_value="0.17.0")
+        self.assertEqual(
+            cache.get((1, "http://a:8082", None), fetch, 60).version, "0.17.0"
+        )
+        self.assertEqual(
+            cache.get((2, "http://b:8082", None), fetch, 60).version, "0.9.1"
+        )
+        self.assertEqual(fetch.call_count, 1)
+
+        cache.invalidate()
+        cache.get((2, "http://b:8082", None), fetch, 60)
+        self.assertEqual(fetch.call_count, 2)
@@ -0,0 +1,92 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+# isort:skip_file
+"""Unit tests for the pooled SQLAlchemy engines"""
+import sqlite3
+from unittest.mock import Mock
+
+from sqlalchemy import exc
+from sqlalchemy.engine.url import make_url
+
+import tests.test_app
+from superset.utils import engine_registry
+from superset.utils.engine_registry import InstrumentedQueuePool
+
+from .base_tests import SupersetTestCase
+
+
+class EngineRegistryTestCase(SupersetTestCase):
+    def tearDown(self):
+        engine_registry.dispose_engines()
+
+    def test_set_pool_params(self):
+        params = {"pool_size": 20}
+        engine_registry.set_pool_params(
+            make_url("postgresql://user@host/db"), params, {"pool_recycle": 60}
+        )
+        self.assertIs(InstrumentedQueuePool, params["poolclass"])
+        self.assertEqual(20, params["pool_size"])
+        self.assertEqual(60, params["pool_recycle"])
+        self.assertTrue(params["pool_pre_ping"])
+
+        # SQLite files are not pooled by SQLAlchemy
+        params = {}
+        engine_registry.set_pool_params(make_url("sqlite:////tmp/superset.db"), params)
+        self.assertEqual({}, params)
+
+    def test_engines_are_shared(self):
+        url = make_url("sqlite:////tmp/superset.db")
+        engine = engine_registry.get_engine(1, url, {})
+        self.assertIs(engine, engine_registry.get_engine(1, url, {}))
+        self.assertIsNot(engine, engine_registry.get_engine(2, url, {}))
+        self.assertIsNot(
+            engine,
+            engine_registry.get_engine(1, make_url("sqlite:////tmp/other.db"), {}),
+        )
+
+        engine_registry.dispose_engines(1)
+        self.assertIsNot(engine, engine_registry.get_engine(1, url, {}))
+
+    def test_least_recently_used_engines_are_evicted(self):
+        urls = [make_url(f"sqlite:////tmp/superset_{i}.db") for i in range(3)]
+        engines = [
+            engine_registry.get_engine(1, url, {}, max_engines=2) for url in urls
+        ]
+        self.assertIs(engines[2], engine_registry.get_engine(1, urls[2], {}))
+        self.assertIsNot(engines[0], engine_registry.get_engine(1, urls[0], {}))
+
+    def test_pool_metrics(self):
+        stats_logger = Mock()
+        pool = InstrumentedQueuePool(
+            lambda: sqlite3.connect(":memory:"),
+            pool_size=1,
+            max_overflow=0,
+            timeout=0.1,
+            stats_logger=stats_logger,
+        )
+        conn = pool.connect()
+        stats_logger.timing.assert_called_once()
+        self.assertEqual("sqla_pool.checkout", stats_logger.timing.call_args[0][0])
+
+        with self.assertRaises(exc.TimeoutError):
+            pool.connect()
+        stats_logger.incr.assert_any_call("sqla_pool.saturated")
+        stats_logger.incr.assert_any_call("sqla_pool.timeout")
+        conn.close()
+
+        # recreated pools keep reporting
+        self.assertIs(stats_logger, pool.recreate().stats_logger)
@@ -17,9 +17,11 @@
 # isort:skip_file
 import textwrap
 import unittest
+from unittest import mock
 
 import pandas
 from sqlalchemy.engine.url import make_url
+from sqlalchemy.pool import NullPool
 
 import tests.test_app
 from superset import app, db as metadata_db
@@ -107,6 +109,18 @@ class DatabaseModelTestCase(SupersetTestCase):
         user_name = make_url(model.get_sqla_engine(user_name=example_user).url).username
         self.assertNotEqual(example_user, user_name)
 
+    def test_get_sqla_engine_pooled(self):
+        database = get_example_database()
+        engine = database.get_sqla_engine()
+        self.assertIs(engine, database.get_sqla_engine())
+        self.assertIsInstance(database.get_sqla_engine(nullpool=True).pool, NullPool)
+        with mock.patch.dict(app.config, {"SQLALCHEMY_ENGINE_POOLING": False}):
+            self.assertIsInstance(database.get_sqla_engine().pool, NullPool)
+
+        # databases not saved yet are not pooled
+        model = Database(database_name="test_database", sqlalchemy_uri="sqlite://")
+        self.assertIsInstance(model.get_sqla_engine().pool, NullPool)
+
     def test_select_star(self):
         db = get_example_database()
         table_name = "energy_usage"
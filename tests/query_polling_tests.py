@@ -0,0 +1,104 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+# isort:skip_file
+"""Unit tests for the polling of the running SQL Lab queries"""
+import time
+from unittest.mock import Mock
+
+import tests.test_app
+from superset import cache
+from superset.models.sql_lab import Query
+from superset.utils.core import QueryStatus
+from superset.utils.query_polling import get_stop_key, QueryPoller, request_stop
+
+from .base_tests import SupersetTestCase
+
+
+class QueryPollingTestCase(SupersetTestCase):
+    def get_poller(self, query_id=1, **kwargs):
+        query = Query(id=query_id, progress=0)
+        return QueryPoller(query, Mock(), **kwargs)
+
+    def test_progress_is_coalesced(self):
+        with self.get_poller(progress_threshold=5) as poller:
+            for progress in (1, 2, 3, 2):
+                poller.update_progress(progress)
+            poller.session.commit.assert_not_called()
+            self.assertEqual(3, poller.query.progress)
+
+            poller.update_progress(6)
+            self.assertEqual(1, poller.session.commit.call_count)
+            poller.update_progress(7)
+            self.assertEqual(1, poller.session.commit.call_count)
+        # the last progress is written on exit
+        self.assertEqual(2, poller.session.commit.call_count)
+        self.assertEqual(7, poller.query.progress)
+
+    def test_adaptive_interval(self):
+        poller = self.get_poller(min_interval=0.001, max_interval=0.004, backoff=2)
+        intervals = []
+        for _ in range(4):
+            poller.wait()
+            intervals.append(poller.interval)
+        self.assertEqual([0.002, 0.004, 0.004, 0.004], intervals)
+
+        # polls faster again once the query moves
+        poller.update_progress(10)
+        self.assertEqual(0.001, poller.interval)
+
+    def test_stop_request_in_process(self):
+        with self.get_poller(query_id=2, min_interval=10) as poller:
+            self.assertFalse(poller.is_stopped())
+            request_stop(2)
+            self.assertTrue(poller.is_stopped())
+            start = time.monotonic()
+            poller.wait()
+            self.assertLess(time.monotonic() - start, 1)
+        poller.session.query.assert_not_called()
+
+    def test_stop_request_through_cache(self):
+        request_stop(3, cache)
+        try:
+            with self.get_poller(query_id=3, cache=cache) as poller:
+                self.assertTrue(poller.is_stopped())
+            with self.get_poller(query_id=4, cache=cache) as poller:
+                self.assertFalse(poller.is_stopped())
+        finally:
+            cache.delete(get_stop_key(3))
+
+    def test_status_is_read_every_stop_check_interval(self):
+        now = [0.0]
+        poller = self.get_poller(
+            stop_check_interval=10,
+            stop_statuses=(QueryStatus.STOPPED, QueryStatus.TIMED_OUT),
+            clock=lambda: now[0],
+        )
+        get_status = poller.session.query.return_value.filter_by.return_value.scalar
+        get_status.return_value = QueryStatus.RUNNING
+        for now[0] in (1, 5, 9):
+            self.assertFalse(poller.is_stopped())
+        get_status.assert_not_called()
+
+        now[0] = 10
+        self.assertFalse(poller.is_stopped())
+        self.assertEqual(1, get_status.call_count)
+
+        get_status.return_value = QueryStatus.TIMED_OUT
+        now[0] = 15
+        self.assertFalse(poller.is_stopped())
+        now[0] = 20
+        self.assertTrue(poller.is_stopped())
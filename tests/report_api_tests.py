@@ -0,0 +1,136 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+# isort:skip_file
+"""Unit tests for the reports API"""
+import json
+import uuid
+
+import tests.test_app
+from superset import db
+from superset.models.hawkeye_chart import HawkeyeChart
+from superset.models.hawkeye_report import HawkeyeReport
+from superset.models.slice import Slice
+from superset.report_api import ReportAPI
+
+from .base_tests import SupersetTestCase
+
+
+class ReportAPITestCase(SupersetTestCase):
+    def setUp(self):
+        # statuses of these tests only, so that other reports are filtered out
+        self.draft = "draft_{}".format(uuid.uuid4().hex[:8])
+        self.live = "live_{}".format(uuid.uuid4().hex[:8])
+        slc = db.session.query(Slice).first()
+        self.reports = []
+        for i, status in enumerate([self.draft, self.draft, self.draft, self.live]):
+            report = HawkeyeReport(report_name="report_{}".format(i))
+            HawkeyeChart(
+                hawkeye_report=report,
+                slice_id=slc.id,
+                chart_id=str(i),
+                chart_status=status,
+            )
+            db.session.add(report)
+            self.reports.append(report)
+        db.session.commit()
+
+    def tearDown(self):
+        for report in self.reports:
+            if report in db.session:
+                db.session.delete(report)
+        db.session.commit()
+
+    def list_reports(self, status=None, headers=None, **params):
+        params["status"] = status or self.draft
+        return self.client.get(
+            "/reportapi/list_reports", query_string=params, headers=headers
+        )
+
+    def get_names(self, response):
+        self.assertEqual(200, response.status_code)
+        return [report["reportName"] for report in json.loads(response.data)["data"]]
+
+    def test_status_filter(self):
+        self.assertEqual(
+            ["report_0", "report_1", "report_2"], self.get_names(self.list_reports())
+        )
+        self.assertEqual(["report_3"], self.get_names(self.list_reports(self.live)))
+        response = self.list_reports("{},{}".format(self.draft, self.live))
+        self.assertEqual(4, json.loads(response.data)["count"])
+        self.assertEqual([], self.get_names(self.list_reports("unknown")))
+
+    def test_pagination(self):
+        response = self.list_reports(page=0, page_size=2)
+        self.assertEqual(["report_0", "report_1"], self.get_names(response))
+        # the count is the one of all the pages
+        self.assertEqual(3, json.loads(response.data)["count"])
+        response = self.list_reports(page=1, page_size=2)
+        self.assertEqual(["report_2"], self.get_names(response))
+        self.assertEqual([], self.get_names(self.list_reports(page=2, page_size=2)))
+
+    def test_pagination_bounds(self):
+        all_names = ["report_0", "report_1", "report_2"]
+        # negative pages are the first one
+        response = self.list_reports(page=-1, page_size=2)
+        self.assertEqual(["report_0", "report_1"], self.get_names(response))
+        # empty and negative page sizes don't paginate
+        self.assertEqual(all_names, self.get_names(self.list_reports(page_size=0)))
+        response = self.list_reports(page=1, page_size=-2)
+        self.assertEqual(all_names, self.get_names(response))
+        self.assertEqual(all_names, self.get_names(self.list_reports(page=1)))
+
+        max_page_size = ReportAPI.max_page_size
+        ReportAPI.max_page_size = 1
+        try:
+            response = self.list_reports(page=1, page_size=100)
+            self.assertEqual(["report_1"], self.get_names(response))
+        finally:
+            ReportAPI.max_page_size = max_page_size
+
+    def test_etag(self):
+        response = self.list_reports()
+        etag = response.headers["ETag"]
+        response = self.list_reports(headers={"If-None-Match": etag})
+        self.assertEqual(304, response.status_code)
+        # the arguments are part of the ETag
+        response = self.list_reports(page_size=2, headers={"If-None-Match": etag})
+        self.assertEqual(200, response.status_code)
+
+        self.reports[0].report_name = "report_0_edited"
+        db.session.commit()
+        response = self.list_reports(headers={"If-None-Match": etag})
+        self.assertEqual(200, response.status_code)
+        self.assertIn("report_0_edited", self.get_names(response))
+        edited_etag = response.headers["ETag"]
+        self.assertNotEqual(etag, edited_etag)
+
+        # report_1 isn't the latest changed report: deleting it leaves
+        # max(changed_on) as is, only the count moves
+        db.session.delete(self.reports[1])
+        db.session.commit()
+        response = self.list_reports(headers={"If-None-Match": edited_etag})
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(["report_0_edited", "report_2"], self.get_names(response))
+        self.assertNotEqual(edited_etag, response.headers["ETag"])
+
+    def test_etag_changes_on_chart_delete(self):
+        with self.client.application.test_request_context("/reportapi/list_reports"):
+            etag = ReportAPI.get_reports_etag()
+            # a chart deleted without touching its report
+            db.session.delete(self.reports[3].charts[0])
+            db.session.commit()
+            self.assertNotEqual(etag, ReportAPI.get_reports_etag())
@@ -0,0 +1,208 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+# isort:skip_file
+"""Unit tests for the report publishing task"""
+from datetime import datetime, timedelta
+from unittest.mock import Mock, patch
+
+from celery.exceptions import Retry
+
+import tests.test_app
+from superset import app, db
+from superset.models.hawkeye_chart import HawkeyeChart
+from superset.models.hawkeye_report import HawkeyeReport
+from superset.models.slice import Slice
+from superset.tasks import report_publish
+
+from .base_tests import SupersetTestCase
+
+
+class ReportPublishTestCase(SupersetTestCase):
+    def setUp(self):
+        self.slice = Slice(
+            slice_name="report_publish_test",
+            datasource_type="table",
+            datasource_id=1,
+            viz_type="line",
+            params="{}",
+        )
+        db.session.add(self.slice)
+        db.session.flush()
+        self.report = HawkeyeReport(report_name="report_publish_test")
+        HawkeyeChart(
+            hawkeye_report=self.report,
+            slice_id=self.slice.id,
+            chart_id="chart",
+            chart_status="review",
+        )
+        db.session.add(self.report)
+        db.session.commit()
+        self.slice_id = self.slice.id
+
+    def tearDown(self):
+        db.session.rollback()
+        db.session.delete(self.report)
+        db.session.delete(self.slice)
+        db.session.commit()
+
+    def get_chart(self):
+        db.session.expire_all()
+        return db.session.query(HawkeyeChart).filter_by(slice_id=self.slice_id).one()
+
+    @patch("superset.tasks.report_publish.publish_report.apply_async")
+    def start_publish(self, apply_async):
+        publish_id = report_publish.start_publish(self.slice_id, {"query": 1})
+        return publish_id, apply_async
+
+    def run_task(self, report_api, publish_id, **kwargs):
+        retry = Mock(return_value=Retry())
+        with patch("superset.report_api.ReportAPI", return_value=report_api), patch(
+            "superset.tasks.report_publish.publish_report.retry", retry
+        ):
+            report_publish.publish_report(
+                publish_id=publish_id,
+                slice_id=self.slice_id,
+                druid_query={"query": 1},
+                **kwargs
+            )
+        return retry
+
+    def test_start_publish_once(self):
+        publish_id, apply_async = self.start_publish()
+        apply_async.assert_called_once()
+        self.assertEqual(publish_id, apply_async.call_args[1]["task_id"])
+        self.assertEqual(
+            {
+                "publish_id": publish_id,
+                "status": "pending",
+                "step": "analytics",
+                "attempt": 0,
+            },
+            report_publish.get_publish_status(publish_id),
+        )
+
+        # a publication in progress isn't queued twice
+        same_id, apply_async = self.start_publish()
+        self.assertEqual(publish_id, same_id)
+        apply_async.assert_not_called()
+
+        # unless lost
+        chart = self.get_chart()
+        chart.publish_changed_on = datetime.now() - timedelta(
+            seconds=app.config["REPORT_PUBLISH_STATUS_TIMEOUT"] + 1
+        )
+        db.session.commit()
+        new_id, apply_async = self.start_publish()
+        self.assertNotEqual(publish_id, new_id)
+        apply_async.assert_called_once()
+        self.assertIsNone(report_publish.get_publish_status(publish_id))
+        self.assertIsNone(report_publish.get_publish_status("unknown"))
+
+    def test_publish_success(self):
+        publish_id, _ = self.start_publish()
+        report_api = Mock()
+        report_api.publish_report_portal.return_value = "portal_report"
+        self.run_task(report_api, publish_id)
+
+        report_api.publish_job_analytics.assert_called_once()
+        status = report_publish.get_publish_status(publish_id)
+        self.assertEqual("success", status["status"])
+        self.assertEqual("portal_report", status["report_id"])
+        self.assertEqual("live", status["report_status"])
+        chart = self.get_chart()
+        self.assertEqual("live", chart.chart_status)
+        self.assertEqual("portal_report", chart.hawkeye_report.published_report_id)
+        self.assertEqual({"query": 1}, chart.druid_query)
+
+        # a finished publication doesn't prevent the next one
+        new_id, apply_async = self.start_publish()
+        self.assertNotEqual(publish_id, new_id)
+        apply_async.assert_called_once()
+
+    def test_retry_resumes_at_the_failed_step(self):
+        publish_id, _ = self.start_publish()
+        report_api = Mock()
+        report_api.publish_job_analytics.side_effect = IOError("analytics down")
+        with self.assertRaises(Retry):
+            self.run_task(report_api, publish_id)
+        status = report_publish.get_publish_status(publish_id)
+        self.assertEqual(
+            ("retrying", "analytics", 1, "analytics down"),
+            (status["status"], status["step"], status["attempt"], status["error"]),
+        )
+
+        def rename_chart(chart, job_config_future=None):
+            chart.chart_id = "renamed"
+
+        report_api = Mock()
+        report_api.publish_job_analytics.side_effect = rename_chart
+        report_api.publish_report_portal.side_effect = IOError("portal down")
+        retry = Mock(return_value=Retry())
+        with patch("superset.report_api.ReportAPI", return_value=report_api), patch(
+            "superset.tasks.report_publish.publish_report.retry", retry
+        ), self.assertRaises(Retry):
+            report_publish.publish_report(
+                publish_id=publish_id,
+                slice_id=self.slice_id,
+                druid_query={"query": 1},
+                attempt=1,
+            )
+        kwargs = retry.call_args[1]["kwargs"]
+        self.assertEqual(
+            ("portal", 1, "renamed"),
+            (kwargs["step"], kwargs["attempt"], kwargs["chart_id"]),
+        )
+        status = report_publish.get_publish_status(publish_id)
+        self.assertEqual(("retrying", "portal"), (status["status"], status["step"]))
+
+        # the retry skips the analytics step
+        report_api = Mock()
+        report_api.publish_report_portal.return_value = "portal_report"
+        self.run_task(
+            report_api,
+            publish_id,
+            chart_id=kwargs["chart_id"],
+            step=kwargs["step"],
+            attempt=kwargs["attempt"],
+        )
+        report_api.publish_job_analytics.assert_not_called()
+        self.assertEqual(
+            "renamed", report_api.publish_report_portal.call_args[0][0].chart_id
+        )
+        self.assertEqual(
+            "success", report_publish.get_publish_status(publish_id)["status"]
+        )
+
+    def test_publish_failed(self):
+        publish_id, _ = self.start_publish()
+        report_api = Mock()
+        report_api.publish_job_analytics.side_effect = IOError("analytics down")
+        max_retries = app.config["REPORT_PUBLISH_MAX_RETRIES"]
+        retry = self.run_task(report_api, publish_id, attempt=max_retries)
+        retry.assert_not_called()
+        status = report_publish.get_publish_status(publish_id)
+        self.assertEqual(("failed", max_retries), (status["status"], status["attempt"]))
+        self.assertEqual("review", self.get_chart().chart_status)
+
+    def test_superseded_publication_is_skipped(self):
+        publish_id, _ = self.start_publish()
+        report_api = Mock()
+        self.run_task(report_api, "superseded")
+        report_api.publish_job_analytics.assert_not_called()
+        self.assertEqual(
+            "pending", report_publish.get_publish_status(publish_id)["status"]
+        )
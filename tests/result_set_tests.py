@@ -248,3 +248,19 @@ class SupersetResultSetTestCase(SupersetTestCase):
         ]
         results = SupersetResultSet(data, cursor_descr, BaseEngineSpec)
         self.assertEqual(results.columns, [])
+
+    def test_mixed_types_fallback_per_column(self):
+        data = [(1, "a", 1.5), ("b", "c", 2.5)]
+        cursor_descr = [("mixed",), ("text",), ("number",)]
+        results = SupersetResultSet(data, cursor_descr, BaseEngineSpec)
+        self.assertEqual(
+            [col["type"] for col in results.columns], ["STRING", "STRING", "FLOAT"]
+        )
+        df = results.to_pandas_df()
+        self.assertEqual(
+            df_to_records(df),
+            [
+                {"mixed": "1", "text": "a", "number": 1.5},
+                {"mixed": '"b"', "text": "c", "number": 2.5},
+            ],
+        )
@@ -16,19 +16,23 @@
 # under the License.
 # isort:skip_file
 import inspect
+import time
 import unittest
-from unittest.mock import Mock, patch
+from unittest.mock import Mock, patch, PropertyMock
 
 import prison
+import sqlalchemy as sqla
 from flask import g
 
 import tests.test_app
-from superset import app, appbuilder, db, security_manager, viz
+from superset import app, appbuilder, db, security_cache, security_manager, viz
 from superset.connectors.druid.models import DruidCluster, DruidDatasource
 from superset.connectors.sqla.models import RowLevelSecurityFilter, SqlaTable
 from superset.exceptions import SupersetSecurityException
 from superset.models.core import Database
 from superset.models.slice import Slice
+from superset.security.manager import PERMISSIONS_VERSION_KEY, RLS_FILTERS_VERSION_KEY
+from superset.utils.cache_manager import CacheManager
 from superset.utils.core import get_example_database
 
 from .base_tests import SupersetTestCase
@@ -459,6 +463,132 @@ class RolePermissionTests(SupersetTestCase):
         self.assertIsNotNone(vm)
         delete_schema_perm("[examples].[2]")
 
+    def test_permissions_snapshot_query_count(self):
+        g.user = security_manager.find_user(username="gamma")
+        table = (
+            db.session.query(SqlaTable)
+            .filter_by(table_name="wb_health_population")
+            .first()
+        )
+        statements = []
+
+        def count_permission_queries(conn, cursor, statement, *args):
+            if "ab_permission_view_role" in statement:
+                statements.append(statement)
+
+        # start from the metadata database rather than from a warm snapshot
+        security_manager.bump_permissions_version(None, None, None)
+        sqla.event.listen(db.engine, "before_cursor_execute", count_permission_queries)
+        try:
+            for _ in range(30):
+                # what a new request starts with
+                g.pop("security_cache_versions", None)
+                self.assertTrue(security_manager.datasource_access(table))
+                self.assertTrue(
+                    security_manager.can_access("can_dashboard", "Superset")
+                )
+                self.assertFalse(security_manager.all_datasource_access())
+                self.assertIn(
+                    "[examples].[temp_schema]",
+                    security_manager.user_view_menu_names("schema_access"),
+                )
+        finally:
+            sqla.event.remove(
+                db.engine, "before_cursor_execute", count_permission_queries
+            )
+        self.assertEqual(1, len(statements))
+
+    def test_permissions_snapshot_invalidation(self):
+        g.user = security_manager.find_user(username="gamma")
+        self.assertFalse(security_manager.can_access("schema_access", "[examples].[2]"))
+
+        create_schema_perm("[examples].[2]")
+        self.assertTrue(security_manager.can_access("schema_access", "[examples].[2]"))
+        self.assertIn(
+            "[examples].[2]", security_manager.user_view_menu_names("schema_access")
+        )
+
+        delete_schema_perm("[examples].[2]")
+        self.assertFalse(security_manager.can_access("schema_access", "[examples].[2]"))
+
+    def test_permissions_version_bumped_on_commit(self):
+        def get_version():
+            # what a new request starts with
+            g.pop("security_cache_versions", None)
+            return security_manager._get_cache_version(PERMISSIONS_VERSION_KEY)
+
+        version = get_version()
+        role = security_manager.role_model(name="permissions_version_role")
+        db.session.add(role)
+        db.session.flush()
+        self.assertEqual(version, get_version())
+        db.session.commit()
+        version_after_commit = get_version()
+        self.assertNotEqual(version, version_after_commit)
+
+        db.session.delete(role)
+        db.session.flush()
+        self.assertEqual(version_after_commit, get_version())
+        db.session.commit()
+        self.assertNotEqual(version_after_commit, get_version())
+
+    def test_permissions_snapshot_local_timeout(self):
+        roles = security_manager.find_user(username="gamma").roles
+        security_manager.bump_permissions_version(None, None, None)
+        g.pop("security_cache_versions", None)
+        snapshot = security_manager.get_permissions_snapshot(roles)
+        cache_key = "permissions__{}__{}".format(
+            security_manager._get_cache_version(PERMISSIONS_VERSION_KEY),
+            ",".join(str(role_id) for role_id in sorted(role.id for role in roles)),
+        )
+        # e.g. a bump missed by this process
+        security_cache.set(cache_key, [("can_missed", "Bump")])
+        self.assertEqual(snapshot, security_manager.get_permissions_snapshot(roles))
+
+        timeout = app.config["SECURITY_CACHE_LOCAL_TIMEOUT"]
+        with patch(
+            "superset.security.manager.time.monotonic",
+            return_value=time.monotonic() + timeout,
+        ):
+            self.assertEqual(
+                {"can_missed": frozenset(["Bump"])},
+                security_manager.get_permissions_snapshot(roles),
+            )
+        security_manager.bump_permissions_version(None, None, None)
+
+    @patch.object(
+        CacheManager,
+        "security_cache_is_shared",
+        new_callable=PropertyMock,
+        return_value=False,
+    )
+    def test_permissions_snapshot_without_shared_cache(self, _):
+        roles = security_manager.find_user(username="gamma").roles
+        statements = []
+
+        def count_permission_queries(conn, cursor, statement, *args):
+            if "ab_permission_view_role" in statement:
+                statements.append(statement)
+
+        sqla.event.listen(db.engine, "before_cursor_execute", count_permission_queries)
+        try:
+            for _ in range(3):
+                # what a new request starts with
+                g.pop("permissions_snapshots", None)
+                for _ in range(3):
+                    self.assertIn(
+                        "[examples].[temp_schema]",
+                        security_manager.get_permissions_snapshot(roles)[
+                            "schema_access"
+                        ],
+                    )
+        finally:
+            sqla.event.remove(
+                db.engine, "before_cursor_execute", count_permission_queries
+            )
+        # only kept for the request
+        self.assertEqual(3, len(statements))
+
     def test_gamma_user_schema_access_to_dashboards(self):
         self.login(username="gamma")
         data = str(self.client.get("api/v1/dashboard/").data)
@@ -884,3 +1014,98 @@ class RowLevelSecurityTests(SupersetTestCase):
         )
         sql = tbl.get_query_str(query_obj)
         self.assertNotIn("gender = 'male'", sql)
+
+    def test_rls_filters_query_count_per_dashboard_load(self):
+        g.user = self.get_user(username="gamma")
+        tbl = self.get_table_by_name("birth_names")
+        statements = []
+
+        def count_rls_queries(conn, cursor, statement, *args):
+            if "row_level_security_filters" in statement:
+                statements.append(statement)
+
+        sqla.event.listen(db.engine, "before_cursor_execute", count_rls_queries)
+        try:
+            # each chart of a 30 charts dashboard is loaded by its own request,
+            # which computes the cache key and then builds the query
+            for _ in range(30):
+                # what a new request starts with
+                g.pop("rls_filters", None)
+                g.pop("security_cache_versions", None)
+                self.assertEqual(1, len(security_manager.get_rls_ids(tbl)))
+                self.assertEqual(
+                    ["gender = 'male'"],
+                    [f.clause for f in security_manager.get_rls_filters(tbl)],
+                )
+        finally:
+            sqla.event.remove(db.engine, "before_cursor_execute", count_rls_queries)
+        self.assertEqual(1, len(statements))
+
+    @patch.object(
+        CacheManager,
+        "security_cache_is_shared",
+        new_callable=PropertyMock,
+        return_value=False,
+    )
+    def test_rls_filters_without_shared_cache(self, _):
+        g.user = self.get_user(username="gamma")
+        tbl = self.get_table_by_name("birth_names")
+        statements = []
+
+        def count_rls_queries(conn, cursor, statement, *args):
+            if "row_level_security_filters" in statement:
+                statements.append(statement)
+
+        sqla.event.listen(db.engine, "before_cursor_execute", count_rls_queries)
+        try:
+            for _ in range(3):
+                # what a new request starts with
+                g.pop("rls_filters", None)
+                g.pop("security_cache_versions", None)
+                self.assertEqual(1, len(security_manager.get_rls_ids(tbl)))
+                self.assertEqual(
+                    ["gender = 'male'"],
+                    [f.clause for f in security_manager.get_rls_filters(tbl)],
+                )
+        finally:
+            sqla.event.remove(db.engine, "before_cursor_execute", count_rls_queries)
+        # only kept for the request
+        self.assertEqual(3, len(statements))
+
+    def test_rls_filters_cache_invalidation(self):
+        g.user = self.get_user(username="gamma")
+        tbl = self.get_table_by_name("birth_names")
+        self.assertEqual(
+            ["gender = 'male'"],
+            [f.clause for f in security_manager.get_rls_filters(tbl)],
+        )
+
+        self.rls_entry.clause = "gender = 'female'"
+        db.session.commit()
+        self.assertEqual(
+            ["gender = 'female'"],
+            [f.clause for f in security_manager.get_rls_filters(tbl)],
+        )
+
+        self.rls_entry.roles = []
+        db.session.commit()
+        self.assertEqual([], security_manager.get_rls_filters(tbl))
+
+    def test_rls_filters_version_bumped_on_commit(self):
+        def get_version():
+            # what a new request starts with
+            g.pop("security_cache_versions", None)
+            return security_manager._get_cache_version(RLS_FILTERS_VERSION_KEY)
+
+        version = get_version()
+        self.rls_entry.clause = "gender = 'female'"
+        db.session.flush()
+        # the change isn't visible to the other requests until committed
+        self.assertEqual(version, get_version())
+        db.session.rollback()
+        self.assertEqual(version, get_version())
+
+        self.rls_entry.clause = "gender = 'female'"
+        db.session.flush()
+        db.session.commit()
+        self.assertNotEqual(version, get_version())
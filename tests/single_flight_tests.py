@@ -0,0 +1,128 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+# isort:skip_file
+"""Unit tests for the coalescing of the requests computing the same cache key"""
+import threading
+from unittest.mock import Mock
+
+import tests.test_app
+from superset.utils.single_flight import LocalLockStore, SingleFlight
+
+from .base_tests import SupersetTestCase
+
+
+class SingleFlightTestCase(SupersetTestCase):
+    def setUp(self):
+        self.now = 0.0
+        self.values = {}
+        self.lock_store = LocalLockStore(clock=self.clock)
+
+    def clock(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+    def get_single_flight(self, **kwargs):
+        kwargs = {
+            "lock_store": self.lock_store,
+            "wait_timeout": 10,
+            "lock_timeout": 60,
+            "stats_logger": Mock(),
+            "clock": self.clock,
+            "sleep": self.sleep,
+            **kwargs,
+        }
+        return SingleFlight(**kwargs)
+
+    def test_waiters_read_the_leader_value(self):
+        leader = self.get_single_flight()
+        value, lease = leader.get("key", self.values.get)
+        self.assertIsNone(value)
+        self.assertIsNotNone(lease)
+        leader.stats_logger.incr.assert_called_once_with("single_flight.leader")
+
+        def compute(seconds):
+            self.now += seconds
+            if self.now >= 1:
+                self.values["key"] = "value"
+                lease.release()
+
+        waiter = self.get_single_flight(sleep=compute)
+        self.assertEqual(("value", None), waiter.get("key", self.values.get))
+        waiter.stats_logger.incr.assert_called_once_with("single_flight.coalesced")
+        self.assertIsNone(self.lock_store.get("single_flight__key"))
+
+    def test_waiter_takes_over_failed_leader(self):
+        _, lease = self.get_single_flight().get("key", self.values.get)
+
+        def fail(seconds):
+            self.now += seconds
+            lease.release()
+
+        waiter = self.get_single_flight(sleep=fail)
+        value, waiter_lease = waiter.get("key", self.values.get)
+        self.assertIsNone(value)
+        self.assertIsNotNone(waiter_lease)
+        waiter.stats_logger.incr.assert_called_once_with("single_flight.takeover")
+
+    def test_wait_timeout(self):
+        self.get_single_flight().get("key", self.values.get)
+        waiter = self.get_single_flight()
+        self.assertEqual((None, None), waiter.get("key", self.values.get))
+        self.assertGreaterEqual(self.now, 10)
+        waiter.stats_logger.incr.assert_called_once_with("single_flight.timeout")
+
+    def test_lock_expires(self):
+        _, lease = self.get_single_flight().get("key", self.values.get)
+        self.now = 60
+        _, other_lease = self.get_single_flight().get("key", self.values.get)
+        self.assertIsNotNone(other_lease)
+        # the expired lease doesn't release the lock taken over
+        lease.release()
+        self.assertEqual(other_lease.token, self.lock_store.get("single_flight__key"))
+
+    def test_disabled(self):
+        single_flight = self.get_single_flight(wait_timeout=0)
+        self.assertEqual((None, None), single_flight.get("key", self.values.get))
+        self.assertEqual((None, None), single_flight.get("key", self.values.get))
+
+    def test_threads(self):
+        single_flight = SingleFlight(
+            LocalLockStore(), wait_timeout=5, poll_interval=0.01
+        )
+        computed = []
+        results = []
+        barrier = threading.Barrier(8)
+
+        def request():
+            barrier.wait()
+            value, lease = single_flight.get("key", self.values.get)
+            if value is None:
+                computed.append(1)
+                self.values["key"] = "value"
+                lease.release()
+                value = "value"
+            results.append(value)
+
+        threads = [threading.Thread(target=request) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(1, len(computed))
+        self.assertEqual(["value"] * 8, results)
@@ -16,6 +16,7 @@
 # under the License.
 # isort:skip_file
 from typing import Dict
+from unittest.mock import patch
 
 from superset.connectors.sqla.models import SqlaTable, TableColumn
 from superset.db_engine_specs.druid import DruidEngineSpec
@@ -109,3 +110,109 @@ class DatabaseModelTestCase(SupersetTestCase):
         extra_cache_keys = table.get_extra_cache_keys(query_obj)
         self.assertFalse(table.has_calls_to_cache_key_wrapper(query_obj))
         self.assertListEqual(extra_cache_keys, [])
+
+    def test_query_batch(self):
+        query = "SELECT 'a' AS name, 1 AS num UNION ALL SELECT 'b', 2 UNION ALL SELECT 'a', 3"
+        table = SqlaTable(
+            table_name="test_query_batch_table",
+            sql=query,
+            database=get_example_database(),
+        )
+        base_query_obj = {
+            "granularity": None,
+            "from_dttm": None,
+            "to_dttm": None,
+            "is_timeseries": False,
+            "filter": [],
+            "extras": {},
+            "row_limit": 100,
+        }
+        query_objs = [
+            {
+                **base_query_obj,
+                "groupby": ["name"],
+                "metrics": [
+                    {
+                        "expressionType": "SQL",
+                        "sqlExpression": "SUM(num)",
+                        "label": "total",
+                    }
+                ],
+            },
+            {**base_query_obj, "groupby": ["num"], "metrics": []},
+        ]
+        results = table.query_batch(query_objs)
+        self.assertEqual(2, len(results))
+        self.assertEqual(results[0].query, results[1].query)
+        for query_obj, result in zip(query_objs, results):
+            expected = table.query(query_obj).df
+            col = query_obj["groupby"][0]
+            self.assertEqual(list(expected.columns), list(result.df.columns))
+            self.assertEqual(
+                expected.sort_values(col).values.tolist(),
+                result.df.sort_values(col).values.tolist(),
+            )
+
+    def get_batch_table(self, typed: bool) -> SqlaTable:
+        query = (
+            "SELECT 'a' AS name, 1 AS num, 'x' AS tag UNION ALL "
+            "SELECT 'b', 2, 'y' UNION ALL SELECT 'a', 3, 'x'"
+        )
+        table = SqlaTable(
+            table_name="test_query_batch_table",
+            sql=query,
+            database=get_example_database(),
+        )
+        if typed:
+            table.columns = [
+                TableColumn(column_name="name", type="VARCHAR(10)"),
+                TableColumn(column_name="num", type="INTEGER"),
+                TableColumn(column_name="tag", type="VARCHAR(10)"),
+            ]
+        return table
+
+    def get_batch_query_objs(self):
+        return [
+            {
+                "granularity": None,
+                "from_dttm": None,
+                "to_dttm": None,
+                "is_timeseries": False,
+                "filter": [],
+                "extras": {},
+                "row_limit": 100,
+                "groupby": [col],
+                "metrics": [],
+            }
+            for col in ["name", "num", "tag"]
+        ]
+
+    def test_query_batch_typed_nulls(self):
+        table = self.get_batch_table(typed=True)
+        query_objs = self.get_batch_query_objs()
+        expected = [table.query(query_obj).df for query_obj in query_objs]
+
+        with patch.object(SqlaTable, "query") as query:
+            results = table.query_batch(query_objs)
+        # all in a single statement, padded with NULLs of the column types
+        query.assert_not_called()
+        self.assertEqual(1, len({result.query for result in results}))
+        self.assertIn("CAST(NULL AS", results[0].query)
+        for query_obj, expected_df, result in zip(query_objs, expected, results):
+            col = query_obj["groupby"][0]
+            self.assertEqual(
+                expected_df.sort_values(col).values.tolist(),
+                result.df.sort_values(col).values.tolist(),
+            )
+
+    def test_query_batch_untyped_columns(self):
+        table = self.get_batch_table(typed=False)
+        query_objs = self.get_batch_query_objs()
+        results = table.query_batch(query_objs)
+        # the untyped columns of a third branch can't be batched
+        self.assertEqual(results[0].query, results[1].query)
+        self.assertNotEqual(results[0].query, results[2].query)
+        self.assertNotIn("batch_idx", results[2].query)
+        self.assertEqual(
+            [["x"], ["y"]], results[2].df.sort_values("tag").values.tolist()
+        )
@@ -17,17 +17,26 @@
 # isort:skip_file
 """Unit tests for Superset cache warmup"""
 import json
+from datetime import datetime, timedelta
 from unittest.mock import MagicMock
 
 import tests.test_app
-from superset import db
+from superset import cache, db
 from superset.models.core import Log
 from superset.models.tags import get_tag, ObjectTypes, TaggedObject, TagTypes
 from superset.tasks.cache import (
     DashboardTagsStrategy,
+    DemandProfile,
     get_form_data,
+    get_warmup_jobs,
+    parse_chart_request,
+    get_viz_obj,
+    PredictiveStrategy,
+    refresh_chart,
     TopNDashboardsStrategy,
+    warm_up_chart,
 )
+from superset.viz import dump_query_obj, get_refresh_key
 
 from .base_tests import SupersetTestCase
 
@@ -245,3 +254,200 @@ class CacheWarmUpTests(SupersetTestCase):
         result = sorted(strategy.get_urls())
         expected = sorted(tag1_urls + tag2_urls)
         self.assertEqual(result, expected)
+
+    def test_get_payloads(self):
+        dash = self.get_dash_by_slug("births")
+        tag = get_tag("tag_payloads", db.session, TagTypes.custom)
+        self.reset_tag(tag)
+        db.session.add(
+            TaggedObject(
+                tag_id=tag.id, object_id=dash.id, object_type=ObjectTypes.dashboard
+            )
+        )
+        db.session.commit()
+
+        strategy = DashboardTagsStrategy(["tag_payloads"])
+        expected = sorted(
+            [
+                {"chart_id": slc.id, "form_data": {"slice_id": slc.id}}
+                for slc in dash.slices
+            ],
+            key=lambda payload: payload["chart_id"],
+        )
+        result = sorted(
+            strategy.get_payloads(), key=lambda payload: payload["chart_id"]
+        )
+        self.assertEqual(result, expected)
+
+    def test_get_warmup_jobs(self):
+        slc = self.get_slice("Girls", db.session)
+        payload = {"chart_id": slc.id, "form_data": {"slice_id": slc.id}}
+        # the same chart twice is only warmed up once
+        jobs, errors = get_warmup_jobs([payload, payload])
+        self.assertEqual([], errors)
+        database_id = db.session.merge(slc).datasource.database.id
+        self.assertEqual({f"table__{database_id}": [payload]}, dict(jobs))
+
+        dash = self.get_dash_by_slug("births")
+        payloads = [
+            {"chart_id": slc.id, "form_data": {"slice_id": slc.id}}
+            for slc in dash.slices
+        ]
+        jobs, errors = get_warmup_jobs(payloads)
+        self.assertEqual([], errors)
+        chart_ids = [payload["chart_id"] for job in jobs.values() for payload in job]
+        self.assertEqual(len(chart_ids), len(set(chart_ids)))
+        self.assertLessEqual(len(chart_ids), len(payloads))
+
+        jobs, errors = get_warmup_jobs([{"chart_id": 0, "form_data": {"slice_id": 0}}])
+        self.assertEqual({}, dict(jobs))
+        self.assertEqual(0, errors[0]["chart_id"])
+        self.assertFalse(errors[0]["success"])
+
+    def test_warm_up_chart(self):
+        slc = self.get_slice("Girls", db.session)
+        result = warm_up_chart(slc.id, {"slice_id": slc.id})
+        self.assertTrue(result["success"])
+        self.assertEqual(slc.id, result["chart_id"])
+        self.assertIsNotNone(result["cache_key"])
+        self.assertGreater(result["bytes"], 0)
+        self.assertGreaterEqual(result["duration"], 0)
+
+    def test_parse_chart_request(self):
+        extra_filters = [{"col": "gender", "op": "in", "val": ["girl"]}]
+        log_json = json.dumps(
+            {"form_data": json.dumps({"slice_id": 3, "extra_filters": extra_filters})}
+        )
+        self.assertEqual(
+            (3, json.dumps(extra_filters)), parse_chart_request(0, log_json)
+        )
+        self.assertEqual((4, "[]"), parse_chart_request(4, json.dumps({})))
+        self.assertEqual((0, "[]"), parse_chart_request(0, "not json"))
+
+    def test_demand_profile(self):
+        monday_9am = datetime(2020, 3, 2, 9)
+        profile = DemandProfile(weeks=2)
+        for week in range(2):
+            dttm = monday_9am - timedelta(weeks=week)
+            profile.add(dttm, (1, "[]"))
+            profile.add(dttm, (1, "[]"))
+            profile.add(dttm, (2, "[]"))
+        profile.add(monday_9am, (3, "[]"))
+        profile.add(monday_9am + timedelta(hours=1), (4, "[]"))
+
+        self.assertEqual(
+            [((1, "[]"), 2.0), ((2, "[]"), 1.0)],
+            profile.predict(monday_9am + timedelta(weeks=1, minutes=30), top_n=5),
+        )
+        self.assertEqual([((1, "[]"), 2.0)], profile.predict(monday_9am, top_n=1))
+        self.assertEqual(
+            [((1, "[]"), 2.0), ((2, "[]"), 1.0), ((3, "[]"), 0.5)],
+            profile.predict(monday_9am, top_n=5, min_hits=0.5),
+        )
+
+    def test_predictive_strategy(self):
+        slc = self.get_slice("Girls", db.session)
+        extra_filters = [{"col": "gender", "op": "in", "val": ["girl"]}]
+        strategy = PredictiveStrategy(top_n=10, since="21 days ago", min_hits=0.5)
+        logs = [
+            Log(
+                action="explore_json",
+                slice_id=slice_id,
+                json=json.dumps(
+                    {
+                        "form_data": json.dumps(
+                            {"slice_id": slice_id, "extra_filters": extra_filters}
+                        )
+                    }
+                ),
+                dttm=strategy.peak - timedelta(weeks=week, minutes=-5),
+            )
+            for week in (1, 2)
+            # a deleted chart
+            for slice_id in (slc.id, 0xDEAD)
+        ]
+        db.session.add_all(logs)
+        db.session.commit()
+        try:
+            payloads = strategy.get_payloads()
+        finally:
+            for log in logs:
+                db.session.delete(log)
+            db.session.commit()
+
+        self.assertIn(
+            {
+                "chart_id": slc.id,
+                "form_data": {"slice_id": slc.id, "extra_filters": extra_filters},
+            },
+            payloads,
+        )
+        self.assertNotIn(0xDEAD, [payload["chart_id"] for payload in payloads])
+        self.assertEqual(strategy.peak + timedelta(hours=1), strategy.fresh_until)
+
+    def test_get_warmup_jobs_skips_fresh(self):
+        slc = self.get_slice("Girls", db.session)
+        payload = {"chart_id": slc.id, "form_data": {"slice_id": slc.id}}
+        self.assertTrue(warm_up_chart(slc.id, payload["form_data"])["success"])
+
+        jobs, errors = get_warmup_jobs([payload], fresh_until=datetime.utcnow())
+        self.assertEqual(({}, []), (dict(jobs), errors))
+
+        cache_timeout = db.session.merge(slc).viz.cache_timeout
+        fresh_until = datetime.utcnow() + timedelta(seconds=cache_timeout + 60)
+        jobs, errors = get_warmup_jobs([payload], fresh_until=fresh_until)
+        self.assertEqual(
+            [payload], [payload for job in jobs.values() for payload in job]
+        )
+
+    def refresh_chart(self, viz_obj, cache_key, query_obj, **extra):
+        refresh_chart(
+            viz_obj.datasource.type,
+            viz_obj.datasource.id,
+            viz_obj.form_data,
+            cache_key,
+            json.loads(json.dumps(dump_query_obj(query_obj))),
+            extra,
+        )
+
+    def test_refresh_chart(self):
+        slc = self.get_slice("Girls", db.session)
+        viz_obj = get_viz_obj({"slice_id": slc.id})
+        query_obj = viz_obj.query_obj()
+        query_obj["from_dttm"] = datetime(1900, 1, 1)
+        query_obj["to_dttm"] = datetime(2100, 1, 1, 12, 30, 15, 10)
+        cache_key = viz_obj.cache_key(query_obj)
+        cache.delete(cache_key)
+        cache.set(get_refresh_key(cache_key), True)
+
+        self.refresh_chart(viz_obj, cache_key, query_obj)
+        self.assertIsNotNone(cache.get(cache_key))
+        self.assertIsNone(cache.get(get_refresh_key(cache_key)))
+        cache.delete(cache_key)
+
+    def test_refresh_chart_cache_key_extra(self):
+        slc = self.get_slice("Girls", db.session)
+        viz_obj = get_viz_obj({"slice_id": slc.id})
+        # e.g. the query of a time comparison
+        query_obj = viz_obj.query_obj()
+        cache_key = viz_obj.cache_key(query_obj, time_compare="1 year ago")
+        cache.delete(cache_key)
+        cache.set(get_refresh_key(cache_key), True)
+
+        self.refresh_chart(viz_obj, cache_key, query_obj, time_compare="1 year ago")
+        self.assertIsNotNone(cache.get(cache_key))
+        self.assertIsNone(cache.get(get_refresh_key(cache_key)))
+        cache.delete(cache_key)
+
+    def test_refresh_chart_drops_other_keys(self):
+        slc = self.get_slice("Girls", db.session)
+        viz_obj = get_viz_obj({"slice_id": slc.id})
+        query_obj = viz_obj.query_obj()
+        # e.g. the key of data cached before the datasource changed
+        cache_key = "other_{}".format(viz_obj.cache_key(query_obj))
+        cache.set(cache_key, "stale")
+        cache.set(get_refresh_key(cache_key), True)
+
+        self.refresh_chart(viz_obj, cache_key, query_obj)
+        self.assertIsNone(cache.get(cache_key))
+        self.assertIsNone(cache.get(get_refresh_key(cache_key)))
@@ -46,6 +46,12 @@ AUTH_ROLE_PUBLIC = "Public"
 EMAIL_NOTIFICATIONS = False
 
 CACHE_CONFIG = {"CACHE_TYPE": "simple"}
+# the permissions and filters are only cached across requests by shared backends
+SECURITY_CACHE_CONFIG = {
+    "CACHE_TYPE": "redis",
+    "CACHE_REDIS_URL": "redis://localhost",
+    "CACHE_KEY_PREFIX": "superset_tests_security_",
+}
 
 
 class CeleryConfig(object):
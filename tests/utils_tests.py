@@ -19,12 +19,15 @@ import unittest
 import uuid
 from datetime import date, datetime, time, timedelta
 from decimal import Decimal
+import gzip
 import hashlib
 import os
+import threading
 from unittest.mock import Mock, patch
 
 import numpy
-from flask import Flask
+import pandas as pd
+from flask import Flask, g
 from flask_caching import Cache
 from sqlalchemy.exc import ArgumentError
 
@@ -32,6 +35,7 @@ import tests.test_app
 from superset import app, db, security_manager
 from superset.exceptions import CertificateException, SupersetException
 from superset.models.core import Database
+from superset.utils import csv
 from superset.utils.cache_manager import CacheManager
 from superset.utils.core import (
     base_json_conv,
@@ -48,6 +52,7 @@ from superset.utils.core import (
     JSONEncodedDict,
     memoized,
     merge_extra_filters,
+    merge_into_current_session,
     merge_request_params,
     parse_ssl_cert,
     parse_human_timedelta,
@@ -56,6 +61,7 @@ from superset.utils.core import (
     split,
     TimeRangeEndpoint,
     validate_json,
+    with_current_context,
     zlib_compress,
     zlib_decompress,
 )
@@ -1238,3 +1244,52 @@ class UtilsTestCase(SupersetTestCase):
         expected_filename = hashlib.md5(ssl_certificate.encode("utf-8")).hexdigest()
         self.assertIn(expected_filename, path)
         self.assertTrue(os.path.exists(path))
+
+    def test_csv_chunks(self):
+        df = pd.DataFrame({"a": range(25), "b": ["x"] * 25})
+        chunks = list(csv.split_df(df, 10))
+        self.assertEqual([10, 10, 5], [len(chunk.index) for chunk in chunks])
+        rendered = list(csv.df_chunks_to_csv(chunks, index=False, encoding="utf-8"))
+        self.assertEqual(df.to_csv(index=False), "".join(rendered))
+
+        records = list(df.itertuples(index=False, name=None))
+        rendered = csv.df_chunks_to_csv(
+            csv.split_records(records, ["a", "b"], 7), index=False
+        )
+        self.assertEqual(df.to_csv(index=False), "".join(rendered))
+
+        empty = list(csv.split_df(df.iloc[:0], 10))
+        self.assertEqual(1, len(empty))
+        self.assertEqual("a,b\n", "".join(csv.df_chunks_to_csv(empty, index=False)))
+
+        parts = csv.df_chunks_to_csv(csv.split_df(df, 10), index=False)
+        encoded = b"".join(csv.encode_csv(parts, gzip=True))
+        self.assertEqual(df.to_csv(index=False), gzip.decompress(encoded).decode())
+
+    def test_with_current_context_merges_the_user(self):
+        database = get_or_create_db("test_merge", "sqlite:///superset.db")
+        user = security_manager.find_user("admin")
+        results = []
+
+        def run():
+            results.append((g.user, db.session(), merge_into_current_session(database)))
+
+        with app.test_request_context():
+            g.user = user
+            thread = threading.Thread(target=with_current_context(run))
+            thread.start()
+            thread.join()
+            request_session = db.session()
+
+        merged_user, session, merged_database = results[0]
+        self.assertIsNot(request_session, session)
+        self.assertIsNot(user, merged_user)
+        self.assertEqual(user.id, merged_user.id)
+        self.assertIsNot(database, merged_database)
+        self.assertEqual(database.id, merged_database.id)
+        self.assertIn(database, request_session)
+
+        obj = object()
+        self.assertIs(obj, merge_into_current_session(obj))
+        db.session.delete(database)
+        db.session.commit()
@@ -15,21 +15,27 @@
 # specific language governing permissions and limitations
 # under the License.
 # isort:skip_file
+import copy
+import json
+import threading
 import uuid
-from datetime import datetime
+from datetime import datetime, timedelta
 import logging
 from math import nan
 from unittest.mock import Mock, patch
 
 import numpy as np
 import pandas as pd
+from dateutil import tz
 
 import tests.test_app
 import superset.viz as viz
-from superset import app
+from superset import app, cache
+from superset.connectors.druid.models import DruidDatasource
 from superset.constants import NULL_STRING
 from superset.exceptions import SpatialException
-from superset.utils.core import DTTM_ALIAS
+from superset.models.helpers import QueryResult
+from superset.utils.core import DTTM_ALIAS, TimeRangeEndpoint
 
 from .base_tests import SupersetTestCase
 from .utils import load_fixture
@@ -165,6 +171,181 @@ class BaseVizTestCase(SupersetTestCase):
         test_viz = viz.BaseViz(datasource, form_data={})
         self.assertEqual(app.config["CACHE_DEFAULT_TIMEOUT"], test_viz.cache_timeout)
 
+    def test_get_df_payload_single_flight(self):
+        datasource = self.get_datasource_mock()
+        datasource.cache_timeout = 60
+        cache_key = "single_flight_{}".format(uuid.uuid4())
+        started, finish = threading.Event(), threading.Event()
+
+        def get_df(query_obj):
+            started.set()
+            finish.wait(5)
+            return pd.DataFrame({"a": [1]})
+
+        with patch.object(
+            viz.BaseViz, "cache_key", return_value=cache_key
+        ), patch.object(viz.BaseViz, "get_df", side_effect=get_df) as get_df_mock:
+            leader = viz.BaseViz(datasource, form_data={})
+            thread = threading.Thread(
+                target=leader.get_df_payload, args=({"metrics": []},)
+            )
+            thread.start()
+            started.wait(5)
+            threading.Timer(0.2, finish.set).start()
+            # waits for the leader to cache the frame instead of querying it
+            payload = viz.BaseViz(datasource, form_data={}).get_df_payload(
+                {"metrics": []}
+            )
+            thread.join()
+        cache.delete(cache_key)
+
+        self.assertEqual(1, get_df_mock.call_count)
+        self.assertEqual([1], payload["df"]["a"].tolist())
+
+    def test_max_staleness(self):
+        datasource = self.get_datasource_mock()
+        datasource.params = None
+        datasource.database.extra = None
+        self.assertEqual(0, viz.BaseViz(datasource, form_data={}).max_staleness)
+
+        datasource.database.extra = json.dumps({"stale_while_revalidate": 600})
+        self.assertEqual(600, viz.BaseViz(datasource, form_data={}).max_staleness)
+
+        datasource.params = json.dumps({"stale_while_revalidate": 0})
+        self.assertEqual(0, viz.BaseViz(datasource, form_data={}).max_staleness)
+
+    @patch("superset.tasks.cache.refresh_chart")
+    def test_get_df_payload_stale_while_revalidate(self, refresh_chart):
+        datasource = self.get_datasource_mock()
+        datasource.cache_timeout = 60
+        datasource.params = json.dumps({"stale_while_revalidate": 600})
+        cache_key = "stale_{}".format(uuid.uuid4())
+
+        def set_cache(age, value):
+            cached_dttm = datetime.utcnow() - timedelta(seconds=age)
+            cache_value = {
+                "dttm": cached_dttm.isoformat().split(".")[0],
+                "df": pd.DataFrame({"a": [value]}),
+                "query": "SELECT {}".format(value),
+            }
+            cache.set(cache_key, viz.cache_serializer.dumps(cache_value))
+
+        with patch.object(
+            viz.BaseViz, "cache_key", return_value=cache_key
+        ), patch.object(
+            viz.BaseViz, "can_refresh_in_background", return_value=True
+        ), patch.object(
+            viz.BaseViz, "get_df", return_value=pd.DataFrame({"a": [3]})
+        ) as get_df:
+            set_cache(age=30, value=1)
+            payload = viz.BaseViz(datasource, form_data={}).get_df_payload({"a": 1})
+            self.assertFalse(payload["is_stale"])
+            self.assertEqual([1], payload["df"]["a"].tolist())
+
+            # served stale while refreshed, once at a time
+            set_cache(age=120, value=2)
+            for _ in range(2):
+                payload = viz.BaseViz(datasource, form_data={}).get_df_payload({"a": 1})
+                self.assertTrue(payload["is_stale"])
+                self.assertEqual([2], payload["df"]["a"].tolist())
+            get_df.assert_not_called()
+            refresh_chart.delay.assert_called_once()
+            self.assertEqual(
+                (cache_key, {"a": 1}, {}), refresh_chart.delay.call_args[0][3:]
+            )
+
+            # past the maximum staleness
+            set_cache(age=1000, value=2)
+            payload = viz.BaseViz(datasource, form_data={}).get_df_payload({"a": 1})
+            self.assertFalse(payload["is_stale"])
+            self.assertEqual([3], payload["df"]["a"].tolist())
+
+            # without stale_while_revalidate, the age is left to the cache
+            datasource.params = json.dumps({"stale_while_revalidate": 0})
+            set_cache(age=1000, value=4)
+            payload = viz.BaseViz(datasource, form_data={}).get_df_payload({"a": 1})
+            self.assertFalse(payload["is_stale"])
+            self.assertEqual([4], payload["df"]["a"].tolist())
+            get_df.assert_called_once()
+        cache.delete(cache_key)
+        cache.delete(viz.get_refresh_key(cache_key))
+
+    @patch("superset.tasks.cache.refresh_chart")
+    def test_get_df_payload_stale_without_refresh(self, refresh_chart):
+        datasource = self.get_datasource_mock()
+        datasource.cache_timeout = 60
+        datasource.params = json.dumps({"stale_while_revalidate": 600})
+        cache_key = "stale_{}".format(uuid.uuid4())
+        cache_value = {
+            "dttm": (datetime.utcnow() - timedelta(seconds=120))
+            .isoformat()
+            .split(".")[0],
+            "df": pd.DataFrame({"a": [1]}),
+            "query": "SELECT 1",
+        }
+        cache.set(cache_key, viz.cache_serializer.dumps(cache_value))
+
+        # e.g. cached for a user with row level security filters
+        with patch.object(
+            viz.BaseViz, "cache_key", return_value=cache_key
+        ), patch.object(
+            viz.BaseViz, "can_refresh_in_background", return_value=False
+        ), patch.object(
+            viz.BaseViz, "get_df", return_value=pd.DataFrame({"a": [2]})
+        ):
+            payload = viz.BaseViz(datasource, form_data={}).get_df_payload(
+                {"a": 1}, time_compare="1 year ago"
+            )
+        cache.delete(cache_key)
+        self.assertFalse(payload["is_stale"])
+        self.assertEqual([2], payload["df"]["a"].tolist())
+        refresh_chart.delay.assert_not_called()
+
+    def test_can_refresh_in_background(self):
+        datasource = self.get_datasource_mock()
+        datasource.get_extra_cache_keys.return_value = []
+        test_viz = viz.BaseViz(datasource, form_data={})
+        with patch("superset.viz.security_manager") as security_manager:
+            security_manager.get_rls_ids.return_value = []
+            self.assertTrue(test_viz.can_refresh_in_background({}))
+            security_manager.get_rls_ids.return_value = [1]
+            self.assertFalse(test_viz.can_refresh_in_background({}))
+            security_manager.get_rls_ids.return_value = []
+            datasource.get_extra_cache_keys.return_value = ["admin"]
+            self.assertFalse(test_viz.can_refresh_in_background({}))
+
+    def test_dump_query_obj(self):
+        query_obj = {
+            "from_dttm": datetime(2020, 1, 1),
+            "to_dttm": datetime(2020, 1, 2, 3, 4, 5, 6),
+            "inner_from_dttm": None,
+            "groupby": ["a"],
+        }
+        dumped = json.loads(json.dumps(viz.dump_query_obj(query_obj)))
+        self.assertEqual(query_obj, viz.load_query_obj(dumped))
+
+    def test_get_df_payload_caches_the_end_of_the_query(self):
+        datasource = self.get_datasource_mock()
+        datasource.cache_timeout = 60
+        cache_key = "dttm_{}".format(uuid.uuid4())
+        started = datetime.utcnow().replace(microsecond=0)
+        now = [started]
+
+        def get_df(query_obj):
+            now[0] = started + timedelta(seconds=5)
+            return pd.DataFrame({"a": [1]})
+
+        with patch.object(
+            viz.BaseViz, "cache_key", return_value=cache_key
+        ), patch.object(viz.BaseViz, "get_df", side_effect=get_df), patch(
+            "superset.viz.datetime"
+        ) as dttm:
+            dttm.utcnow.side_effect = lambda: now[0]
+            viz.BaseViz(datasource, form_data={}).get_df_payload({"a": 1})
+        cache_value = viz.cache_serializer.loads(cache.get(cache_key))
+        cache.delete(cache_key)
+        self.assertEqual(now[0].isoformat(), cache_value["dttm"])
+
 
 class TableVizTestCase(SupersetTestCase):
     def test_get_data_applies_percentage(self):
@@ -1248,6 +1429,105 @@ class TimeSeriesVizTestCase(SupersetTestCase):
             [1.0, 1.5, 2.0, 2.5],
         )
 
+    @patch("superset.viz.NVD3TimeSeriesViz.get_df_payload")
+    @patch("superset.viz.NVD3TimeSeriesViz.query_obj")
+    def test_run_extra_queries_time_compare(self, query_obj, get_df_payload):
+        datasource = self.get_datasource_mock()
+        query_obj.return_value = {
+            "from_dttm": datetime(2019, 1, 8),
+            "to_dttm": datetime(2019, 1, 15),
+        }
+
+        def df_payload(query_object, time_compare):
+            return {
+                "df": pd.DataFrame(
+                    {
+                        DTTM_ALIAS: [query_object["from_dttm"]],
+                        "y": [float(len(time_compare))],
+                    }
+                )
+            }
+
+        get_df_payload.side_effect = df_payload
+        test_viz = viz.NVD3TimeSeriesViz(
+            datasource,
+            {"metrics": ["y"], "time_compare": ["1 week ago", "2 weeks ago"]},
+        )
+        test_viz.run_extra_queries()
+
+        self.assertEqual(1, query_obj.call_count)
+        self.assertEqual(2, get_df_payload.call_count)
+        labels = [label for label, _ in test_viz._extra_chart_data]
+        self.assertEqual(["1 week ago offset", "2 weeks ago offset"], labels)
+        for _, df in test_viz._extra_chart_data:
+            self.assertEqual([datetime(2019, 1, 8)], df.index.tolist())
+        query_objects = sorted(
+            (call[0][0] for call in get_df_payload.call_args_list),
+            key=lambda query_object: query_object["from_dttm"],
+        )
+        self.assertEqual(datetime(2018, 12, 25), query_objects[0]["from_dttm"])
+        self.assertEqual(datetime(2019, 1, 1), query_objects[1]["from_dttm"])
+        for query_object in query_objects:
+            self.assertEqual(datetime(2019, 1, 8), query_object["inner_from_dttm"])
+
+
+class FilterBoxVizTestCase(SupersetTestCase):
+    form_data = {
+        "filter_configs": [
+            {"column": "name", "metric": "sum__num"},
+            {"column": "state"},
+        ]
+    }
+
+    def query_result(self, query_obj):
+        col = query_obj["groupby"][0]
+        return QueryResult(
+            df=pd.DataFrame({col: ["{}_1".format(col), "{}_2".format(col)]}),
+            query="SELECT {}".format(col),
+            duration=0,
+        )
+
+    @patch("superset.viz.FilterBoxViz.cache_key", return_value="key")
+    @patch("superset.viz.cache", None)
+    def test_batched_queries(self, cache_key):
+        datasource = self.get_datasource_mock()
+        datasource.supports_query_batch = True
+        datasource.query_batch = Mock(
+            side_effect=lambda query_objs: [self.query_result(q) for q in query_objs]
+        )
+        test_viz = viz.FilterBoxViz(datasource, self.form_data)
+        test_viz.run_extra_queries()
+
+        datasource.query_batch.assert_called_once()
+        datasource.query.assert_not_called()
+        query_objs = datasource.query_batch.call_args[0][0]
+        self.assertEqual([["name"], ["state"]], [q["groupby"] for q in query_objs])
+        self.assertEqual([["sum__num"], []], [q["metrics"] for q in query_objs])
+        self.assertEqual(
+            ["state_1", "state_2"], test_viz.dataframes["state"]["state"].tolist()
+        )
+
+    @patch("superset.viz.FilterBoxViz.cache_key", return_value="key")
+    @patch("superset.viz.cache", None)
+    def test_concurrent_queries(self, cache_key):
+        datasource = self.get_datasource_mock()
+        datasource.supports_query_batch = False
+        datasource.query = Mock(side_effect=self.query_result)
+        test_viz = viz.FilterBoxViz(datasource, self.form_data)
+        test_viz.run_extra_queries()
+
+        self.assertEqual(2, datasource.query.call_count)
+        self.assertEqual(["name", "state"], list(test_viz.dataframes.keys()))
+        for col, df in test_viz.dataframes.items():
+            self.assertEqual(["{}_1".format(col), "{}_2".format(col)], df[col].tolist())
+
+    def test_batched_results_are_not_shared(self):
+        datasource = self.get_datasource_mock()
+        test_viz = viz.FilterBoxViz(datasource, self.form_data)
+        test_viz._batched_results["name"] = self.query_result({"groupby": ["name"]})
+        other_viz = viz.FilterBoxViz(datasource, self.form_data)
+        self.assertEqual({}, other_viz._batched_results)
+
 
 class BigNumberVizTestCase(SupersetTestCase):
     def test_get_data(self):
@@ -1275,3 +1555,216 @@ class BigNumberVizTestCase(SupersetTestCase):
         )
         data = viz.BigNumberViz(datasource, {"metrics": ["y"]}).get_data(df)
         assert np.isnan(data[2]["y"])
+
+
+class TimeBucketsTestCase(SupersetTestCase):
+    endpoints = [TimeRangeEndpoint.INCLUSIVE, TimeRangeEndpoint.EXCLUSIVE]
+    periods = {"PT1H": "H", "P1D": "D", "P1M": "M"}
+
+    def setUp(self):
+        self.today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        timestamps = pd.date_range(
+            self.today - timedelta(days=40), self.today, freq="15min"
+        )
+        self.data = pd.DataFrame(
+            {DTTM_ALIAS: timestamps, "sum__y": np.arange(len(timestamps)) % 7}
+        )
+        self.queries = []
+        self.datasource = Mock(
+            type="table",
+            uid="{}__table".format(uuid.uuid4()),
+            offset=0,
+            cache_timeout=60,
+            changed_on=None,
+        )
+        self.datasource.get_column.return_value = None
+        self.datasource.get_extra_cache_keys.return_value = []
+        self.datasource.query.side_effect = self.query
+
+    def query(self, query_obj):
+        from_dttm, to_dttm = query_obj["from_dttm"], query_obj["to_dttm"]
+        self.queries.append((from_dttm, to_dttm))
+        timestamps = self.data[DTTM_ALIAS]
+        df = self.data[(timestamps >= from_dttm) & (timestamps < to_dttm)].copy()
+        grain = query_obj["extras"]["time_grain_sqla"]
+        if grain:
+            periods = df[DTTM_ALIAS].dt.to_period(self.periods[grain])
+            df = df.groupby(periods.dt.start_time)["sum__y"].sum().reset_index()
+        return QueryResult(df, "SELECT '{}', '{}'".format(from_dttm, to_dttm), 0)
+
+    def get_query_obj(self, from_dttm, to_dttm, grain=None, endpoints=None):
+        return {
+            "is_timeseries": True,
+            "granularity": "ds",
+            "from_dttm": from_dttm,
+            "to_dttm": to_dttm,
+            "groupby": [],
+            "metrics": ["sum__y"],
+            "row_limit": 10000,
+            "timeseries_limit": 0,
+            "extras": {
+                "time_grain_sqla": grain,
+                "time_range_endpoints": endpoints or self.endpoints,
+            },
+        }
+
+    def get_df(self, query_obj, time_shift=timedelta(), timeout=3600):
+        viz_obj = viz.NVD3TimeSeriesViz(self.datasource, {"metrics": ["sum__y"]})
+        viz_obj.time_shift = time_shift
+        query_obj = copy.deepcopy(query_obj)
+        query_obj["from_dttm"] -= time_shift
+        query_obj["to_dttm"] -= time_shift
+        with patch.dict(app.config, {"TIME_BUCKET_CACHE_TIMEOUT": timeout}), patch(
+            "superset.viz.security_manager.get_rls_ids", return_value=[]
+        ):
+            return viz_obj.get_df(query_obj)
+
+    def assert_frame_equal(self, expected, df):
+        pd.testing.assert_frame_equal(
+            expected.reset_index(drop=True), df.reset_index(drop=True)
+        )
+
+    def test_stitched_frame_matches_the_full_query(self):
+        from_dttm = self.today - timedelta(days=10, hours=-6)
+        to_dttm = self.today - timedelta(days=3, hours=-13, minutes=30)
+        for grain in (None, "PT1H", "P1D"):
+            self.datasource.uid = "{}__table".format(uuid.uuid4())
+            query_obj = self.get_query_obj(from_dttm, to_dttm, grain)
+            expected = self.get_df(query_obj, timeout=None)
+
+            self.queries = []
+            self.assert_frame_equal(expected, self.get_df(query_obj))
+            # the missing days are queried at once
+            self.assertEqual([(from_dttm, to_dttm)], self.queries)
+
+            # only the partial first and last days are queried once cached
+            self.queries = []
+            self.assert_frame_equal(expected, self.get_df(query_obj))
+            self.assertEqual(
+                [
+                    (from_dttm, self.today - timedelta(days=9)),
+                    (self.today - timedelta(days=3), to_dttm),
+                ],
+                self.queries,
+            )
+
+    def test_recent_days_are_not_cached(self):
+        from_dttm = self.today - timedelta(days=3)
+        query_obj = self.get_query_obj(from_dttm, self.today, "PT1H")
+        self.get_df(query_obj)
+        self.queries = []
+        self.get_df(query_obj)
+        # the day before yesterday ended more than a day ago
+        self.assertEqual([(self.today - timedelta(days=1), self.today)], self.queries)
+
+    def test_time_shift_reuses_the_cached_days(self):
+        self.datasource.offset = 2
+        from_dttm = self.today - timedelta(days=17)
+        to_dttm = self.today - timedelta(days=10)
+        shifted = self.get_df(self.get_query_obj(from_dttm, to_dttm, "PT1H"))
+        self.assertEqual([(from_dttm, to_dttm)], self.queries)
+
+        self.queries = []
+        time_shift = timedelta(weeks=1)
+        query_obj = self.get_query_obj(
+            from_dttm + time_shift, to_dttm + time_shift, "PT1H"
+        )
+        df = self.get_df(query_obj, time_shift=time_shift)
+        self.assertEqual([], self.queries)
+        self.assertEqual(
+            (shifted[DTTM_ALIAS] + time_shift).tolist(), df[DTTM_ALIAS].tolist()
+        )
+        self.assert_frame_equal(
+            self.get_df(query_obj, time_shift=time_shift, timeout=None), df
+        )
+        self.assertEqual(
+            self.today - timedelta(days=10, hours=-2), df[DTTM_ALIAS].iloc[0]
+        )
+
+    def test_unsupported_queries_are_not_split(self):
+        from_dttm = self.today - timedelta(days=10, hours=-6)
+        to_dttm = self.today - timedelta(days=3)
+        inclusive = [TimeRangeEndpoint.INCLUSIVE, TimeRangeEndpoint.INCLUSIVE]
+        for query_obj in (
+            self.get_query_obj(from_dttm, to_dttm, "PT1H", endpoints=inclusive),
+            self.get_query_obj(from_dttm, to_dttm, "P1M"),
+            dict(self.get_query_obj(from_dttm, to_dttm), timeseries_limit=10),
+        ):
+            for _ in range(2):
+                self.queries = []
+                self.get_df(query_obj)
+                self.assertEqual([(from_dttm, to_dttm)], self.queries)
+
+    def druid_query(self, query_obj):
+        period = {"1 hour": "H", "one day": "D"}[query_obj["granularity"]]
+        query_obj = dict(query_obj, extras={"time_grain_sqla": period})
+        from_dttm, to_dttm = query_obj["from_dttm"], query_obj["to_dttm"]
+        self.queries.append((from_dttm, to_dttm))
+        timestamps = self.data[DTTM_ALIAS]
+        df = self.data[(timestamps >= from_dttm) & (timestamps < to_dttm)].copy()
+        periods = df[DTTM_ALIAS].dt.to_period(period)
+        df = df.groupby(periods.dt.start_time)["sum__y"].sum().reset_index()
+        return QueryResult(df, "{}, {}".format(from_dttm, to_dttm), 0)
+
+    def get_druid_query_obj(self, from_dttm, to_dttm, granularity):
+        return {
+            "is_timeseries": True,
+            "granularity": granularity,
+            "from_dttm": from_dttm,
+            "to_dttm": to_dttm,
+            "groupby": [],
+            "metrics": ["sum__y"],
+            "row_limit": 10000,
+            "timeseries_limit": 0,
+            "extras": {"druid_time_origin": ""},
+        }
+
+    def use_druid(self):
+        self.datasource.type = "druid"
+        self.datasource.uid = "{}__druid".format(uuid.uuid4())
+        self.datasource.granularity = DruidDatasource.granularity
+        self.datasource.query.side_effect = self.druid_query
+
+    def test_druid_stitched_frame_matches_the_full_query(self):
+        self.use_druid()
+        from_dttm = self.today - timedelta(days=10, hours=-6)
+        to_dttm = self.today - timedelta(days=3, hours=-13)
+        for granularity in ("1 hour", "one day"):
+            self.datasource.uid = "{}__druid".format(uuid.uuid4())
+            query_obj = self.get_druid_query_obj(from_dttm, to_dttm, granularity)
+            expected = self.get_df(query_obj, timeout=None)
+
+            self.queries = []
+            self.assert_frame_equal(expected, self.get_df(query_obj))
+            self.assertEqual([(from_dttm, to_dttm)], self.queries)
+
+            self.queries = []
+            self.assert_frame_equal(expected, self.get_df(query_obj))
+            self.assertEqual(
+                [
+                    (from_dttm, self.today - timedelta(days=9)),
+                    (self.today - timedelta(days=3), to_dttm),
+                ],
+                self.queries,
+            )
+
+    def test_druid_queries_not_in_utc_are_not_split(self):
+        self.use_druid()
+        from_dttm = self.today - timedelta(days=10)
+        to_dttm = self.today - timedelta(days=3)
+        query_obj = self.get_druid_query_obj(from_dttm, to_dttm, "one day")
+        with patch(
+            "superset.connectors.druid.models.DRUID_TZ", tz.gettz("Asia/Shanghai")
+        ):
+            for _ in range(2):
+                self.queries = []
+                self.get_df(query_obj)
+                self.assertEqual([(from_dttm, to_dttm)], self.queries)
+
+    def test_row_limit_falls_back_to_the_full_query(self):
+        from_dttm = self.today - timedelta(days=10)
+        to_dttm = self.today - timedelta(days=3)
+        query_obj = dict(self.get_query_obj(from_dttm, to_dttm), row_limit=100)
+        df = self.get_df(query_obj)
+        self.assertEqual([(from_dttm, to_dttm)] * 2, self.queries)
+        self.assertEqual(7 * 96, len(df))